@@ -10,6 +10,7 @@ from django.utils import timezone
 import json
 import re
 from .models import GlosaDocument, ProcessingLog, ProcessingBatch
+from apps.extractor.money import parse_money
 
 # ============================================================================
 # CONFIGURACIÓN GENERAL DEL ADMIN
@@ -338,16 +339,8 @@ class GlosaDocumentAdmin(admin.ModelAdmin):
             
             for proc in procedures:
                 if isinstance(proc, dict):
-                    valor_objetado = proc.get('valor_objetado', 0)
-                    
-                    # Limpiar y convertir valor objetado
-                    if isinstance(valor_objetado, str):
-                        try:
-                            valor_objetado = float(valor_objetado.replace(',', '').replace('$', '').replace(' ', ''))
-                        except ValueError:
-                            valor_objetado = 0
-                    elif not isinstance(valor_objetado, (int, float)):
-                        valor_objetado = 0
+                    # Limpiar y convertir valor objetado (texto o número)
+                    valor_objetado = parse_money(proc.get('valor_objetado', 0))
                     
                     if valor_objetado > 0:
                         objetados += 1
@@ -426,22 +419,9 @@ class GlosaDocumentAdmin(admin.ModelAdmin):
             objetado = (financial.get('total_objetado', 0) or
                        financial.get('valor_objetado', 0) or 0)
             
-            # Limpiar y convertir valores si son strings
-            if isinstance(total, str):
-                try:
-                    total = float(total.replace(',', '').replace('$', '').replace(' ', ''))
-                except ValueError:
-                    total = 0
-            
-            if isinstance(objetado, str):
-                try:
-                    objetado = float(objetado.replace(',', '').replace('$', '').replace(' ', ''))
-                except ValueError:
-                    objetado = 0
-            
-            # Asegurar que son números
-            total = float(total) if total else 0
-            objetado = float(objetado) if objetado else 0
+            # Limpiar y convertir valores (texto o número) a pesos enteros
+            total = parse_money(total)
+            objetado = parse_money(objetado)
             
             # Calcular valores derivados
             aceptado = total - objetado
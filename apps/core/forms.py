@@ -11,6 +11,12 @@ from .models import GlosaDocument
 class GlosaUploadForm(forms.ModelForm):
     """Formulario para subir documentos de glosas"""
     
+    force_reprocess = forms.BooleanField(
+        required=False,
+        label='Forzar reprocesamiento',
+        help_text='Procesar de nuevo aunque este mismo archivo ya se haya procesado'
+    )
+    
     class Meta:
         model = GlosaDocument
         fields = ['original_file', 'strategy']
@@ -47,6 +53,11 @@ class GlosaUploadForm(forms.ModelForm):
                 css_class='mb-3'
             ),
             
+            Div(
+                Field('force_reprocess'),
+                css_class='mb-3'
+            ),
+            
             HTML('</div>'),
             HTML('<div class="card-footer">'),
             FormActions(
@@ -0,0 +1,329 @@
+# ==========================================
+# apps/core/management/commands/benchmark_line_table.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import os
+import random
+import time
+
+from apps.extractor.medical_claim_extractor_fixed import MedicalClaimExtractor
+from apps.extractor.parallel_scanner import scan_page_texts
+from apps.extractor.procedure_record import ProcedureRecord
+from apps.extractor.soat_patterns import (
+    PROCEDURE_LINE_PATTERN, PROCEDURE_COMPOUND_LINE_PATTERN, PROCEDURE_DESCRIPTION_PATTERN,
+    CODE_ONLY_PATTERN, CODE_PREFIX_PATTERN, DIGIT_PREFIX_PATTERN, LETTER_PREFIX_PATTERN,
+    OBSERVATION_TRAILING_PATTERN, OBSERVATION_CODED_PATTERN, OBSERVATION_CODE_PREFIX_PATTERN,
+    OBSERVATION_CODE_LINE_PATTERN, OBSERVATION_CONTINUATION_PATTERN,
+)
+
+
+DESCRIPTIONS = [
+    'CONSULTA DE CONTROL POR ESPECIALISTA',
+    'RADIOGRAFIA DE RODILLA AP Y LATERAL',
+    'CLORURO DE SODIO 0.9% SOLUCION INYECTABLE',
+    'Sutura de herida en cara',
+    'VENDA ELASTICA 4 PULGADAS',
+    'JERINGA DESECHABLE 10 ML',
+    'Total de materiales',
+    'Pagina 2',
+]
+
+OBSERVATIONS = [
+    'SE OBJETA POR NO PERTINENCIA MEDICA',
+    'NO CORRESPONDE ESTA ESPECIALIDAD AL DIAGNOSTICO',
+    'GLOSA POR TARIFA SUPERIOR A LA PACTADA',
+    'valor reconocido según manual tarifario',
+]
+
+
+# ============================================================================
+# RECORRIDO ANTERIOR DE LA TABLA (solo referencia para comparar)
+# ============================================================================
+
+def legacy_line_walk(extractor, lines, table_start, table_end):
+    """
+    Recorrido anterior: prueba cada patrón por línea y vuelve a revisar
+    las líneas siguientes buscando observaciones
+    """
+    procedures = []
+    seen_keys = set()
+
+    for i in range(table_start, table_end):
+        line = lines[i].strip()
+        if not line:
+            continue
+
+        procedure = _legacy_procedure_from_line(extractor, line, lines, i, table_end)
+        if procedure:
+            key = f"{procedure['codigo']}_{procedure['descripcion'][:30]}"
+            if key not in seen_keys:
+                procedures.append(procedure)
+                seen_keys.add(key)
+
+    return procedures
+
+
+def _legacy_procedure_from_line(extractor, line, all_lines, line_idx, table_end):
+    # Patrón 1: línea completa con código de 5 dígitos
+    # Patrón 2: código compuesto (como 19934768-18)
+    for pattern, method in ((PROCEDURE_LINE_PATTERN, 'table_line'),
+                            (PROCEDURE_COMPOUND_LINE_PATTERN, 'table_line_compound')):
+        match = pattern.match(line)
+        if match:
+            codigo = match.group(1).strip()
+            descripcion = extractor._clean_description(match.group(2).strip())
+            cantidad = float(match.group(3).strip())
+            valor_total = extractor._parse_money_value(match.group(4))
+            valor_pagado = extractor._parse_money_value(match.group(5))
+            valor_objetado = extractor._parse_money_value(match.group(6))
+            observacion = _legacy_observation_from_lines(extractor, all_lines, line_idx, table_end)
+
+            if extractor._is_valid_procedure(codigo, descripcion, valor_total):
+                return ProcedureRecord.from_values(
+                    codigo, descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+                    observacion, method
+                )
+
+    # Patrón 3: solo código en la línea, descripción y valores en las siguientes
+    if CODE_ONLY_PATTERN.match(line.strip()):
+        codigo = line.strip()
+        if line_idx + 1 < table_end and LETTER_PREFIX_PATTERN.match(all_lines[line_idx + 1].strip()):
+            combined_text = ' '.join(
+                all_lines[j].strip() for j in range(line_idx + 1, min(line_idx + 4, table_end))
+            )
+            desc_match = PROCEDURE_DESCRIPTION_PATTERN.match(combined_text)
+
+            if desc_match:
+                descripcion = extractor._clean_description(desc_match.group(1).strip())
+                cantidad = float(desc_match.group(2).strip())
+                valor_total = extractor._parse_money_value(desc_match.group(3))
+                valor_pagado = extractor._parse_money_value(desc_match.group(4))
+                valor_objetado = extractor._parse_money_value(desc_match.group(5))
+
+                if extractor._is_valid_procedure(codigo, descripcion, valor_total):
+                    return ProcedureRecord.from_values(
+                        codigo, descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+                        '', 'multiline'
+                    )
+
+    # Patrón 4: procedimiento sin código (como VENDA ELASTICA)
+    if LETTER_PREFIX_PATTERN.match(line) and '$' in line:
+        match = PROCEDURE_DESCRIPTION_PATTERN.match(line)
+
+        if match:
+            descripcion = extractor._clean_description(match.group(1).strip())
+            cantidad = float(match.group(2).strip())
+            valor_total = extractor._parse_money_value(match.group(3))
+            valor_pagado = extractor._parse_money_value(match.group(4))
+            valor_objetado = extractor._parse_money_value(match.group(5))
+
+            if extractor._is_valid_procedure_without_code(descripcion, valor_total):
+                return ProcedureRecord.from_values(
+                    '00000', descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+                    '', 'no_code'
+                )
+
+    return None
+
+
+def _legacy_observation_from_lines(extractor, lines, start_idx, end_idx):
+    observation = ""
+    current_line = lines[start_idx]
+
+    # Observación al final de la línea o con código de error (como 4567 >> texto)
+    obs_match = OBSERVATION_TRAILING_PATTERN.search(current_line)
+    if obs_match:
+        observation = obs_match.group(1).strip()
+
+    obs_match = OBSERVATION_CODED_PATTERN.search(current_line)
+    if obs_match:
+        observation = obs_match.group(2).strip()
+
+    for i in range(start_idx + 1, min(start_idx + 5, end_idx)):
+        if i >= len(lines):
+            break
+
+        line = lines[i].strip()
+
+        # Si encontramos un nuevo procedimiento, parar
+        if CODE_PREFIX_PATTERN.match(line) or 'Total' in line:
+            break
+
+        if OBSERVATION_CODE_PREFIX_PATTERN.match(line):
+            obs_match = OBSERVATION_CODE_LINE_PATTERN.search(line)
+            if obs_match:
+                new_obs = obs_match.group(1).strip()
+                observation = f"{observation} {new_obs}" if observation else new_obs
+
+        elif OBSERVATION_CONTINUATION_PATTERN.match(line):
+            continuation = line[2:].strip()
+            observation = f"{observation} {continuation}" if observation else continuation
+
+        elif line and not DIGIT_PREFIX_PATTERN.match(line) and len(line) > 10:
+            if not observation and any(word in line.upper() for word in ['GLOSA', 'OBJETA', 'NO', 'PERTINENTE', 'CORRESPONDE']):
+                observation = line
+
+    return extractor._clean_observation(observation)
+
+
+class Command(BaseCommand):
+    help = 'Compara la lectura de la tabla por líneas contra la pasada única (resultados y tiempo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=300,
+            help='Documentos sintéticos del corpus de comparación'
+        )
+        parser.add_argument(
+            '--rows',
+            type=str,
+            default='50,200,500,1000',
+            help='Filas de las tablas usadas para medir tiempo (separadas por coma)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Repeticiones por tamaño de tabla'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=13,
+            help='Semilla del corpus sintético'
+        )
+        parser.add_argument(
+            '--pdf',
+            type=str,
+            nargs='*',
+            default=[],
+            help='PDFs reales que se agregan al corpus de comparación'
+        )
+
+    def handle(self, *args, **options):
+        extractor = MedicalClaimExtractor()
+        rng = random.Random(options['seed'])
+
+        corpus = [self._build_table_text(rng, rng.randint(1, 60)) for _ in range(options['documents'])]
+        for pdf_path in options['pdf']:
+            if not os.path.exists(pdf_path):
+                raise CommandError(f'El archivo {pdf_path} no existe')
+            corpus.append("\n".join(scan_page_texts(pdf_path)))
+
+        mismatches = 0
+        total_procedures = 0
+        for index, text in enumerate(corpus):
+            legacy, current = self._run_both(extractor, text)
+            total_procedures += len(current)
+            if legacy != current:
+                mismatches += 1
+                if mismatches <= 3:
+                    self.stdout.write(self.style.ERROR(f'Documento {index}: resultados distintos'))
+
+        if mismatches:
+            raise CommandError(f'{mismatches} de {len(corpus)} documentos difieren')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Corpus: {len(corpus)} documentos, {total_procedures} procedimientos idénticos'
+        ))
+
+        try:
+            sizes = [int(value) for value in options['rows'].split(',') if value.strip()]
+        except ValueError:
+            raise CommandError('--rows debe ser una lista de enteros separados por coma')
+
+        iterations = max(options['iterations'], 1)
+        self.stdout.write(f"{'Filas':>6} {'Líneas':>7} {'Por línea (ms)':>15} {'Una pasada (ms)':>16} {'Mejora':>7}")
+
+        for rows in sizes:
+            text = self._build_table_text(rng, rows)
+            lines = text.split('\n')
+            start, end = extractor._find_procedure_table(lines)
+
+            legacy_time = self._time(lambda: legacy_line_walk(extractor, lines, start, end), iterations)
+            current_time = self._time(lambda: extractor._extract_table_procedures(lines, start, end), iterations)
+
+            self.stdout.write(
+                f'{rows:>6} {end - start:>7} {legacy_time * 1000:>15.2f} {current_time * 1000:>16.2f} '
+                f'{legacy_time / current_time:>6.1f}x'
+            )
+
+    def _run_both(self, extractor, text):
+        lines = text.split('\n')
+        start, end = extractor._find_procedure_table(lines)
+        if start == -1:
+            return [], []
+        return (
+            legacy_line_walk(extractor, lines, start, end),
+            extractor._extract_table_procedures(lines, start, end),
+        )
+
+    def _time(self, func, iterations):
+        """Mejor tiempo de una ejecución: el mínimo es el menos afectado por otros procesos"""
+        best = float('inf')
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    def _build_table_text(self, rng, rows):
+        """Tabla sintética con los formatos de fila y observación que aparecen en las glosas"""
+        lines = [
+            'Víctima : CC - 1234567890 - JUAN PEREZ GOMEZ',
+            'Código Descripción Cant Valor total Valor pagado Valor objetado Observación',
+        ]
+
+        for _ in range(rows):
+            description = rng.choice(DESCRIPTIONS)
+            quantity = rng.choice(['1', '2', '1.5', '10'])
+            total = rng.randint(1, 2500) * 1000
+            objected = rng.choice([0, total // 2, total])
+            values = f'${total:,} ${total - objected:,} ${objected:,}'
+            shape = rng.random()
+
+            if shape < 0.45:
+                line = f'{rng.randint(10000, 99999)} {description} {quantity} {values}'
+                if rng.random() < 0.2:
+                    line += f' {rng.choice(OBSERVATIONS)}'
+                elif rng.random() < 0.2:
+                    line += f' {rng.randint(1000, 9999)} >> {rng.choice(OBSERVATIONS)}'
+                lines.append(line)
+            elif shape < 0.6:
+                lines.append(f'{rng.randint(10000, 99999999)}-{rng.randint(1, 99)} {description} {quantity} {values}')
+            elif shape < 0.7:
+                lines.append(str(rng.randint(10000, 99999)))
+                lines.append(description)
+                lines.append(f'{quantity} {values}')
+            elif shape < 0.8:
+                lines.append(f'{description} {quantity} {values}')
+            elif shape < 0.9:
+                lines.append(f'{rng.randint(10000, 99999)} {description} {quantity} {values}'.replace('$', ''))
+            else:
+                # Filas repetidas y líneas sueltas que no son procedimientos
+                lines.append(lines[-1] if len(lines) > 2 else description)
+
+            # Observaciones en las líneas siguientes
+            for _ in range(rng.choice([0, 0, 1, 2, 3, 5])):
+                kind = rng.random()
+                if kind < 0.4:
+                    lines.append(f'{rng.randint(1000, 9999)} >> {rng.choice(OBSERVATIONS)}')
+                elif kind < 0.65:
+                    lines.append(f'>> {rng.choice(OBSERVATIONS)}')
+                elif kind < 0.75:
+                    lines.append(rng.choice(OBSERVATIONS))
+                elif kind < 0.82:
+                    lines.append('')
+                elif kind < 0.88:
+                    lines.append(f'{rng.randint(1000, 9999)} >>')
+                elif kind < 0.94:
+                    lines.append(f'  Total parcial {rng.randint(1, 9)}')
+                else:
+                    lines.append(f'{rng.randint(100, 9999)} unidades')
+
+        lines.append(f'Total ${rows * 1000:,}')
+        lines.append(f'Valor de Reclamación: ${rows * 1000:,}')
+        return "\n".join(lines)
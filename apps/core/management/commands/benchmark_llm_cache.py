@@ -0,0 +1,168 @@
+# ==========================================
+# apps/core/management/commands/benchmark_llm_cache.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+from types import SimpleNamespace
+import json
+import threading
+import time
+
+from apps.extractor.llm_cache import CHUNK_LEVEL, LLMResultCache, set_llm_cache
+from apps.extractor.medical_claim_extractor_fixed import MedicalClaimExtractor
+from apps.extractor.openai_paginated_processor import OpenAIPaginatedProcessorV2
+from apps.extractor.rate_limiter import set_openai_rate_limiter
+
+BENCHMARK_PREFIX = 'llm_cache_benchmark'
+
+
+class _StandInCompletions:
+    """chat.completions local: cuenta las llamadas y responde un procedimiento tras latency segundos"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, **request):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        content = json.dumps({'procedures': [{
+            'codigo': '12345', 'descripcion': 'CONSULTA', 'cantidad': 1,
+            'valor_total': 120000, 'valor_pagado': 100000, 'valor_objetado': 20000,
+        }]})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20),
+        )
+
+
+class Command(BaseCommand):
+    help = 'Reprocesamiento, llamadas simultáneas y desalojo de la caché de OpenAI (Redis real o fakeredis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--redis-url',
+            default='',
+            help='Redis a usar; sin valor se usa fakeredis en memoria'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Llamadas idénticas simultáneas'
+        )
+
+    def handle(self, *args, **options):
+        redis_client = self._redis_client(options['redis_url'])
+        self._clear(redis_client)
+        set_openai_rate_limiter(None)
+
+        cache = LLMResultCache(redis_client, ttl=600, key_prefix=BENCHMARK_PREFIX)
+        set_llm_cache(cache)
+        try:
+            self._check_reprocess(cache)
+            self._check_single_flight(redis_client, options['threads'])
+            self._check_eviction(redis_client)
+        finally:
+            set_llm_cache(None)
+            self._clear(redis_client)
+
+    def _check_reprocess(self, cache):
+        """Reprocesar el mismo documento no vuelve a llamar a la API (documento y chunks)"""
+        completions = _StandInCompletions(0.0)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        extractor = MedicalClaimExtractor(openai_api_key='local', openai_client=client)
+        processor = OpenAIPaginatedProcessorV2('local', openai_client=client, max_concurrency=4)
+
+        text = 'Víctima : PACIENTE DE PRUEBA\n12345 CONSULTA DE CONTROL 1 $120,000 $100,000 $20,000\n'
+        table = '\n'.join(f'{10000 + i} CONSULTA DE CONTROL NUMERO {i} 1 $120,000 $100,000 $20,000'
+                          for i in range(300))
+
+        self.stdout.write(f"{'Procesamiento':<28} {'Llamadas a la API':>18}")
+        for name in ('Primera vez', 'Reprocesamiento', 'Upload duplicado'):
+            before = completions.calls
+            document = extractor._extract_with_openai_traditional(text)
+            procedures = processor._process_procedures_table(table if name != 'Upload duplicado' else table + '\n\n')
+            if len(document['procedures']) != 1 or not procedures:
+                raise CommandError(f'{name}: resultado incompleto')
+            self.stdout.write(f'{name:<28} {completions.calls - before:>18}')
+            if name != 'Primera vez' and completions.calls != before:
+                raise CommandError(f'{name}: se llamó a la API con el mismo texto')
+
+        for level, counters in cache.stats()['process'].items():
+            self.stdout.write(
+                f"  {level:<10} {counters['hits']:>4} aciertos  {counters['shared']:>4} compartidas  "
+                f"{counters['misses']:>4} llamadas"
+            )
+
+    def _check_single_flight(self, redis_client, thread_count):
+        """Llamadas idénticas simultáneas, en un proceso y entre workers, se unen en una"""
+        completions = _StandInCompletions(0.5)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+        # Dos cachés sobre el mismo Redis simulan dos workers
+        workers = [LLMResultCache(redis_client, ttl=600, key_prefix=BENCHMARK_PREFIX) for _ in range(2)]
+        results = []
+
+        def call(cache):
+            results.append(cache.get_or_compute(
+                CHUNK_LEVEL, 'gpt-4o-mini', 'benchmark', 'TEXTO IDÉNTICO',
+                lambda: json.loads(client.chat.completions.create().choices[0].message.content)
+            ))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=call, args=(workers[i % 2],)) for i in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if completions.calls != 1 or len(results) != thread_count or any(r != results[0] for r in results):
+            raise CommandError(f'{thread_count} llamadas simultáneas hicieron {completions.calls} requests')
+        self.stdout.write(self.style.SUCCESS(
+            f'{thread_count} llamadas idénticas simultáneas en 2 workers: 1 request ({elapsed:.2f}s)'
+        ))
+
+    def _check_eviction(self, redis_client):
+        """El índice por último uso mantiene el máximo de entradas y conserva las usadas"""
+        cache = LLMResultCache(redis_client, ttl=600, max_entries=100, key_prefix=BENCHMARK_PREFIX + '_eviction')
+        computed = []
+
+        def compute(i):
+            computed.append(i)
+            return {'i': i}
+
+        cache.get_or_compute(CHUNK_LEVEL, 'm', 'v', 'texto 0', lambda: compute(0))
+        for i in range(1, 150):
+            cache.get_or_compute(CHUNK_LEVEL, 'm', 'v', f'texto {i}', lambda i=i: compute(i))
+            # La entrada 0 se sigue usando: no debe desalojarse
+            cache.get_or_compute(CHUNK_LEVEL, 'm', 'v', 'texto 0', lambda: compute(0))
+
+        entries = redis_client.zcard(cache.index_key)
+        stored = len(list(redis_client.scan_iter(f'{{{cache.key_prefix}}}:entry:*')))
+        if entries > 100 or stored > 100 or computed.count(0) != 1:
+            raise CommandError(f'Desalojo: {entries} en el índice, {stored} guardadas, '
+                               f'entrada usada recalculada {computed.count(0)} veces')
+        self.stdout.write(self.style.SUCCESS(
+            f'Desalojo por tamaño: 150 resultados, {stored} guardados (máximo 100), la entrada en uso se conserva'
+        ))
+
+    def _clear(self, redis_client):
+        for prefix in (BENCHMARK_PREFIX, BENCHMARK_PREFIX + '_eviction'):
+            keys = list(redis_client.scan_iter(f'{{{prefix}}}:*'))
+            if keys:
+                redis_client.delete(*keys)
+
+    def _redis_client(self, redis_url):
+        if redis_url:
+            import redis
+            return redis.Redis.from_url(redis_url)
+
+        try:
+            import fakeredis
+        except ImportError:
+            raise CommandError('Instalar fakeredis[lua] o indicar --redis-url')
+        return fakeredis.FakeRedis()
@@ -0,0 +1,123 @@
+# ==========================================
+# apps/core/management/commands/benchmark_money_parser.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+from decimal import Decimal, ROUND_HALF_UP
+import random
+import re
+import time
+
+from apps.extractor.money import parse_money, parse_money_column, sum_money
+
+_LEGACY_SYMBOLS = re.compile(r'[\$\s]')
+
+
+def legacy_parse_money_value(value_str):
+    """Conversión anterior del extractor (a float, coma como decimal si le siguen 1-2 dígitos)"""
+    if not value_str:
+        return 0.0
+    try:
+        clean_value = _LEGACY_SYMBOLS.sub('', str(value_str))
+        if ',' in clean_value and clean_value.count(',') == 1:
+            parts = clean_value.split(',')
+            if len(parts[1]) <= 2:
+                clean_value = clean_value.replace(',', '.')
+            else:
+                clean_value = clean_value.replace(',', '')
+        else:
+            clean_value = clean_value.replace(',', '')
+        return float(clean_value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class Command(BaseCommand):
+    help = 'Propiedades aleatorias y tiempos del conversor de valores monetarios a pesos enteros'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cases',
+            type=int,
+            default=100000,
+            help='Valores aleatorios verificados'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=19,
+            help='Semilla del generador'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        cases = max(options['cases'], 1)
+
+        self._check_properties(rng, cases)
+        self.stdout.write(self.style.SUCCESS(f'{cases} valores aleatorios cumplen las propiedades'))
+
+        # Columna realista: valores de tabla con repeticiones y formatos mezclados
+        amounts = [rng.choice([0, 35000, 95500, 120000]) if rng.random() < 0.5 else rng.randint(1, 5 * 10 ** 6)
+                   for _ in range(cases)]
+        styles = [(',', ''), ('.', ''), (',', '.00'), ('.', ',00')]
+        column = [self._format(rng, amount, *rng.choice(styles)) for amount in amounts]
+
+        wrong = sum(1 for text, amount in zip(column, amounts) if legacy_parse_money_value(text) != amount)
+        legacy_total = sum(legacy_parse_money_value(text) for text in column)
+        self.stdout.write(
+            f'Conversión anterior: {wrong} de {cases} valores distintos; '
+            f'suma {legacy_total:,.2f} contra {sum(amounts):,} exactos (ahora {sum_money(column):,})'
+        )
+
+        self.stdout.write(f"{'Modo':<28} {'µs/valor':>10}")
+        for name, run in (
+            ('Anterior (re.sub + float)', lambda: [legacy_parse_money_value(text) for text in column]),
+            ('parse_money', lambda: [parse_money(text) for text in column]),
+            ('parse_money_column', lambda: parse_money_column(column)),
+        ):
+            started = time.perf_counter()
+            run()
+            self.stdout.write(f'{name:<28} {(time.perf_counter() - started) / cases * 1e6:>10.3f}')
+
+    def _check_properties(self, rng, cases):
+        for _ in range(cases):
+            pesos = rng.choice([0, rng.randint(1, 999), rng.randint(1000, 10 ** 6), rng.randint(10 ** 6, 10 ** 12)])
+            thousands = rng.choice([',', '.', ''])
+            text = self._format(rng, pesos, thousands, '')
+
+            # Entero en cualquier formato de miles, con o sin símbolos
+            self._expect(parse_money(text), pesos, text)
+            self._expect(parse_money('-' + text.lstrip('$ ')), -pesos, '-' + text)
+
+            # Con centavos: redondeo al peso, mitad hacia arriba
+            cents = rng.randint(0, 99)
+            decimal_mark = '.' if thousands == ',' else ','
+            text = self._format(rng, pesos, thousands, f'{decimal_mark}{cents:02d}')
+            expected = int((Decimal(pesos) + Decimal(cents) / 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+            self._expect(parse_money(text), expected, text)
+
+            # Números ya convertidos (respuesta de IA o datos guardados)
+            self._expect(parse_money(pesos), pesos, pesos)
+            self._expect(parse_money(float(pesos)), pesos, float(pesos))
+            self._expect(parse_money(str(pesos) + '.0'), pesos, str(pesos) + '.0')
+
+        garbage = ['', None, '$', 'abc', '1,2,3a', '--5', '.', ',', '$ -', '١٢٣', float('nan'), float('inf')]
+        for value in garbage:
+            self._expect(parse_money(value), 0, value)
+
+        # La columna da lo mismo que valor por valor, y la suma es exacta
+        column = [self._format(rng, rng.randint(0, 10 ** 7), ',', '') for _ in range(1000)]
+        if parse_money_column(column) != [parse_money(text) for text in column]:
+            raise CommandError('parse_money_column no coincide con parse_money')
+        if sum_money(column) != sum(parse_money(text) for text in column):
+            raise CommandError('sum_money no es la suma exacta de los valores')
+
+    def _expect(self, found, expected, value):
+        if found != expected:
+            raise CommandError(f'parse_money({value!r}) = {found!r}, se esperaba {expected!r}')
+
+    def _format(self, rng, pesos, thousands, decimals):
+        digits = f'{pesos:,}'.replace(',', thousands)
+        prefix = rng.choice(['', '$', '$ ', ' $', '$\xa0'])
+        suffix = rng.choice(['', ' ', '\t'])
+        return f'{prefix}{digits}{decimals}{suffix}'
@@ -0,0 +1,184 @@
+# ==========================================
+# apps/core/management/commands/benchmark_openai_client.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+import time
+
+from apps.extractor.llm_cache import set_llm_cache
+from apps.extractor.openai_client import create_openai_client, set_openai_client_factory
+from apps.extractor.openai_paginated_processor import OpenAIPaginatedProcessorV2
+from apps.extractor.rate_limiter import set_openai_rate_limiter
+
+_TABLE_CODE = re.compile(r'^(\d{5}) ', re.M)
+
+
+def _completion(codes):
+    procedures = [{
+        'codigo': code, 'descripcion': 'CONSULTA', 'cantidad': 1,
+        'valor_total': 120000, 'valor_pagado': 100000, 'valor_objetado': 20000,
+    } for code in codes]
+    return {
+        'id': 'chatcmpl-local',
+        'object': 'chat.completion',
+        'created': 0,
+        'model': 'gpt-4o-mini',
+        'choices': [{
+            'index': 0,
+            'finish_reason': 'stop',
+            'message': {'role': 'assistant', 'content': json.dumps({'procedures': procedures})},
+        }],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20},
+    }
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    chat.completions local: devuelve un procedimiento por cada código de la tabla recibida
+    tras server.latency segundos; /hang/ no responde a tiempo
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo van en escrituras separadas: sin esto keep-alive espera el ACK diferido
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        if self.path.startswith('/hang/'):
+            time.sleep(self.server.hang_seconds)
+        time.sleep(self.server.latency)
+        body = json.dumps(_completion(_TABLE_CODE.findall(request['messages'][-1]['content']))).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    hang_seconds = 3.0
+    latency = 0.0
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class Command(BaseCommand):
+    help = 'Conexiones, latencia y envío en paralelo de chunks del cliente OpenAI contra un servidor local'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--calls',
+            type=int,
+            default=200,
+            help='Llamadas por modo'
+        )
+        parser.add_argument(
+            '--chunks',
+            type=int,
+            default=10,
+            help='Chunks de la tabla en la prueba de envío en paralelo'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.5,
+            help='Segundos que tarda el servidor local por chunk en la prueba en paralelo'
+        )
+
+    def handle(self, *args, **options):
+        server = _StandInServer(('127.0.0.1', 0), _StandInHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}/v1'
+        calls = max(options['calls'], 1)
+
+        # Cada llamada debe llegar al servidor local: sin caché ni limitador compartidos
+        set_llm_cache(None)
+        set_openai_rate_limiter(None)
+
+        try:
+            self.stdout.write(f"{'Modo':<30} {'Conexiones':>11} {'ms/llamada':>11}")
+
+            def fresh_client_each_call():
+                import openai
+                client = openai.OpenAI(api_key='local', base_url=base_url)
+                processor._extract_procedures_from_text('12345 CONSULTA', client)
+                client.close()
+
+            def shared_client():
+                processor._extract_procedures_from_text('12345 CONSULTA', processor.openai_client)
+
+            processor = OpenAIPaginatedProcessorV2('local', openai_client=create_openai_client('local', base_url=base_url))
+            for name, run in (('Cliente nuevo por llamada', fresh_client_each_call),
+                              ('Cliente compartido', shared_client)):
+                server.connections = 0
+                started = time.perf_counter()
+                for _ in range(calls):
+                    run()
+                elapsed = (time.perf_counter() - started) / calls * 1000
+                self.stdout.write(f'{name:<30} {server.connections:>11} {elapsed:>11.2f}')
+
+            if processor.total_api_calls != 2 * calls:
+                raise CommandError('El servidor local no respondió todas las llamadas')
+
+            # La fábrica del proceso reemplaza al cliente real (así se prueban los extractores)
+            set_openai_client_factory(lambda api_key, url: create_openai_client(api_key, base_url=base_url))
+            try:
+                injected = OpenAIPaginatedProcessorV2('local')
+                if len(injected._process_procedures_table('12345 CONSULTA')) != 1:
+                    raise CommandError('El cliente inyectado no se usó')
+            finally:
+                set_openai_client_factory(None)
+
+            self._check_fan_out(server, base_url, options['chunks'], options['latency'])
+
+            # Un request colgado se corta con el timeout de lectura, no con el límite de Celery
+            hung = create_openai_client('local', base_url=base_url.replace('/v1', '/hang/v1'),
+                                        read_timeout=0.5, max_retries=0)
+            started = time.perf_counter()
+            try:
+                hung.chat.completions.create(model='gpt-4o-mini', messages=[{'role': 'user', 'content': 'x'}])
+                raise CommandError('El request colgado no expiró')
+            except CommandError:
+                raise
+            except Exception as e:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Request colgado cortado en {time.perf_counter() - started:.2f}s ({type(e).__name__})'
+                ))
+        finally:
+            server.shutdown()
+
+    def _check_fan_out(self, server, base_url, chunk_count, latency):
+        """Tabla grande: chunks secuenciales con pausa contra chunks en paralelo"""
+        rows = [f'{10000 + i} CONSULTA DE CONTROL NUMERO {i} 1 $120,000 $100,000 $20,000'
+                for i in range(chunk_count * 30)]
+        table = '\n'.join(rows)
+        expected = [row[:5] for row in rows]
+        client = create_openai_client('local', base_url=base_url)
+        server.latency = latency
+
+        self.stdout.write(f"{'Envío de chunks':<30} {'Chunks':>7} {'Segundos':>9}")
+        for name, processor in (
+            ('Secuencial (pausa de 2s)', OpenAIPaginatedProcessorV2('local', openai_client=client, max_concurrency=1)),
+            ('Paralelo (4 simultáneos)', OpenAIPaginatedProcessorV2('local', openai_client=client, max_concurrency=4)),
+            (f'Paralelo ({chunk_count} simultáneos)',
+             OpenAIPaginatedProcessorV2('local', openai_client=client, max_concurrency=chunk_count)),
+        ):
+            started = time.perf_counter()
+            procedures = processor._process_procedures_table(table)
+            elapsed = time.perf_counter() - started
+            if [proc['codigo'] for proc in procedures] != expected:
+                raise CommandError(f'{name}: los procedimientos no quedaron en el orden de la tabla')
+            self.stdout.write(f'{name:<30} {processor.total_api_calls:>7} {elapsed:>9.2f}')
+
+        server.latency = 0.0
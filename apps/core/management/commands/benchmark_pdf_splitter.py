@@ -0,0 +1,121 @@
+# ==========================================
+# apps/core/management/commands/benchmark_pdf_splitter.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import os
+import tempfile
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+
+from apps.extractor.pdf_splitter import GlosaPDFSplitter
+
+
+class Command(BaseCommand):
+    help = 'Compara memoria pico y tiempo de split_pdf contra iter_split_pdf con PDFs sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=str,
+            default='100,250,500,1000',
+            help='Tamaños de PDF a generar (páginas, separados por coma)'
+        )
+        parser.add_argument(
+            '--pages-per-patient',
+            type=int,
+            default=2,
+            help='Páginas por sección de paciente en el PDF sintético'
+        )
+        parser.add_argument(
+            '--pdf',
+            type=str,
+            help='Usar un PDF real en lugar de los sintéticos'
+        )
+
+    def handle(self, *args, **options):
+        pages_per_patient = max(options['pages_per_patient'], 2)
+
+        with tempfile.TemporaryDirectory(prefix='benchmark_splitter_') as work_dir:
+            if options['pdf']:
+                if not os.path.exists(options['pdf']):
+                    raise CommandError(f"El archivo {options['pdf']} no existe")
+                pdf_paths = [options['pdf']]
+            else:
+                try:
+                    sizes = [int(value) for value in options['pages'].split(',') if value.strip()]
+                except ValueError:
+                    raise CommandError('--pages debe ser una lista de enteros separados por coma')
+
+                pdf_paths = []
+                for total_pages in sizes:
+                    pdf_path = os.path.join(work_dir, f'synthetic_{total_pages}.pdf')
+                    self._build_synthetic_pdf(pdf_path, total_pages, pages_per_patient)
+                    pdf_paths.append(pdf_path)
+
+            self.stdout.write(
+                f"{'Páginas':>8} {'Secciones':>10} {'Modo':>12} {'Pico (MB)':>10} {'Tiempo (s)':>11} {'Salida (MB)':>12}"
+            )
+
+            for pdf_path in pdf_paths:
+                self._benchmark_file(pdf_path, work_dir)
+
+    def _benchmark_file(self, pdf_path, work_dir):
+        splitter = GlosaPDFSplitter()
+
+        # El análisis se comparte: solo se mide la división
+        analysis = splitter.analyze(pdf_path)
+        sections = len(analysis.sections)
+
+        def run_split_pdf():
+            results = splitter.split_pdf(pdf_path, analysis=analysis)
+            return sum(len(pdf_content) for pdf_content, _, _ in results)
+
+        def run_iter_split_pdf():
+            output_dir = os.path.join(work_dir, 'stream_output')
+            total = 0
+            for section in splitter.iter_split_pdf(pdf_path, analysis=analysis, output_dir=output_dir):
+                total += section.file_size
+                os.remove(section.path)
+            return total
+
+        for mode, runner in (('split_pdf', run_split_pdf), ('streaming', run_iter_split_pdf)):
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            output_bytes = runner()
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{analysis.total_pages:>8} {sections:>10} {mode:>12} "
+                f"{peak / 1024 / 1024:>10.2f} {elapsed:>11.2f} {output_bytes / 1024 / 1024:>12.2f}"
+            )
+
+    def _build_synthetic_pdf(self, pdf_path, total_pages, pages_per_patient):
+        """Genera un PDF con secciones Víctima ... Valor de Reclamación: repetidas"""
+        doc = fitz.open()
+        filler = "PROCEDIMIENTO 890201 CONSULTA DE PRIMERA VEZ POR MEDICINA GENERAL 1 $45,000 $0\n" * 25
+
+        for page_num in range(total_pages):
+            page = doc.new_page()
+            position = page_num % pages_per_patient
+            patient = page_num // pages_per_patient + 1
+
+            if position == 0:
+                text = (
+                    "LIQUIDACIÓN DE SINIESTROS SOAT - SEGUROS MUNDIAL\n"
+                    f"Víctima : CC - {1000000 + patient} - PACIENTE SINTETICO {patient}\n"
+                    f"Número Reclamación: {patient}\n" + filler
+                )
+            elif position == pages_per_patient - 1:
+                text = filler + "Valor de Reclamación: $1,000,000\n"
+            else:
+                text = filler
+
+            page.insert_text((36, 36), text, fontsize=6)
+
+        doc.save(pdf_path, garbage=3, deflate=True)
+        doc.close()
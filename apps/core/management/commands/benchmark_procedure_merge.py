@@ -0,0 +1,169 @@
+# ==========================================
+# apps/core/management/commands/benchmark_procedure_merge.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import copy
+import logging
+import random
+import time
+
+from apps.extractor.medical_claim_extractor_fixed import MedicalClaimExtractor
+
+
+class Command(BaseCommand):
+    help = 'Compara el merge OCR+IA indexado contra la comparación de todos contra todos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cases',
+            type=int,
+            default=500,
+            help='Pares OCR/IA aleatorios para verificar igualdad'
+        )
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='*',
+            default=[50, 500, 2000],
+            help='Procedimientos por fuente en las mediciones'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=16,
+            help='Semilla del generador'
+        )
+
+    def handle(self, *args, **options):
+        # Los logs por procedimiento del merge original distorsionan la medición
+        logging.disable(logging.WARNING)
+        try:
+            self._run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        extractor = MedicalClaimExtractor()
+
+        # Sin comparación difusa el resultado debe ser idéntico al merge original
+        exact = MedicalClaimExtractor()
+        exact.merge_fuzzy_ratio = None
+        fuzzy_merges = 0
+
+        for case in range(options['cases']):
+            ocr, ai = self._build_case(rng, rng.randint(0, 40))
+            expected = self._legacy_merge(extractor, copy.deepcopy(ocr), copy.deepcopy(ai))
+            current = exact._merge_results({'procedures': copy.deepcopy(ocr)}, {'procedures': copy.deepcopy(ai)})
+            if current['procedures'] != expected:
+                raise CommandError(f'El merge indexado no coincide con el original en el caso {case}')
+
+            fuzzy = extractor._merge_results({'procedures': copy.deepcopy(ocr)}, {'procedures': copy.deepcopy(ai)})
+            fuzzy_merges += len(expected) - len(fuzzy['procedures'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['cases']} casos idénticos al merge original; "
+            f"la comparación difusa unió {fuzzy_merges} procedimientos truncados adicionales"
+        ))
+
+        self.stdout.write(f"{'Procedimientos':>15} {'Original (ms)':>14} {'Indexado (ms)':>14} {'Aceleración':>12}")
+        for size in options['sizes']:
+            ocr, ai = self._build_case(rng, size)
+            started = time.perf_counter()
+            self._legacy_merge(extractor, copy.deepcopy(ocr), copy.deepcopy(ai))
+            legacy = time.perf_counter() - started
+
+            started = time.perf_counter()
+            extractor._merge_results({'procedures': copy.deepcopy(ocr)}, {'procedures': copy.deepcopy(ai)})
+            indexed = time.perf_counter() - started
+
+            self.stdout.write(
+                f'{size:>15} {legacy * 1000:>14.2f} {indexed * 1000:>14.2f} {legacy / indexed:>11.1f}x'
+            )
+
+    def _legacy_merge(self, extractor, ocr_procedures, ai_procedures):
+        """Merge de todos contra todos y validación con reescaneo, como antes del índice"""
+        merged = [dict(proc) for proc in ocr_procedures]
+
+        for ai_proc in ai_procedures:
+            for merged_proc in merged:
+                if extractor._are_exact_same_procedure(merged_proc, ai_proc):
+                    if merged_proc['codigo'] == "00000" and ai_proc['codigo'] != "00000":
+                        merged_proc['codigo'] = ai_proc['codigo']
+                    obs_existing = merged_proc.get('observacion', '').strip()
+                    obs_ai = ai_proc.get('observacion', '').strip()
+                    if len(obs_ai) > len(obs_existing):
+                        merged_proc['observacion'] = obs_ai
+                    for field in ['descripcion', 'cantidad', 'valor_unitario', 'valor_pagado', 'valor_objetado', 'estado']:
+                        if not merged_proc.get(field) and ai_proc.get(field):
+                            merged_proc[field] = ai_proc[field]
+                    break
+            else:
+                merged.append(ai_proc)
+
+        validated = []
+        seen = {}
+        for proc in merged:
+            desc_key = proc.get('descripcion', '').upper().strip()
+            if desc_key in seen:
+                if extractor._is_more_complete_procedure(proc, seen[desc_key]):
+                    seen[desc_key] = proc
+                    for i, vp in enumerate(validated):
+                        if vp.get('descripcion', '').upper().strip() == desc_key:
+                            validated[i] = proc
+                            break
+            else:
+                seen[desc_key] = proc
+                validated.append(proc)
+        return validated
+
+    def _build_case(self, rng, size):
+        """Procedimientos OCR y su lectura por IA con códigos 00000, truncados y repetidos"""
+        ocr = [self._random_procedure(rng, i, 'table_line') for i in range(size)]
+        ai = []
+
+        for proc in ocr:
+            roll = rng.random()
+            if roll < 0.15:
+                continue
+            twin = dict(proc, extraction_method='ai_extraction')
+            if roll < 0.35:
+                twin['codigo'] = '00000'
+            elif roll < 0.45:
+                proc['codigo'] = '00000'
+            elif roll < 0.55:
+                twin['codigo'] = f'{rng.randint(10000, 99999)}'
+                twin['valor_total'] = proc['valor_total'] * rng.choice([1, 1.02, 1.5])
+            elif roll < 0.65:
+                # OCR cortó la descripción
+                proc['descripcion'] = proc['descripcion'][:rng.randint(8, 30)]
+            if rng.random() < 0.5:
+                twin['observacion'] = f'{rng.randint(1000, 9999)} >> SE OBJETA POR NO PERTINENCIA MEDICA'
+            if rng.random() < 0.2:
+                twin['descripcion'] = twin['descripcion'].lower() + '  '
+            ai.append(twin)
+
+        ai.extend(self._random_procedure(rng, size + i, 'ai_extraction') for i in range(rng.randint(0, size // 5 + 1)))
+        rng.shuffle(ai)
+        return ocr, ai
+
+    def _random_procedure(self, rng, i, method):
+        names = ['CONSULTA DE CONTROL ESPECIALIZADA', 'MATERIALES DE SUTURA Y CURACION', 'RADIOGRAFIA DE TORAX',
+                 'HEMOGRAMA IV', 'TAC DE CRANEO SIMPLE', 'TERAPIA FISICA INTEGRAL']
+        # Descripciones repetidas en parte de los casos para ejercitar la validación
+        suffix = f' {i % max(rng.randint(1, 40), 1)}' if rng.random() < 0.3 else f' {i}'
+        total = float(rng.choice([35000, 95500, 120000, rng.randint(1, 500) * 1000]))
+        paid = float(rng.choice([0, total, total / 2]))
+        return {
+            'codigo': rng.choice([f'{rng.randint(10000, 99999)}', '00000', f'{rng.randint(10000, 99999)}-01']),
+            'descripcion': rng.choice(names) + suffix,
+            'cantidad': rng.choice([0, 1, 2]),
+            'valor_unitario': total,
+            'valor_total': total,
+            'valor_pagado': paid,
+            'valor_objetado': total - paid,
+            'observacion': rng.choice(['', 'SIN OBSERVACION']),
+            'estado': rng.choice(['', 'objetado', 'aprobado']),
+            'extraction_method': method,
+        }
@@ -0,0 +1,96 @@
+# ==========================================
+# apps/core/management/commands/benchmark_procedure_records.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import json
+import random
+import time
+import tracemalloc
+
+from apps.extractor.medical_claim_extractor_fixed import MedicalClaimExtractor
+from apps.extractor.procedure_record import ProcedureRecord, to_dicts
+
+
+class Command(BaseCommand):
+    help = 'Compara memoria y tiempo de procedimientos como dict contra ProcedureRecord'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procedures',
+            type=int,
+            default=20000,
+            help='Procedimientos creados por modo'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=17,
+            help='Semilla del generador'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rows = [self._random_values(rng, i) for i in range(max(options['procedures'], 1))]
+
+        # El registro debe serializarse igual que el dict que reemplaza
+        for values in rows[:1000]:
+            if ProcedureRecord.from_values(*values).to_dict() != self._as_dict(*values):
+                raise CommandError(f'ProcedureRecord no coincide con el dict para {values!r}')
+
+        # Respuesta de IA con claves adicionales y campos ausentes
+        extractor = MedicalClaimExtractor()
+        ai_data = {'procedures': [
+            {'codigo': '21102', 'descripcion': 'RADIOGRAFIA DE RODILLA', 'valor_total': '35000', 'fecha': '2024-01-02'},
+            {'descripcion': 'VENDA ELASTICA', 'cantidad': 2, 'valor_objetado': 7000, 'observacion': ' SIN SOPORTE '},
+        ]}
+        expected = json.dumps(extractor._validate_openai_data(json.loads(json.dumps(ai_data)))['procedures'],
+                              default=dict, sort_keys=True)
+        if json.dumps(to_dicts(extractor._validate_openai_data(ai_data)['procedures']), sort_keys=True) != expected:
+            raise CommandError('La conversión de la respuesta de IA no conserva las claves')
+
+        self.stdout.write(f"{'Modo':<20} {'KB':>10} {'bytes/proc':>11} {'µs/proc':>9}")
+        for name, build in (('dict', self._as_dict), ('ProcedureRecord', ProcedureRecord.from_values)):
+            tracemalloc.start()
+            started = time.perf_counter()
+            procedures = [build(*values) for values in rows]
+            elapsed = time.perf_counter() - started
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f'{name:<20} {size / 1024:>10.0f} {size / len(procedures):>11.0f} '
+                f'{elapsed / len(procedures) * 1e6:>9.2f}'
+            )
+            del procedures
+
+        records = [ProcedureRecord.from_values(*values) for values in rows]
+        started = time.perf_counter()
+        to_dicts(records)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{'Conversión a dict':<20} {'':>10} {'':>11} {elapsed / len(records) * 1e6:>9.2f}")
+
+    def _as_dict(self, codigo, descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+                 observacion, extraction_method):
+        """Dict como lo armaban los extractores antes del registro"""
+        return {
+            'codigo': codigo,
+            'descripcion': descripcion,
+            'cantidad': int(cantidad),
+            'valor_unitario': valor_total / cantidad if cantidad > 0 else 0,
+            'valor_total': valor_total,
+            'valor_pagado': valor_pagado,
+            'valor_objetado': valor_objetado,
+            'observacion': observacion,
+            'estado': 'objetado' if valor_objetado > 0 else 'aceptado',
+            'extraction_method': extraction_method
+        }
+
+    def _random_values(self, rng, i):
+        total = float(rng.randint(1, 500) * 1000)
+        paid = rng.choice([0.0, total, total / 2])
+        return (
+            f'{rng.randint(10000, 99999)}', f'Procedimiento {i}', float(rng.choice([0, 1, 2])),
+            total, paid, total - paid, rng.choice(['', 'SE OBJETA POR NO PERTINENCIA MEDICA']),
+            rng.choice(['table_line', 'layout_table', 'no_code']),
+        )
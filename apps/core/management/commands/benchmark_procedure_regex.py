@@ -0,0 +1,158 @@
+# ==========================================
+# apps/core/management/commands/benchmark_procedure_regex.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import random
+import re
+import time
+
+from apps.extractor import soat_patterns
+from apps.extractor.line_table import LineTableParser
+from apps.extractor.regex_budget import RegexBudget
+
+# Fragmento anterior: la descripción incluía \s y competía con el \s+ siguiente
+LEGACY_DESCRIPTION_AND_VALUES = (
+    r'([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)'
+    r'\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)'
+)
+
+LEGACY_PATTERNS = {
+    'PROCEDURE_LINE_PATTERN': re.compile(r'^(\d{5})\s+' + LEGACY_DESCRIPTION_AND_VALUES, re.I),
+    'PROCEDURE_COMPOUND_LINE_PATTERN': re.compile(r'^(\d{5,8}-\d{1,2})\s+' + LEGACY_DESCRIPTION_AND_VALUES, re.I),
+    'PROCEDURE_DESCRIPTION_PATTERN': re.compile(r'^' + LEGACY_DESCRIPTION_AND_VALUES, re.I),
+}
+
+LEGACY_FULL_TEXT_PATTERNS = [
+    re.compile(r'(\d{5})\s+' + LEGACY_DESCRIPTION_AND_VALUES, re.I | re.M),
+    re.compile(r'(\d{5,8}-\d{1,2})\s+' + LEGACY_DESCRIPTION_AND_VALUES, re.I | re.M),
+]
+
+WORDS = ['CONSULTA', 'RADIOGRAFIA', 'DE', 'RODILLA', 'AP', 'LATE', 'VENDA', 'ELÁSTICA', 'Ñ', 'X',
+         '3', '10%', '(ADULTO)', 'N#2', 'S/N', '1,5', '2.0', 'A-B', '_', '12345']
+SPACES = [' ', ' ', ' ', '  ', '\t', ' \t ']
+MONEY = ['$120,000', '120,000', '$5.000', '$0', '0', '1.234.567', '$', ',', '.']
+
+
+class Command(BaseCommand):
+    help = 'Fuzz de los patrones de procedimientos: igualdad con los anteriores y tiempos con líneas adversas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cases',
+            type=int,
+            default=50000,
+            help='Líneas aleatorias comparadas contra los patrones anteriores'
+        )
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='*',
+            default=[500, 2000, 4000],
+            help='Largos de las líneas adversas'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=18,
+            help='Semilla del generador'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        matched = 0
+        for _ in range(options['cases']):
+            line = self._random_row(rng)
+            for name, legacy in LEGACY_PATTERNS.items():
+                current = getattr(soat_patterns, name)
+                expected = legacy.match(line)
+                found = current.match(line)
+                if (expected and expected.groups()) != (found and found.groups()):
+                    raise CommandError(f'{name} no coincide con el patrón anterior en {line!r}')
+                matched += bool(expected)
+
+            # Texto completo: igual al anterior mientras no haya saltos de línea de por medio
+            text = line.replace('\n', ' ')
+            for legacy, current in zip(LEGACY_FULL_TEXT_PATTERNS, soat_patterns.PROCEDURE_FULL_TEXT_PATTERNS):
+                expected = [m.groups() for m in legacy.finditer(text)]
+                found = [m.groups() for m in current.finditer(text)]
+                if expected != found and self._words_in_matches(expected) <= soat_patterns.MAX_FULL_TEXT_DESCRIPTION_WORDS:
+                    raise CommandError(f'El patrón de texto completo no coincide con el anterior en {text!r}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['cases']} líneas aleatorias ({matched} coincidencias) iguales a los patrones anteriores"
+        ))
+
+        self.stdout.write(f"{'Caso adverso':<28} {'Largo':>7} {'Antes (ms)':>11} {'Ahora (ms)':>11}")
+        for size in options['sizes']:
+            for name, target, legacy, current in self._adversarial_cases(size):
+                legacy_ms = self._time(legacy, target)
+                current_ms = self._time(current, target)
+                self.stdout.write(f'{name:<28} {len(target):>7} {legacy_ms:>11.2f} {current_ms:>11.2f}')
+
+        # El presupuesto corta la tabla y conserva las filas ya leídas
+        lines = [f'{10000 + i} CONSULTA DE CONTROL {i} 1 $120,000 $100,000 $20,000' for i in range(200000)]
+        budget = RegexBudget(0.05)
+        started = time.perf_counter()
+        rows = LineTableParser().parse(lines, 0, len(lines), budget)
+        elapsed = time.perf_counter() - started
+        if not budget.exceeded:
+            raise CommandError('El presupuesto de 50 ms no se agotó con 200.000 líneas')
+        self.stdout.write(self.style.SUCCESS(
+            f'Presupuesto de 50 ms: {len(rows)} de {len(lines)} filas en {elapsed * 1000:.0f} ms'
+        ))
+
+    def _words_in_matches(self, groups):
+        return max((len(g[1].split()) for g in groups), default=0)
+
+    def _time(self, run, target, repeat=3):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run(target)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _adversarial_cases(self, size):
+        def line_match(pattern):
+            return pattern.match
+
+        def full_text(patterns):
+            return lambda text: [list(pattern.finditer(text)) for pattern in patterns]
+
+        legacy_line = line_match(LEGACY_PATTERNS['PROCEDURE_LINE_PATTERN'])
+        current_line = line_match(soat_patterns.PROCEDURE_LINE_PATTERN)
+        legacy_full = full_text(LEGACY_FULL_TEXT_PATTERNS)
+        current_full = full_text(soat_patterns.PROCEDURE_FULL_TEXT_PATTERNS)
+
+        return [
+            ('espacios antes del valor', '12345 A' + ' ' * size + '1', legacy_line, current_line),
+            ('espacios entre valores', '12345 A 1 ' + '\t ' * (size // 2) + '$1 $1', legacy_line, current_line),
+            ('palabras sin valores', '12345 ' + 'AB ' * (size // 3), legacy_line, current_line),
+            ('números sin cerrar', '12345 A ' + '1 $1 x ' * (size // 7), legacy_line, current_line),
+            ('códigos sin valores', '\n'.join('12345 DESCRIPCION LARGA' for _ in range(size // 24)),
+             legacy_full, current_full),
+            ('códigos en una línea', '12345 AB ' * (size // 9), legacy_full, current_full),
+        ]
+
+    def _random_row(self, rng):
+        """Fila de tabla con variaciones: espacios, tokens de más o de menos, símbolos sueltos"""
+        code = rng.choice(['12345', '1234567-12', '', '1234', '12345-1'])
+        words = [rng.choice(WORDS) for _ in range(rng.randint(0, 6))]
+        values = [rng.choice(['1', '2', '1.5', '0', 'x'])] + [rng.choice(MONEY) for _ in range(rng.randint(0, 4))]
+        tail = rng.choice(['', '', '4567 >> SE OBJETA', 'NO PERTINENTE', '$1 $2', '\n1 $1 $1 $1'])
+        tokens = [code] + words + values + [tail]
+
+        for _ in range(rng.randint(0, 3)):
+            roll = rng.random()
+            if roll < 0.3 and tokens:
+                tokens.pop(rng.randrange(len(tokens)))
+            elif roll < 0.6:
+                tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(WORDS + MONEY))
+            else:
+                tokens.insert(rng.randrange(len(tokens) + 1), '')
+
+        line = ''.join(token + rng.choice(SPACES) for token in tokens)
+        return line if rng.random() < 0.5 else line.strip()
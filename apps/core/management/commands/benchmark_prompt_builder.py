@@ -0,0 +1,124 @@
+# ==========================================
+# apps/core/management/commands/benchmark_prompt_builder.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import re
+import time
+
+from apps.extractor.prompt_builder import (
+    DOCUMENT_INSTRUCTIONS, DOCUMENT_RESPONSE_FORMAT, TRUNCATED_TABLE_NOTE,
+    build_document_prompt, estimate_tokens,
+)
+
+# Corte fijo del prompt anterior
+LEGACY_TEXT_CHARS = 8000
+
+
+def _legacy_prompt(text):
+    """Prompt anterior: mismas instrucciones con los primeros 8000 caracteres del texto"""
+    return f"{DOCUMENT_INSTRUCTIONS}\nTEXTO DEL DOCUMENTO:\n{text[:LEGACY_TEXT_CHARS]}\n\n{DOCUMENT_RESPONSE_FORMAT}"
+
+
+class Command(BaseCommand):
+    help = 'Tokens y procedimientos incluidos en el prompt de documento: corte por caracteres contra presupuesto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procedures',
+            type=int,
+            nargs='+',
+            default=[20, 80, 200],
+            help='Procedimientos de cada documento sintético'
+        )
+        parser.add_argument(
+            '--max-input-tokens',
+            type=int,
+            default=6000,
+            help='Presupuesto de tokens del texto del documento'
+        )
+
+    def handle(self, *args, **options):
+        budget = options['max_input_tokens']
+        known_data = {
+            'patient_info': {'nombre': 'JUAN PEREZ GOMEZ', 'documento': '1234567890', 'tipo_documento': 'CC'},
+            'policy_info': {'numero_liquidacion': 'GNS-LIQ-123456', 'poliza': '987654321',
+                            'numero_reclamacion': 'ABC123'},
+            'financial_summary': {'total_reclamado': 2400000, 'total_objetado': 400000},
+        }
+
+        self.stdout.write(f'Presupuesto: {budget} tokens de documento')
+        self.stdout.write(
+            f"{'Procedimientos':>14} {'Modo':<22} {'Tokens':>7} {'Incluidos':>10} {'Secciones':<28} {'ms':>6}"
+        )
+        for procedures in options['procedures']:
+            text = self._build_synthetic_text(procedures)
+            codes = [str(10000 + i) for i in range(procedures)]
+
+            legacy = _legacy_prompt(text)
+            self._row(procedures, 'Primeros 8000 chars', estimate_tokens(legacy), self._included(legacy, codes),
+                      procedures, 'texto', 0.0)
+
+            for mode, data in (('Presupuesto', None), ('Presupuesto + regex', known_data)):
+                started = time.perf_counter()
+                prompt = build_document_prompt(text, data, budget)
+                elapsed = (time.perf_counter() - started) * 1000
+
+                if prompt.document_tokens > budget:
+                    raise CommandError(f'{mode}: {prompt.document_tokens} tokens de documento superan {budget}')
+                included = self._included(prompt.text, codes)
+                if prompt.truncated != (TRUNCATED_TABLE_NOTE in prompt.text) or (
+                        not prompt.truncated and included != procedures):
+                    raise CommandError(f'{mode}: {included} de {procedures} procedimientos sin nota de corte')
+                if (data or prompt.truncated) and ('encabezado' in prompt.sections or 'pie' in prompt.sections):
+                    raise CommandError(f'{mode}: encabezado o pie ocupando presupuesto de la tabla')
+
+                self._row(procedures, mode, prompt.tokens, included, procedures, ','.join(prompt.sections), elapsed)
+
+        self._check_without_table()
+
+    def _check_without_table(self):
+        """Sin tabla identificable se empaca el texto desde el inicio dentro del presupuesto"""
+        text = '\n'.join(f'LINEA DE TEXTO LIBRE NUMERO {i} SIN TABLA' for i in range(2000))
+        prompt = build_document_prompt(text, max_input_tokens=500)
+        if prompt.sections != ['texto'] or prompt.document_tokens > 500 or not prompt.truncated:
+            raise CommandError(f'Sin tabla: {prompt.sections}, {prompt.document_tokens} tokens')
+        self.stdout.write(self.style.SUCCESS(
+            f'Sin tabla: {prompt.table_lines} de {prompt.table_lines_total} líneas en {prompt.document_tokens} tokens'
+        ))
+
+    def _row(self, procedures, mode, tokens, included, total, sections, elapsed):
+        self.stdout.write(
+            f'{procedures:>14} {mode:<22} {tokens:>7} {f"{included}/{total}":>10} {sections:<28} {elapsed:>6.2f}'
+        )
+
+    def _included(self, prompt, codes):
+        present = set(re.findall(r'\b1\d{4}\b', prompt))
+        return sum(1 for code in codes if code in present)
+
+    def _build_synthetic_text(self, procedures):
+        lines = [
+            'Señores: CLINICA DEMO IPS SAS',
+            'Liquidación de siniestro No. GNS-LIQ-123456',
+            'Víctima : CC - 1234567890 - JUAN PEREZ GOMEZ',
+            'Número de reclamación: ABC123  Póliza : 987654321',
+            'Fecha de siniestro: 01/02/2024  Fecha de ingreso: 02/02/2024',
+            'DX : S836  NIT - 900123456',
+        ]
+        # Texto legal del encabezado que ocupa caracteres sin aportar datos
+        lines.extend(
+            f'De conformidad con el numeral {i} del Decreto 780 de 2016 se informa el resultado de la auditoría.'
+            for i in range(25)
+        )
+        lines.append('Código Descripción Cant Valor total Valor pagado Valor objetado Observación')
+        for i in range(procedures):
+            lines.append(
+                f'{10000 + i} CONSULTA DE CONTROL ESPECIALIZADA {i} 1 $120,000 $100,000 $20,000'
+            )
+            if i % 3 == 0:
+                lines.append('4567 >> SE OBJETA POR NO PERTINENCIA MEDICA')
+        lines.append(f'Total ${procedures * 120000:,}')
+        lines.append(f'Valor de Reclamación: ${procedures * 120000:,}')
+        lines.append(f'Valor objetado: ${procedures * 20000:,}')
+        lines.append('Página 1 de 1')
+        return "\n".join(lines)
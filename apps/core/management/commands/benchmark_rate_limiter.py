@@ -0,0 +1,135 @@
+# ==========================================
+# apps/core/management/commands/benchmark_rate_limiter.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+from types import SimpleNamespace
+import threading
+import time
+
+from apps.extractor.rate_limiter import RedisTokenBucketLimiter, create_chat_completion, estimate_request_tokens
+
+BENCHMARK_PREFIX = 'openai_rate_limit_benchmark'
+
+
+class _StandInCompletions:
+    """chat.completions local: tarda latency segundos y reporta used_tokens en usage"""
+
+    def __init__(self, latency, used_tokens):
+        self.latency = latency
+        self.used_tokens = used_tokens
+        self.started = []
+        self._lock = threading.Lock()
+
+    def create(self, **request):
+        with self._lock:
+            self.started.append(time.monotonic())
+        time.sleep(self.latency)
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=self.used_tokens))
+
+
+class _BrokenRedis:
+    """Redis caído: cada script falla"""
+
+    def register_script(self, script):
+        def run(**kwargs):
+            raise ConnectionError('Redis no disponible')
+        return run
+
+
+class Command(BaseCommand):
+    help = 'Workers simulados contra el limitador compartido de OpenAI (Redis real o fakeredis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--redis-url',
+            default='',
+            help='Redis a usar; sin valor se usa fakeredis en memoria'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Workers simulados (cada uno con su propio limitador)'
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=10.0,
+            help='Duración de cada modo'
+        )
+        parser.add_argument(
+            '--rpm',
+            type=int,
+            default=600,
+            help='Requests por minuto del bucket'
+        )
+        parser.add_argument(
+            '--tpm',
+            type=int,
+            default=60000,
+            help='Tokens por minuto del bucket'
+        )
+
+    def handle(self, *args, **options):
+        redis_client = self._redis_client(options['redis_url'])
+        rpm, tpm = options['rpm'], options['tpm']
+        messages = [{'role': 'user', 'content': 'x' * 2000}]
+        estimated = estimate_request_tokens(messages, 500)
+
+        self.stdout.write(f'Límites: {rpm} req/min, {tpm} tokens/min; {estimated} tokens estimados por llamada')
+        self.stdout.write(f"{'Modo':<34} {'Llamadas':>9} {'req/min':>9} {'tokens/min':>11}")
+        for mode, used_tokens in (('Sin ajuste (usa lo estimado)', estimated), ('Ajuste con response.usage', 300)):
+            # Claves propias del benchmark: no toca los buckets reales ni el broker
+            redis_client.delete(*[f'{{{BENCHMARK_PREFIX}}}:{key}' for key in ('requests', 'tokens')])
+            completions = _StandInCompletions(0.05, used_tokens)
+            client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+            # Bucket vacío al empezar: se mide el ritmo sostenido, no la ráfaga inicial
+            RedisTokenBucketLimiter(redis_client, rpm, tpm, key_prefix=BENCHMARK_PREFIX).acquire(tpm)
+
+            started = time.monotonic()
+            deadline = started + options['seconds']
+
+            def worker():
+                limiter = RedisTokenBucketLimiter(redis_client, rpm, tpm, max_wait=60, key_prefix=BENCHMARK_PREFIX)
+                while time.monotonic() < deadline:
+                    create_chat_completion(client, limiter, model='gpt-4o-mini', messages=messages, max_tokens=500)
+
+            threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+
+            total = len(completions.started)
+            tokens_per_minute = total * used_tokens / elapsed * 60
+            requests_per_minute = total / elapsed * 60
+            # Margen de una llamada por worker en vuelo al terminar
+            slack = options['workers'] * used_tokens / elapsed * 60
+            if tokens_per_minute > tpm + slack or requests_per_minute > rpm + options['workers'] / elapsed * 60:
+                raise CommandError(f'{mode}: {requests_per_minute:.0f} req/min y {tokens_per_minute:.0f} '
+                                   f'tokens/min superan el límite')
+
+            self.stdout.write(f'{mode:<34} {total:>9} {requests_per_minute:>9.0f} {tokens_per_minute:>11.0f}')
+
+        # Con Redis caído se llama igual, sin límite
+        limiter = RedisTokenBucketLimiter(_BrokenRedis(), rpm, tpm)
+        completions = _StandInCompletions(0, 10)
+        create_chat_completion(SimpleNamespace(chat=SimpleNamespace(completions=completions)), limiter,
+                               model='gpt-4o-mini', messages=messages, max_tokens=10)
+        if len(completions.started) != 1:
+            raise CommandError('Con Redis caído la llamada no se hizo')
+        self.stdout.write(self.style.SUCCESS('Con Redis caído las llamadas siguen sin límite'))
+
+    def _redis_client(self, redis_url):
+        if redis_url:
+            import redis
+            return redis.Redis.from_url(redis_url)
+
+        try:
+            import fakeredis
+        except ImportError:
+            raise CommandError('Instalar fakeredis[lua] o indicar --redis-url')
+        return fakeredis.FakeRedis()
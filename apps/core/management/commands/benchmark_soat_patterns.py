@@ -0,0 +1,219 @@
+# ==========================================
+# apps/core/management/commands/benchmark_soat_patterns.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import os
+import random
+import re
+import time
+
+from apps.extractor import soat_patterns
+from apps.extractor.document_regions import segment_document
+from apps.extractor.medical_claim_extractor_fixed import MedicalClaimExtractor
+from apps.extractor.parallel_scanner import scan_page_texts
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de regex por documento con patrones en texto contra el registro compilado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procedures',
+            type=int,
+            default=40,
+            help='Procedimientos del documento sintético'
+        )
+        parser.add_argument(
+            '--pdf',
+            type=str,
+            help='Usar el texto de un PDF real en lugar del sintético'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Documentos procesados por modo'
+        )
+
+    def handle(self, *args, **options):
+        if options['pdf']:
+            if not os.path.exists(options['pdf']):
+                raise CommandError(f"El archivo {options['pdf']} no existe")
+            text = "\n".join(scan_page_texts(options['pdf']))
+        else:
+            text = self._build_synthetic_text(options['procedures'])
+
+        iterations = max(options['iterations'], 1)
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        workload = self._build_workload()
+
+        # Ambos modos deben encontrar exactamente lo mismo
+        if self._run_compiled(workload, text, lines) != self._run_legacy(workload, text, lines):
+            raise CommandError('Los patrones compilados no coinciden con los originales')
+
+        self.stdout.write(
+            f'Texto: {len(text)} caracteres, {len(lines)} líneas, {len(workload)} patrones, {iterations} documentos'
+        )
+        self.stdout.write(f"{'Modo':<34} {'ms/documento':>13}")
+
+        cold = self._time(lambda: (re.purge(), self._run_legacy(workload, text, lines)), iterations)
+        legacy = self._time(lambda: self._run_legacy(workload, text, lines), iterations)
+        compiled = self._time(lambda: self._run_compiled(workload, text, lines), iterations)
+
+        self.stdout.write(f"{'Antes (caché de re vacía)':<34} {cold * 1000:>13.3f}")
+        self.stdout.write(f"{'Antes (caché de re caliente)':<34} {legacy * 1000:>13.3f}")
+        self.stdout.write(self.style.SUCCESS(f"{'Registro compilado':<34} {compiled * 1000:>13.3f}"))
+
+        # Costo de crear un extractor por documento (descargas y CSV consolidado)
+        legacy_init = self._time(self._legacy_pattern_tables, iterations * 10)
+        current_init = self._time(MedicalClaimExtractor, iterations * 10)
+
+        self.stdout.write(f"{'Instanciar extractor (antes)':<34} {legacy_init * 1e6:>10.1f} µs")
+        self.stdout.write(self.style.SUCCESS(f"{'Instanciar extractor (ahora)':<34} {current_init * 1e6:>10.1f} µs"))
+
+        # Campos de encabezado y pie sobre el texto completo contra su región
+        extractor = MedicalClaimExtractor()
+        full_text = self._time(lambda: self._extract_fields(extractor, text, text), iterations)
+        by_region = self._time(lambda: self._extract_fields_by_region(extractor, text), iterations)
+
+        self.stdout.write(f"{'Campos sobre texto completo':<34} {full_text * 1000:>13.3f}")
+        self.stdout.write(self.style.SUCCESS(f"{'Campos por región (con segmentar)':<34} {by_region * 1000:>13.3f}"))
+
+        # Campos de póliza: búsquedas en secuencia contra el escáner de una pasada
+        rng = random.Random(15)
+        for _ in range(2000):
+            header = self._build_random_header(rng)
+            if soat_patterns.POLICY_FIELD_SCANNER.scan(header) != self._policy_sequential(header):
+                raise CommandError(f'El escáner de póliza no coincide con la búsqueda en secuencia:\n{header}')
+
+        header = segment_document(text).header
+        sequential = self._time(lambda: self._policy_sequential(header), iterations * 10)
+        scanned = self._time(lambda: soat_patterns.POLICY_FIELD_SCANNER.scan(header), iterations * 10)
+
+        self.stdout.write(f"{'Póliza en secuencia':<34} {sequential * 1e6:>10.1f} µs")
+        self.stdout.write(self.style.SUCCESS(f"{'Póliza en una pasada':<34} {scanned * 1e6:>10.1f} µs"))
+
+    def _policy_sequential(self, text):
+        policy_info = {}
+        for key, patterns in soat_patterns.POLICY_PATTERNS.items():
+            for pattern in patterns:
+                match = pattern.search(text)
+                if match:
+                    policy_info[key] = match.group(1).strip()
+                    break
+        return policy_info
+
+    def _build_random_header(self, rng):
+        """Encabezado con fragmentos de póliza en orden, mayúsculas y formatos variados"""
+        date = f'{rng.randint(1, 31)}/{rng.randint(1, 12)}/{rng.randint(2015, 2025)}'
+        fragments = [
+            f'Liquidación de siniestro No. GNS-LIQ-{rng.randint(1, 99999)}',
+            f'LIQUIDACIÓN DE SINIESTRO NO. {rng.randint(1, 999)}',
+            f'LIQ-{rng.randint(1, 99999)}', f'GNS-LIQ-{rng.randint(1, 99999)}',
+            f'Póliza : {rng.randint(1, 10 ** 9)}', f'POLIZA: {rng.randint(1, 10 ** 9)}',
+            f'Número de reclamación: R{rng.randint(1, 99999)}', f'reclamación : {rng.randint(1, 999)}',
+            f'Fecha de siniestro: {date}', f'siniestro: {date}',
+            f'Fecha de ingreso : {date}', f'ingreso: {date}',
+            f'Fecha de Pago: {date}', f'PAGO : {date}',
+            f'Orden de pago: {rng.randint(1, 99999)}', f'pago: {rng.randint(1, 99999)}',
+            'Víctima : CC - 123456 - ANA MARIA', 'Página 1 de 2', 'Fecha: sin dato', 'Orden: N/A',
+        ]
+        picked = rng.sample(fragments, rng.randint(0, len(fragments)))
+        return rng.choice(['\n', ' ', '  ']).join(picked)
+
+    def _extract_fields(self, extractor, header, footer):
+        extractor._extract_patient_info(header)
+        extractor._extract_policy_info(header)
+        extractor._extract_financial_summary(footer)
+        extractor._extract_diagnostics(header)
+        extractor._extract_ips_info(header)
+
+    def _extract_fields_by_region(self, extractor, text):
+        regions = segment_document(text)
+        self._extract_fields(extractor, regions.header, regions.footer)
+
+    def _time(self, func, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) / iterations
+
+    def _build_workload(self):
+        """(patrón, método, por_línea) con los usos de un documento típico"""
+        workload = []
+
+        for group in (soat_patterns.PATIENT_PATTERNS, soat_patterns.POLICY_PATTERNS,
+                      soat_patterns.FINANCIAL_TOTALS_PATTERNS, soat_patterns.HEADER_PATIENT_PATTERNS,
+                      soat_patterns.HEADER_POLICY_PATTERNS, soat_patterns.FOOTER_TOTALS_PATTERNS):
+            for patterns in group.values():
+                workload.extend((pattern, 'search', False) for pattern in patterns)
+
+        workload.extend((pattern, 'findall', False) for pattern in soat_patterns.DIAGNOSTIC_PATTERNS)
+        workload.extend((pattern, 'search', False) for pattern in soat_patterns.IPS_PATTERNS)
+        workload.append((soat_patterns.IPS_NIT_PATTERN, 'search', False))
+        workload.append((soat_patterns.VICTIM_PATTERN, 'search', False))
+        workload.append((soat_patterns.TOTALS_LINE_PATTERN, 'findall', False))
+
+        # Patrones evaluados línea por línea sobre la tabla
+        for pattern in (soat_patterns.TABLE_HEADER_PATTERN, soat_patterns.TABLE_TOTAL_PATTERN,
+                        soat_patterns.TABLE_CLAIM_VALUE_PATTERN, soat_patterns.PROCEDURE_LINE_PATTERN,
+                        soat_patterns.PROCEDURE_COMPOUND_LINE_PATTERN, soat_patterns.OBSERVATION_TRAILING_PATTERN,
+                        soat_patterns.OBSERVATION_CODED_PATTERN, soat_patterns.CODE_PREFIX_PATTERN,
+                        soat_patterns.OBSERVATION_CODE_PREFIX_PATTERN, soat_patterns.WHITESPACE_PATTERN,
+                        soat_patterns.MONEY_SYMBOLS_PATTERN):
+            workload.append((pattern, 'match' if pattern.pattern.startswith('^') else 'search', True))
+
+        return workload
+
+    def _run_compiled(self, workload, text, lines):
+        found = 0
+        for pattern, method, per_line in workload:
+            run = getattr(pattern, method)
+            for target in (lines if per_line else (text,)):
+                if run(target):
+                    found += 1
+        return found
+
+    def _run_legacy(self, workload, text, lines):
+        # Como antes: cadena del patrón y flags en cada llamada
+        found = 0
+        for pattern, method, per_line in workload:
+            run = getattr(re, method)
+            source, flags = pattern.pattern, pattern.flags
+            for target in (lines if per_line else (text,)):
+                if run(source, target, flags):
+                    found += 1
+        return found
+
+    def _legacy_pattern_tables(self):
+        """Reconstruye los diccionarios de cadenas como lo hacía _setup_soat_patterns"""
+        return (
+            {key: [p.pattern for p in patterns] for key, patterns in soat_patterns.PATIENT_PATTERNS.items()},
+            {key: [p.pattern for p in patterns] for key, patterns in soat_patterns.POLICY_PATTERNS.items()},
+            [p.pattern for p in soat_patterns.DIAGNOSTIC_PATTERNS],
+            {key: [p.pattern for p in patterns] for key, patterns in soat_patterns.FINANCIAL_TOTALS_PATTERNS.items()},
+            [p.pattern for p in soat_patterns.IPS_PATTERNS],
+        )
+
+    def _build_synthetic_text(self, procedures):
+        lines = [
+            'Señores: CLINICA DEMO IPS SAS',
+            'Liquidación de siniestro No. GNS-LIQ-123456',
+            'Víctima : CC - 1234567890 - JUAN PEREZ GOMEZ',
+            'Número de reclamación: ABC123  Póliza : 987654321',
+            'Fecha de siniestro: 01/02/2024  Fecha de ingreso: 02/02/2024',
+            'DX : S836  NIT - 900123456',
+            'Código Descripción Cant Valor total Valor pagado Valor objetado Observación',
+        ]
+        for i in range(procedures):
+            lines.append(
+                f'{10000 + i} CONSULTA DE CONTROL ESPECIALIZADA {i} 1 $120,000 $100,000 $20,000'
+            )
+            if i % 3 == 0:
+                lines.append('4567 >> SE OBJETA POR NO PERTINENCIA MEDICA')
+        lines.append(f'Total ${procedures * 120000:,}')
+        lines.append(f'Valor de Reclamación: ${procedures * 120000:,}')
+        lines.append(f'Valor objetado: ${procedures * 20000:,}')
+        lines.append('Página 1 de 1')
+        return "\n".join(lines)
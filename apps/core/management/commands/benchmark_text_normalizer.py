@@ -0,0 +1,101 @@
+# ==========================================
+# apps/core/management/commands/benchmark_text_normalizer.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import random
+import time
+
+from apps.extractor.text_normalizer import (
+    MemoizedCleaner, TextNormalizer, clean_description, clean_observation,
+)
+
+ITEMS = [
+    'RADIOGRAFIA DE RODILLA AP LATE', 'VENDA ELASTICA 4X5', 'CONSULTA DE URGENCIAS POR MEDICINA GENERAL',
+    'HEMOGRAMA IV', 'SUTURA DE HERIDA   UNICA  ', 'TOMOGRAFIA COMPUTADA DE CRANEO SIMPLE',
+    'Curación de herida', 'INYECCION INTRAMUSCULAR 1234 >> SE OBJETA', 'ACETAMINOFEN 500 MG $1,200',
+]
+OBSERVATIONS = [
+    '4567 >> NO PERTINENTE', '>> SE GLOSA POR TARIFA', '  VALOR SUPERIOR AL PACTADO  ', '',
+    '>>   NO CORRESPONDE AL MANUAL TARIFARIO SOAT',
+]
+
+
+class Command(BaseCommand):
+    help = 'Igualdad y tasa de aciertos de la caché de descripciones y observaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procedures',
+            type=int,
+            default=200000,
+            help='Procedimientos simulados (descripción + observación)'
+        )
+        parser.add_argument(
+            '--unique',
+            type=int,
+            default=5000,
+            help='Descripciones distintas del corpus simulado'
+        )
+        parser.add_argument(
+            '--cache-size',
+            type=int,
+            default=20000,
+            help='Entradas de cada caché'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=20,
+            help='Semilla del generador'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Corpus con pocas descripciones muy frecuentes y una cola larga (tipo Zipf)
+        vocabulary = ITEMS + [
+            f"{rng.choice(ITEMS)} {i}" if i % 3 else f"{rng.choice(ITEMS).lower()} {i}"
+            for i in range(max(options['unique'] - len(ITEMS), 0))
+        ]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        descriptions = rng.choices(vocabulary, weights, k=options['procedures'])
+        observations = rng.choices(OBSERVATIONS + [f'{o} {i}' for o in OBSERVATIONS for i in range(50)],
+                                   k=options['procedures'])
+
+        normalizer = TextNormalizer(options['cache_size'])
+        for description, observation in zip(descriptions, observations):
+            if normalizer.description(description) != clean_description(description):
+                raise CommandError(f'Descripción distinta con caché: {description!r}')
+            if normalizer.observation(observation) != clean_observation(observation):
+                raise CommandError(f'Observación distinta con caché: {observation!r}')
+
+        # Una caché pequeña desaloja y sigue dando lo mismo
+        small = MemoizedCleaner(clean_description, 16)
+        for description in descriptions[:20000]:
+            if small(description) != clean_description(description):
+                raise CommandError(f'Descripción distinta tras desalojo: {description!r}')
+        if small.stats()['entries'] > 16:
+            raise CommandError('La caché superó su tamaño máximo')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['procedures']} procedimientos iguales con y sin caché"
+        ))
+        for name, stats in normalizer.stats().items():
+            self.stdout.write(
+                f"  {name:<12} {stats['entries']:>7} entradas  {stats['hits']:>8} aciertos  "
+                f"{stats['misses']:>7} fallos  ({stats['hit_rate']:.1%})"
+            )
+
+        warm = TextNormalizer(options['cache_size'])
+        self.stdout.write(f"{'Modo':<24} {'µs/procedimiento':>18}")
+        for name, description_clean, observation_clean in (
+            ('Sin caché', clean_description, clean_observation),
+            ('Caché LRU por proceso', warm.description, warm.observation),
+        ):
+            started = time.perf_counter()
+            for description, observation in zip(descriptions, observations):
+                description_clean(description)
+                observation_clean(observation)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{name:<24} {elapsed / len(descriptions) * 1e6:>18.2f}')
@@ -0,0 +1,125 @@
+# ==========================================
+# apps/core/management/commands/split_storage_report.py
+# ==========================================
+
+from django.core.management.base import BaseCommand, CommandError
+import os
+
+import fitz  # PyMuPDF
+
+from apps.core.models import GlosaDocument
+from apps.extractor.pdf_splitter import GlosaPDFSplitter
+
+
+class Command(BaseCommand):
+    help = 'Compara el tamaño del PDF padre contra la suma de sus secciones divididas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pdf',
+            type=str,
+            help='Dividir un PDF local y comparar la salida sin optimizar contra la optimizada'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Número máximo de documentos maestros a revisar en la base de datos'
+        )
+
+    def handle(self, *args, **options):
+        if options['pdf']:
+            if not os.path.exists(options['pdf']):
+                raise CommandError(f"El archivo {options['pdf']} no existe")
+            self._report_file(options['pdf'])
+        else:
+            self._report_database(options['limit'])
+
+    def _report_file(self, pdf_path):
+        splitter = GlosaPDFSplitter()
+        analysis = splitter.analyze(pdf_path)
+
+        if len(analysis.sections) <= 1:
+            self.stdout.write(self.style.WARNING('El PDF contiene un solo paciente: no hay secciones'))
+            return
+
+        parent_size = os.path.getsize(pdf_path)
+        doc = fitz.open(pdf_path)
+        plain_total = 0
+        optimized_total = 0
+
+        try:
+            for start, end in analysis.sections:
+                # Salida anterior: páginas copiadas una a una y sin limpieza
+                plain_pdf = fitz.open()
+                for page_num in range(start, end + 1):
+                    plain_pdf.insert_pdf(doc, from_page=page_num, to_page=page_num)
+                plain_total += len(plain_pdf.tobytes())
+                plain_pdf.close()
+
+                optimized_total += len(splitter._extract_section(doc, start, end))
+        finally:
+            doc.close()
+
+        self.stdout.write(f'Secciones: {len(analysis.sections)}')
+        self.stdout.write(f'PDF padre:              {self._format_size(parent_size)}')
+        self.stdout.write(
+            f'Secciones sin optimizar: {self._format_size(plain_total)} '
+            f'({plain_total / parent_size:.2f}x del padre)'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Secciones optimizadas:   {self._format_size(optimized_total)} '
+            f'({optimized_total / parent_size:.2f}x del padre)'
+        ))
+
+    def _report_database(self, limit):
+        masters = GlosaDocument.objects.filter(is_master_document=True).order_by('-created_at')[:limit]
+
+        total_parent = 0
+        total_children = 0
+        rows = 0
+
+        self.stdout.write(f"{'Documento':<50} {'Padre':>10} {'Hijos':>10} {'Ratio':>7}")
+
+        for master in masters:
+            # Los hijos por rango comparten el archivo del padre: no ocupan disco propio
+            children = [
+                child for child in master.child_documents.all()
+                if not child.is_page_range_document and child.original_file
+            ]
+            if not children or not master.original_file:
+                continue
+
+            try:
+                parent_size = os.path.getsize(master.original_file.path)
+                children_size = sum(
+                    os.path.getsize(child.original_file.path)
+                    for child in children if os.path.exists(child.original_file.path)
+                )
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f'{master.original_filename}: {e}'))
+                continue
+
+            total_parent += parent_size
+            total_children += children_size
+            rows += 1
+
+            ratio = children_size / parent_size if parent_size else 0
+            self.stdout.write(
+                f'{master.original_filename[:50]:<50} {self._format_size(parent_size):>10} '
+                f'{self._format_size(children_size):>10} {ratio:>6.2f}x'
+            )
+
+        if rows == 0:
+            self.stdout.write('No hay documentos maestros con secciones materializadas')
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: padres {self._format_size(total_parent)}, hijos {self._format_size(total_children)} '
+            f'({total_children / total_parent:.2f}x)'
+        ))
+
+    def _format_size(self, size):
+        if size >= 1024 * 1024:
+            return f'{size / 1024 / 1024:.1f}MB'
+        return f'{size / 1024:.1f}KB'
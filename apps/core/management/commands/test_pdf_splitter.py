@@ -47,8 +47,11 @@ class Command(BaseCommand):
             # Inicializar divisor
             splitter = GlosaPDFSplitter()
 
+            # Analizar una sola vez y reutilizar en cada paso
+            analysis = splitter.analyze(pdf_path)
+
             # Validar formato
-            is_valid, validation_message = splitter.validate_pdf_format(pdf_path)
+            is_valid, validation_message = splitter.validate_pdf_format(pdf_path, analysis=analysis)
             
             if is_valid:
                 self.stdout.write(
@@ -60,7 +63,7 @@ class Command(BaseCommand):
                 )
 
             # Obtener información del PDF
-            pdf_info = splitter.get_pdf_info(pdf_path)
+            pdf_info = splitter.get_pdf_info(pdf_path, analysis=analysis)
             self.stdout.write(f'📄 Páginas totales: {pdf_info["total_pages"]}')
             self.stdout.write(f'📊 Secciones detectadas: {pdf_info["sections_detected"]}')
             self.stdout.write(f'👥 Es múltiple: {"Sí" if pdf_info["is_multi_patient"] else "No"}')
@@ -69,7 +72,7 @@ class Command(BaseCommand):
                 return
 
             # Detectar si es múltiple
-            is_multiple = splitter.detect_multiple_patients(pdf_path)
+            is_multiple = splitter.detect_multiple_patients(pdf_path, analysis=analysis)
             
             if not is_multiple:
                 self.stdout.write(
@@ -79,7 +82,7 @@ class Command(BaseCommand):
 
             # Dividir PDF
             self.stdout.write('Dividiendo PDF...')
-            sections = splitter.split_pdf(pdf_path)
+            sections = splitter.split_pdf(pdf_path, analysis=analysis)
 
             if not sections:
                 self.stdout.write(
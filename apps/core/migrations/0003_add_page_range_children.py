@@ -0,0 +1,24 @@
+# apps/core/migrations/0003_add_page_range_children.py
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_add_batch_support'),
+    ]
+
+    operations = [
+        # Ventana de páginas para documentos hijos que referencian el archivo del padre
+        migrations.AddField(
+            model_name='glosadocument',
+            name='start_page',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='glosadocument',
+            name='end_page',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# apps/core/migrations/0004_add_content_hash.py
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_page_range_children'),
+    ]
+
+    operations = [
+        # SHA-256 del archivo subido para reutilizar resultados de uploads repetidos
+        migrations.AddField(
+            model_name='glosadocument',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
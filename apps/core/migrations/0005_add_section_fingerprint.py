@@ -0,0 +1,29 @@
+# apps/core/migrations/0005_add_section_fingerprint.py
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_add_content_hash'),
+    ]
+
+    operations = [
+        # Huella del texto normalizado de cada sección para reutilizar pacientes sin cambios
+        migrations.AddField(
+            model_name='glosadocument',
+            name='section_fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='glosadocument',
+            name='is_reused_result',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='processingbatch',
+            name='reused_documents',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
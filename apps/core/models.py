@@ -41,6 +41,17 @@ class GlosaDocument(models.Model):
     patient_section_number = models.PositiveIntegerField(null=True, blank=True)
     total_sections = models.PositiveIntegerField(null=True, blank=True)
     
+    # Documentos hijos por rango: referencian el archivo del padre y su ventana de páginas
+    start_page = models.PositiveIntegerField(null=True, blank=True)
+    end_page = models.PositiveIntegerField(null=True, blank=True)
+    
+    # SHA-256 del archivo subido: permite reutilizar resultados de uploads repetidos
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    
+    # Huella del texto normalizado de la sección (documentos hijos)
+    section_fingerprint = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    is_reused_result = models.BooleanField(default=False)
+    
     class Meta:
         ordering = ['-created_at', 'patient_section_number']
     
@@ -78,6 +89,18 @@ class GlosaDocument(models.Model):
         """Verifica si es un documento con múltiples pacientes"""
         return self.is_master_document and self.child_documents.exists()
     
+    @property
+    def is_page_range_document(self):
+        """Verifica si el documento es una ventana de páginas del archivo del padre"""
+        return self.start_page is not None and self.end_page is not None
+    
+    @property
+    def page_range(self):
+        """Rango (inicio, fin) de páginas del archivo, o None si es el archivo completo"""
+        if self.is_page_range_document:
+            return (self.start_page, self.end_page)
+        return None
+    
     @property
     def get_all_related_documents(self):
         """Obtiene todos los documentos relacionados (padre + hijos)"""
@@ -113,6 +136,103 @@ class GlosaDocument(models.Model):
             'pending': children.filter(status='pending').count(),
         }
 
+    def find_reusable_result(self):
+        """
+        Busca un documento del mismo usuario ya completado con el mismo contenido y estrategia
+        Solo considera documentos raíz (no hijos de otro documento); un maestro solo sirve si
+        su batch terminó sin errores, para que volver a subir el PDF reintente los pacientes fallidos
+        """
+        if not self.content_hash:
+            return None
+        
+        return GlosaDocument.objects.filter(
+            models.Q(is_master_document=False) | models.Q(processing_batch__batch_status='completed'),
+            user=self.user,
+            content_hash=self.content_hash,
+            strategy=self.strategy,
+            status='completed',
+            parent_document__isnull=True
+        ).exclude(
+            child_documents__status__in=['pending', 'processing', 'error']
+        ).exclude(id=self.id).order_by('-updated_at').first()
+    
+    def reuse_section_result(self):
+        """
+        Si ya existe un hijo completado del mismo usuario con la misma huella de sección y
+        estrategia, copia sus datos extraídos y retorna True (no hace falta procesar este hijo)
+        """
+        if not self.section_fingerprint:
+            return False
+        
+        source = GlosaDocument.objects.filter(
+            user=self.user,
+            section_fingerprint=self.section_fingerprint,
+            strategy=self.strategy,
+            status='completed',
+            extracted_data__isnull=False
+        ).exclude(id=self.id).order_by('-updated_at').first()
+        
+        if source is None:
+            return False
+        
+        self.extracted_data = source.extracted_data
+        self.status = 'completed'
+        self.is_reused_result = True
+        self.save()
+        return True
+    
+    def clone_results_from(self, source):
+        """
+        Copia los datos extraídos de source (y su estructura de hijos si es múltiple)
+        sin volver a procesar el documento
+        """
+        self.extracted_data = source.extracted_data
+        self.status = 'completed'
+        self.error_message = None
+        self.is_master_document = source.is_master_document
+        self.total_sections = source.total_sections
+        self.save()
+        
+        if not source.is_master_document:
+            return
+        
+        children = list(source.child_documents.all().order_by('patient_section_number'))
+        
+        for child in children:
+            GlosaDocument.objects.create(
+                user=self.user,
+                parent_document=self,
+                status=child.status,
+                strategy=child.strategy,
+                # Los hijos por rango apuntan al archivo recién subido; los materializados comparten su PDF
+                original_file=self.original_file.name if child.is_page_range_document else child.original_file.name,
+                original_filename=f"{self.original_filename}_paciente_{child.patient_section_number}",
+                file_size=child.file_size,
+                extracted_data=child.extracted_data,
+                error_message=child.error_message,
+                patient_section_number=child.patient_section_number,
+                total_sections=child.total_sections,
+                start_page=child.start_page,
+                end_page=child.end_page,
+                content_hash=child.content_hash,
+                section_fingerprint=child.section_fingerprint,
+                is_reused_result=True
+            )
+        
+        source_batch = getattr(source, 'processing_batch', None)
+        completed = sum(1 for child in children if child.status == 'completed')
+        failed = sum(1 for child in children if child.status == 'error')
+        
+        ProcessingBatch.objects.create(
+            master_document=self,
+            total_documents=len(children),
+            completed_documents=completed,
+            failed_documents=failed,
+            reused_documents=completed,
+            batch_status=source_batch.batch_status if source_batch else 'completed',
+            completed_at=timezone.now()
+        )
+
 class ProcessingBatch(models.Model):
     """Modelo para manejar lotes de procesamiento de PDFs múltiples"""
     
@@ -133,6 +253,8 @@ class ProcessingBatch(models.Model):
     total_documents = models.PositiveIntegerField()
     completed_documents = models.PositiveIntegerField(default=0)
     failed_documents = models.PositiveIntegerField(default=0)
+    # Hijos completados reutilizando el resultado de una sección idéntica
+    reused_documents = models.PositiveIntegerField(default=0)
     batch_status = models.CharField(
         max_length=20,
         choices=BATCH_STATUS_CHOICES,
@@ -155,6 +277,11 @@ class ProcessingBatch(models.Model):
             return 0
         return round((self.completed_documents / self.total_documents) * 100, 1)
     
+    @property
+    def processed_documents(self):
+        """Documentos completados que sí pasaron por extracción"""
+        return max(self.completed_documents - self.reused_documents, 0)
+    
     @property
     def is_complete(self):
         """Verifica si el batch está completamente procesado"""
@@ -173,6 +300,15 @@ class ProcessingBatch(models.Model):
         self.total_documents = children.count()
         self.completed_documents = children.filter(status='completed').count()
         self.failed_documents = children.filter(status='error').count()
+        self.reused_documents = children.filter(status='completed', is_reused_result=True).count()
+        
+        # Mientras se divide el PDF el total no es definitivo: no cerrar el batch
+        # (update_fields para no pisar el cambio de estado que hace la tarea de división)
+        if self.batch_status == 'splitting':
+            self.save(update_fields=[
+                'total_documents', 'completed_documents', 'failed_documents', 'reused_documents'
+            ])
+            return
         
         # Actualizar estado del batch
         if self.completed_documents + self.failed_documents >= self.total_documents:
@@ -0,0 +1,32 @@
+# apps/core/upload_handlers.py
+"""
+Handlers de upload de la aplicación
+Calculan el hash del archivo mientras se recibe, sin releerlo después
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """
+    Calcula el SHA-256 de cada archivo a medida que llegan los chunks
+    y lo deja en request.upload_content_hashes[nombre_del_campo]
+    No guarda el archivo: pasa los datos a los siguientes handlers
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_content_hashes'):
+            self.request.upload_content_hashes = {}
+        self.request.upload_content_hashes[self.field_name] = self._digest.hexdigest()
+        # None: el archivo lo construye el siguiente handler
+        return None
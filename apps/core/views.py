@@ -5,10 +5,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse, Http404
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q, Count, Avg, Sum
 from django.utils import timezone
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files import File
+import hashlib
 import json
 import os
 import logging
@@ -23,6 +25,7 @@ from .forms import GlosaUploadForm
 # Importar el extractor mejorado y el divisor de PDFs
 from apps.extractor.medical_claim_extractor_fixed import MedicalClaimExtractor
 from apps.extractor.pdf_splitter import GlosaPDFSplitter
+from apps.extractor.money import parse_money
 
 logger = logging.getLogger(__name__)
 
@@ -48,9 +51,17 @@ def upload_glosa(request):
                 uploaded_file = request.FILES['original_file']
                 master_glosa.original_filename = uploaded_file.name
                 master_glosa.file_size = uploaded_file.size
+                master_glosa.content_hash = _uploaded_file_hash(request, uploaded_file)
                 
                 master_glosa.save()
                 
+                # Mismo archivo ya procesado con la misma estrategia: reutilizar sin llamar a OpenAI
+                force_reprocess = form.cleaned_data.get('force_reprocess', False)
+                if not force_reprocess:
+                    source_glosa = master_glosa.find_reusable_result()
+                    if source_glosa:
+                        return reuse_existing_results(request, master_glosa, source_glosa)
+                
                 # Log de inicio
                 ProcessingLog.objects.create(
                     glosa=master_glosa,
@@ -59,7 +70,7 @@ def upload_glosa(request):
                 )
                 
                 # PROCESAMIENTO COMPLETAMENTE ASÍNCRONO
-                return process_pdf_splitting_async(request, master_glosa)
+                return process_pdf_splitting_async(request, master_glosa, force_reprocess=force_reprocess)
                 
             except Exception as e:
                 logger.error(f"Error subiendo glosa: {str(e)}")
@@ -73,17 +84,76 @@ def upload_glosa(request):
     return render(request, 'upload.html', {'form': form})
 
 
-def process_pdf_splitting_async(request, master_glosa):
+def _uploaded_file_hash(request, uploaded_file):
+    """SHA-256 calculado por el upload handler, o leyendo el archivo si no está configurado"""
+    content_hash = getattr(request, 'upload_content_hashes', {}).get('original_file')
+    if content_hash:
+        return content_hash
+    
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def reuse_existing_results(request, master_glosa, source_glosa):
+    """Clona los resultados de un upload idéntico ya procesado, sin encolar tareas"""
+    try:
+        with transaction.atomic():
+            master_glosa.clone_results_from(source_glosa)
+        
+        ProcessingLog.objects.create(
+            glosa=master_glosa,
+            message=f"Archivo idéntico a una glosa ya procesada ({source_glosa.id}): resultados reutilizados",
+            level='INFO'
+        )
+        
+        messages.success(
+            request, 
+            f'✅ Glosa "{master_glosa.original_filename}" ya había sido procesada. '
+            f'Se reutilizaron los resultados existentes. '
+            f'Marque "Forzar reprocesamiento" para procesarla de nuevo.'
+        )
+        
+        batch = getattr(master_glosa, 'processing_batch', None)
+        if batch:
+            return redirect('batch_detail', batch_id=batch.id)
+        return redirect('glosa_detail', glosa_id=master_glosa.id)
+        
+    except Exception as e:
+        # Si la copia falla se procesa normalmente
+        logger.warning(f"No se pudieron reutilizar resultados de {source_glosa.id}: {e}")
+        return process_pdf_splitting_async(request, master_glosa)
+
+
+def process_pdf_splitting_async(request, master_glosa, force_reprocess=False):
     """
     DIVISIÓN DE PDF COMPLETAMENTE ASÍNCRONA
     Respuesta inmediata al usuario, procesamiento en background
+    Con force_reprocess los hijos no reutilizan resultados de secciones idénticas
     """
     try:
         # Inicializar divisor
         splitter = GlosaPDFSplitter()
+        pipelined = getattr(settings, 'GLOSA_PIPELINED_SPLIT', True)
+        analysis = None
         
-        # Validar formato del PDF (rápido)
-        is_valid, validation_message = splitter.validate_pdf_format(master_glosa.original_file.path)
+        if pipelined:
+            # Leer solo hasta confirmar si hay más de un paciente; el resto se lee en la tarea de división
+            is_multiple, leading_text = splitter.probe_multiple_patients(master_glosa.original_file.path)
+            # Sin capa de texto (PDF escaneado) no hay nada que validar antes del OCR
+            is_valid, validation_message = (
+                splitter.validate_leading_text(leading_text) if leading_text.strip() else (True, '')
+            )
+        else:
+            # Analizar el PDF una sola vez (validación, detección y división lo comparten)
+            analysis = splitter.analyze(master_glosa.original_file.path)
+            
+            # Validar formato del PDF (rápido)
+            is_valid, validation_message = splitter.validate_pdf_format(
+                master_glosa.original_file.path, analysis=analysis
+            )
         
         if not is_valid:
             ProcessingLog.objects.create(
@@ -93,11 +163,25 @@ def process_pdf_splitting_async(request, master_glosa):
             )
         
         # Detectar si es múltiple (rápido)
-        try:
-            is_multiple = splitter.detect_multiple_patients(master_glosa.original_file.path)
-        except Exception as e:
-            logger.warning(f"Error detectando múltiples pacientes: {e}")
-            is_multiple = False
+        if not pipelined:
+            try:
+                is_multiple = splitter.detect_multiple_patients(
+                    master_glosa.original_file.path, analysis=analysis
+                )
+            except Exception as e:
+                logger.warning(f"Error detectando múltiples pacientes: {e}")
+                is_multiple = False
+        
+        if is_multiple is None:
+            # El sondeo no pudo decidir: la tarea de división confirma si hay más de un paciente
+            ProcessingLog.objects.create(
+                glosa=master_glosa,
+                message="No se pudo confirmar en las primeras páginas si hay más de un paciente - se decide al dividir",
+                level='INFO'
+            )
+            return process_multi_patient_document_pipelined(
+                request, master_glosa, force_reprocess, confirm_multiple=True
+            )
         
         if not is_multiple:
             # PDF de un solo paciente - procesar asíncronamente
@@ -135,7 +219,11 @@ def process_pdf_splitting_async(request, master_glosa):
                 level='INFO'
             )
             
-            return process_multi_patient_document_async(request, master_glosa)
+            if pipelined:
+                return process_multi_patient_document_pipelined(request, master_glosa, force_reprocess)
+            return process_multi_patient_document_async(
+                request, master_glosa, analysis=analysis, force_reprocess=force_reprocess
+            )
             
     except Exception as e:
         logger.error(f"Error en proceso de división: {e}")
@@ -153,70 +241,194 @@ def process_pdf_splitting_async(request, master_glosa):
         return redirect('glosa_detail', glosa_id=master_glosa.id)
 
 
-def process_multi_patient_document_async(request, master_glosa):
+def process_multi_patient_document_pipelined(request, master_glosa, force_reprocess=False,
+                                             confirm_multiple=False):
+    """
+    PROCESAMIENTO DE DOCUMENTOS MÚLTIPLES EN PIPELINE
+    La división corre en background y cada paciente se despacha apenas se detecta
+    Con confirm_multiple la tarea procesa el documento completo si resulta de un solo paciente
+    """
+    try:
+        master_glosa.is_master_document = True
+        master_glosa.save()
+        
+        # El total se fija cuando termina la división
+        batch = ProcessingBatch.objects.create(
+            master_document=master_glosa,
+            total_documents=0,
+            batch_status='splitting'
+        )
+        
+        from apps.extractor.tasks import split_and_dispatch_batch
+        task = split_and_dispatch_batch.delay(str(batch.id), force_reprocess, confirm_multiple)
+        
+        ProcessingLog.objects.create(
+            glosa=master_glosa,
+            message=f"División en pipeline iniciada: cada paciente se procesa en cuanto se detecta. Task ID: {task.id}",
+            level='INFO'
+        )
+        
+        if confirm_multiple:
+            # Si resulta de un solo paciente el batch desaparece: mostrar el documento
+            messages.success(
+                request, 
+                f'✅ Glosa "{master_glosa.original_filename}" subida correctamente. '
+                'Se está analizando en segundo plano para separar los pacientes que contenga.'
+            )
+            return redirect('glosa_detail', glosa_id=master_glosa.id)
+        
+        messages.success(
+            request, 
+            '🚀 PDF con múltiples pacientes detectado. '
+            'Cada paciente empezará a procesarse en cuanto se separe del documento. '
+            'Puede cerrar esta página y volver más tarde.'
+        )
+        return redirect('batch_detail', batch_id=batch.id)
+        
+    except Exception as e:
+        logger.error(f"Error iniciando división en pipeline: {e}")
+        master_glosa.status = 'error'
+        master_glosa.error_message = str(e)
+        master_glosa.save()
+        
+        if 'batch' in locals():
+            batch.batch_status = 'error'
+            batch.error_message = str(e)
+            batch.save()
+        
+        messages.error(request, f"Error procesando documento múltiple: {str(e)}")
+        return redirect('glosa_detail', glosa_id=master_glosa.id)
+
+
+def process_multi_patient_document_async(request, master_glosa, analysis=None, force_reprocess=False):
     """
     PROCESAMIENTO DE DOCUMENTOS MÚLTIPLES - COMPLETAMENTE ASÍNCRONO
     División rápida + procesamiento paralelo en background
     """
     try:
-        # División rápida del PDF
         splitter = GlosaPDFSplitter()
-        sections = splitter.split_pdf(master_glosa.original_file.path)
+        split_mode = getattr(settings, 'GLOSA_SPLIT_MODE', 'page_range')
+        analysis = analysis or splitter.analyze(master_glosa.original_file.path)
+        
+        if split_mode == 'page_range':
+            # Sin copiar PDFs: cada hijo referencia una ventana de páginas del archivo padre
+            sections = [
+                (None, f"section_{i+1}.pdf", analysis.section_metadata(start, end))
+                for i, (start, end) in enumerate(analysis.sections)
+            ] if len(analysis.sections) > 1 else []
+        else:
+            # División en streaming: cada sección se escribe a disco y se guarda antes de cortar la siguiente
+            sections = (
+                (section, section.filename, section.metadata)
+                for section in splitter.iter_split_pdf(master_glosa.original_file.path, analysis=analysis)
+            ) if len(analysis.sections) > 1 else []
+        
+        section_count = len(analysis.sections)
         
         if not sections:
             # Si falla la división, procesar como documento único
-            return process_pdf_splitting_async(request, master_glosa)
+            return process_pdf_splitting_async(request, master_glosa, force_reprocess=force_reprocess)
         
         # Marcar como documento maestro
         master_glosa.is_master_document = True
-        master_glosa.total_sections = len(sections)
+        master_glosa.total_sections = section_count
         master_glosa.save()
         
         # Crear batch de procesamiento
         batch = ProcessingBatch.objects.create(
             master_document=master_glosa,
-            total_documents=len(sections),
+            total_documents=section_count,
             batch_status='splitting'
         )
         
         ProcessingLog.objects.create(
             glosa=master_glosa,
-            message=f"Creando batch con {len(sections)} documentos para procesamiento asíncrono paralelo",
+            message=f"Creando batch con {section_count} documentos para procesamiento asíncrono paralelo",
             level='INFO'
         )
         
         # Crear documentos hijos RÁPIDAMENTE
         child_documents = []
         
-        for i, (pdf_content, section_filename, metadata) in enumerate(sections):
+        for i, (split_section, section_filename, metadata) in enumerate(sections):
             try:
-                # Crear documento hijo
-                child_glosa = GlosaDocument.objects.create(
-                    user=master_glosa.user,
-                    parent_document=master_glosa,
-                    status='pending',
-                    strategy=master_glosa.strategy,
-                    original_filename=f"{master_glosa.original_filename}_paciente_{i+1}",
-                    file_size=len(pdf_content),
-                    patient_section_number=i+1,
-                    total_sections=len(sections)
-                )
+                if split_section is not None and split_section.error:
+                    # La sección no se pudo cortar: el paciente queda como hijo con error
+                    child_glosa = GlosaDocument.objects.create(
+                        user=master_glosa.user,
+                        parent_document=master_glosa,
+                        status='error',
+                        strategy=master_glosa.strategy,
+                        original_filename=f"{master_glosa.original_filename}_paciente_{split_section.index}",
+                        file_size=1,
+                        patient_section_number=split_section.index,
+                        total_sections=section_count,
+                        error_message=f"Error dividiendo la sección: {split_section.error}",
+                        section_fingerprint=metadata.get('fingerprint')
+                    )
+                    child_documents.append(child_glosa)
+                    ProcessingLog.objects.create(
+                        glosa=child_glosa,
+                        message=f"Error dividiendo la sección {split_section.index}/{section_count}: {split_section.error}",
+                        level='ERROR'
+                    )
+                    continue
                 
-                # Guardar archivo PDF dividido
-                child_glosa.original_file.save(
-                    section_filename,
-                    ContentFile(pdf_content),
-                    save=True
-                )
+                if split_section is None:
+                    # Documento hijo por rango: comparte el archivo del padre
+                    section_size = master_glosa.file_size * metadata['total_pages'] // max(analysis.total_pages, 1)
+                    child_glosa = GlosaDocument.objects.create(
+                        user=master_glosa.user,
+                        parent_document=master_glosa,
+                        status='pending',
+                        strategy=master_glosa.strategy,
+                        original_file=master_glosa.original_file.name,
+                        original_filename=f"{master_glosa.original_filename}_paciente_{i+1}",
+                        file_size=max(section_size, 1),
+                        patient_section_number=i+1,
+                        total_sections=section_count,
+                        start_page=metadata['start_page'],
+                        end_page=metadata['end_page'],
+                        section_fingerprint=metadata.get('fingerprint')
+                    )
+                else:
+                    # Crear documento hijo
+                    child_glosa = GlosaDocument.objects.create(
+                        user=master_glosa.user,
+                        parent_document=master_glosa,
+                        status='pending',
+                        strategy=master_glosa.strategy,
+                        original_filename=f"{master_glosa.original_filename}_paciente_{i+1}",
+                        file_size=split_section.file_size,
+                        patient_section_number=i+1,
+                        total_sections=section_count,
+                        section_fingerprint=metadata.get('fingerprint')
+                    )
+                    
+                    # Guardar archivo PDF dividido copiándolo desde disco
+                    with split_section.open() as section_file:
+                        child_glosa.original_file.save(
+                            section_filename,
+                            File(section_file),
+                            save=True
+                        )
                 
                 child_documents.append(child_glosa)
                 
                 ProcessingLog.objects.create(
                     glosa=child_glosa,
-                    message=f"Documento hijo creado (sección {i+1}/{len(sections)})",
+                    message=f"Documento hijo creado (sección {i+1}/{section_count})",
                     level='INFO'
                 )
                 
+                # Sección idéntica a un hijo ya procesado: reutilizar sus datos (salvo reprocesamiento forzado)
+                if not force_reprocess and child_glosa.reuse_section_result():
+                    ProcessingLog.objects.create(
+                        glosa=child_glosa,
+                        message="Sección sin cambios respecto a una glosa ya procesada: resultado reutilizado",
+                        level='INFO'
+                    )
+                
             except Exception as e:
                 logger.error(f"Error creando documento hijo {i+1}: {e}")
                 batch.failed_documents += 1
@@ -288,6 +500,7 @@ def api_batch_status(request, batch_id):
                 'filename': child.original_filename,
                 'error_message': child.error_message,
                 'has_data': bool(child.extracted_data),
+                'is_reused': child.is_reused_result,
                 'created_at': child.created_at.isoformat(),
                 'updated_at': child.updated_at.isoformat(),
             }
@@ -321,6 +534,8 @@ def api_batch_status(request, batch_id):
             'total_documents': batch.total_documents,
             'completed_documents': batch.completed_documents,
             'failed_documents': batch.failed_documents,
+            'reused_documents': batch.reused_documents,
+            'processed_documents': batch.processed_documents,
             'progress_percentage': batch.progress_percentage,
             'is_complete': batch.is_complete,
             'has_errors': batch.has_errors,
@@ -482,9 +697,9 @@ def _calculate_financial_stats(user):
         for glosa in glosas:
             if glosa.extracted_data and 'financial_summary' in glosa.extracted_data:
                 financial = glosa.extracted_data['financial_summary']
-                total_reclamado += financial.get('total_reclamado', 0)
-                total_objetado += financial.get('total_objetado', 0)
-                total_aceptado += financial.get('total_aceptado', 0)
+                total_reclamado += parse_money(financial.get('total_reclamado', 0))
+                total_objetado += parse_money(financial.get('total_objetado', 0))
+                total_aceptado += parse_money(financial.get('total_aceptado', 0))
         
         return {
             'total_reclamado': total_reclamado,
@@ -663,6 +878,7 @@ def reprocess_glosa(request, glosa_id):
         glosa.status = 'processing'
         glosa.error_message = None
         glosa.extracted_data = None
+        glosa.is_reused_result = False
         glosa.save()
         
         ProcessingLog.objects.create(
@@ -699,12 +915,13 @@ def reprocess_batch(request, batch_id):
     batch.batch_status = 'processing'
     batch.completed_documents = 0
     batch.failed_documents = 0
+    batch.reused_documents = 0
     batch.completed_at = None
     batch.save()
     
     # Reiniciar documentos hijos
     child_documents = batch.master_document.child_documents.all()
-    child_documents.update(status='pending', error_message=None, extracted_data=None)
+    child_documents.update(status='pending', error_message=None, extracted_data=None, is_reused_result=False)
     
     # Iniciar reprocesamiento ASÍNCRONO PARALELO
     from apps.extractor.tasks import process_batch_documents
@@ -754,6 +971,16 @@ def download_file(request, glosa_id, file_type):
     
     elif file_type == 'original':
         if glosa.original_file and os.path.exists(glosa.original_file.path):
+            if glosa.is_page_range_document:
+                # El PDF de la sección solo se genera cuando alguien lo descarga
+                splitter = GlosaPDFSplitter()
+                pdf_content = splitter.extract_section_bytes(
+                    glosa.original_file.path, glosa.start_page, glosa.end_page
+                )
+                response = HttpResponse(pdf_content, content_type='application/pdf')
+                response['Content-Disposition'] = f'attachment; filename="{glosa.original_filename}.pdf"'
+                return response
+            
             with open(glosa.original_file.path, 'rb') as f:
                 response = HttpResponse(f.read(), content_type='application/pdf')
                 response['Content-Disposition'] = f'attachment; filename="{glosa.original_filename}"'
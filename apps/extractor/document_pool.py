@@ -0,0 +1,99 @@
+# apps/extractor/document_pool.py
+"""
+Pool LRU de documentos PyMuPDF abiertos por proceso worker
+Permite que los documentos hijos por rango de páginas lean directamente
+del PDF padre sin reabrirlo en cada tarea
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# Número máximo de documentos abiertos simultáneamente por proceso
+DEFAULT_MAX_OPEN_DOCUMENTS = 8
+
+
+class FitzDocumentPool:
+    """
+    Mantiene abiertos los últimos documentos usados, identificados por
+    ruta, tamaño y fecha de modificación para no servir un archivo reemplazado
+    """
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN_DOCUMENTS):
+        self.max_open = max_open
+        self._documents: "OrderedDict[Tuple[str, int, int], fitz.Document]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+    def _document_key(self, pdf_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(pdf_path)
+        return (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, pdf_path: str) -> fitz.Document:
+        """
+        Retorna un documento abierto para pdf_path
+        El documento pertenece al pool: el llamador no debe cerrarlo
+        """
+        with self._lock:
+            # Tras un fork los handles heredados no son seguros: empezar de cero
+            if self._pid != os.getpid():
+                self._documents.clear()
+                self._pid = os.getpid()
+
+            key = self._document_key(pdf_path)
+            doc = self._documents.get(key)
+
+            if doc is not None and not doc.is_closed:
+                self._documents.move_to_end(key)
+                return doc
+
+            doc = fitz.open(pdf_path)
+            self._documents[key] = doc
+            logger.debug(f"Documento abierto en pool: {pdf_path} ({len(doc)} páginas)")
+
+            while len(self._documents) > self.max_open:
+                _, evicted = self._documents.popitem(last=False)
+                try:
+                    evicted.close()
+                except Exception:
+                    pass
+
+            return doc
+
+    def close_all(self):
+        """Cierra todos los documentos del pool"""
+        with self._lock:
+            for doc in self._documents.values():
+                try:
+                    doc.close()
+                except Exception:
+                    pass
+            self._documents.clear()
+
+
+_document_pool = None
+_document_pool_lock = threading.Lock()
+
+
+def get_document_pool() -> FitzDocumentPool:
+    """Retorna el pool de documentos del proceso actual"""
+    global _document_pool
+
+    if _document_pool is None:
+        with _document_pool_lock:
+            if _document_pool is None:
+                max_open = DEFAULT_MAX_OPEN_DOCUMENTS
+                try:
+                    from django.conf import settings
+                    max_open = getattr(settings, 'PDF_DOCUMENT_POOL_SIZE', DEFAULT_MAX_OPEN_DOCUMENTS)
+                except Exception:
+                    pass
+                _document_pool = FitzDocumentPool(max_open)
+
+    return _document_pool
@@ -0,0 +1,84 @@
+# apps/extractor/document_regions.py
+"""
+Segmentación del texto de una glosa en encabezado, tabla de procedimientos y pie
+Las regiones se ubican una sola vez a partir de las frases ancla de la tabla;
+cada familia de campos se busca solo en su región
+"""
+
+import logging
+from typing import List, Tuple
+
+from .soat_patterns import (
+    TABLE_HEADER_PATTERN, TABLE_FIRST_ROW_PATTERN, TABLE_TOTAL_PATTERN, TABLE_CLAIM_VALUE_PATTERN,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def find_table_bounds(lines: List[str]) -> Tuple[int, int]:
+    """Retorna (inicio, fin) de la tabla de procedimientos; (-1, -1) si no se encuentra"""
+    table_start = -1
+    table_end = -1
+
+    for i, line in enumerate(lines):
+        # Buscar el encabezado de la tabla
+        if TABLE_HEADER_PATTERN.search(line):
+            table_start = i + 1
+            logger.info(f"Tabla de procedimientos encontrada en línea {i}")
+            break
+
+    if table_start == -1:
+        # Si no encontramos encabezado, buscar directamente procedimientos
+        for i, line in enumerate(lines):
+            if TABLE_FIRST_ROW_PATTERN.match(line):
+                table_start = i
+                logger.info(f"Procedimientos encontrados sin encabezado en línea {i}")
+                break
+
+    if table_start != -1:
+        # El total o el valor de reclamación cierran la tabla
+        for i in range(table_start, len(lines)):
+            if TABLE_TOTAL_PATTERN.search(lines[i]) or TABLE_CLAIM_VALUE_PATTERN.search(lines[i]):
+                table_end = i
+                break
+
+        if table_end == -1:
+            table_end = len(lines)
+
+    return table_start, table_end
+
+
+class DocumentRegions:
+    """
+    Regiones del texto de una glosa
+    - header: desde el inicio hasta la tabla (paciente, póliza, diagnósticos, IPS)
+    - footer: desde el total de la tabla hasta el final (totales financieros)
+    Si no se encuentra el ancla de una región, esa región es el texto completo
+    """
+
+    __slots__ = ('text', 'lines', 'table_start', 'table_end', 'header', 'footer')
+
+    def __init__(self, text: str, lines: List[str], table_start: int, table_end: int):
+        self.text = text
+        self.lines = lines
+        self.table_start = table_start
+        self.table_end = table_end
+        self.header = "\n".join(lines[:table_start]) if table_start > 0 else text
+        self.footer = "\n".join(lines[table_end:]) if 0 <= table_end < len(lines) else text
+
+    @property
+    def has_table(self) -> bool:
+        return self.table_start != -1
+
+    @property
+    def table(self) -> str:
+        if not self.has_table:
+            return self.text
+        return "\n".join(self.lines[self.table_start:self.table_end])
+
+
+def segment_document(text: str) -> DocumentRegions:
+    """Ubica encabezado, tabla y pie del texto de una glosa en una sola pasada"""
+    lines = text.split('\n')
+    table_start, table_end = find_table_bounds(lines)
+    return DocumentRegions(text, lines, table_start, table_end)
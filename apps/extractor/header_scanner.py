@@ -0,0 +1,98 @@
+# apps/extractor/header_scanner.py
+"""
+Búsqueda de varios campos del encabezado en una sola pasada
+Cada patrón empieza con una palabra literal ("Póliza", "LIQ-", "Fecha"...); las
+posiciones de esas palabras se ubican con str.find sobre el texto en minúsculas
+y en cada posición candidata se prueban solo los patrones que empiezan ahí.
+El resultado es el mismo que buscar cada patrón por separado en orden de prioridad
+"""
+
+from typing import Dict, List, Pattern, Tuple
+
+_REGEX_SPECIAL = set('\\.^$*+?{}[]|()')
+_QUANTIFIERS = set('*+?{')
+
+# Caracteres que re.IGNORECASE equipara a "i"/"s" pero que str.lower() no convierte
+# (y "İ", que además cambia el largo del texto); con ellos se busca patrón por patrón
+_CASE_FOLD_EXCEPTIONS = ('İ', 'ı', 'ſ')
+
+
+def literal_prefix(pattern: Pattern) -> str:
+    """Texto literal con el que empieza obligatoriamente el patrón"""
+    prefix = []
+
+    for char in pattern.pattern:
+        if char in _REGEX_SPECIAL:
+            # Un cuantificador hace opcional el último carácter tomado
+            if char in _QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+
+    return ''.join(prefix)
+
+
+class AnchoredFieldScanner:
+    """
+    Resuelve {campo: [alternativas]} en una pasada sobre el texto
+    Por campo gana la primera alternativa (en orden) que aparezca en el texto y,
+    de esa alternativa, su primera aparición; igual que re.search en secuencia
+    """
+
+    def __init__(self, field_patterns: Dict[str, List[Pattern]]):
+        self.field_patterns = field_patterns
+        candidates: Dict[str, List[Tuple[str, int, Pattern]]] = {}
+
+        for field, patterns in field_patterns.items():
+            for priority, pattern in enumerate(patterns):
+                keyword = literal_prefix(pattern)
+                if not keyword:
+                    raise ValueError(f"El patrón {pattern.pattern!r} no empieza con texto literal")
+                candidates.setdefault(keyword.lower(), []).append((field, priority, pattern))
+
+        self._keywords = list(candidates)
+        self._candidates = [candidates[keyword] for keyword in self._keywords]
+
+    def scan(self, text: str) -> Dict[str, str]:
+        if any(char in text for char in _CASE_FOLD_EXCEPTIONS):
+            return self._scan_sequential(text)
+
+        lowered = text.lower()
+        anchors = []
+        for index, keyword in enumerate(self._keywords):
+            position = lowered.find(keyword)
+            while position != -1:
+                anchors.append((position, index))
+                position = lowered.find(keyword, position + 1)
+        anchors.sort()
+
+        found: Dict[str, Tuple[int, str]] = {}
+        pending = len(self.field_patterns)
+
+        for position, index in anchors:
+            for field, priority, pattern in self._candidates[index]:
+                current = found.get(field)
+                if current is not None and current[0] <= priority:
+                    continue
+
+                match = pattern.match(text, position)
+                if match:
+                    found[field] = (priority, match.group(1).strip())
+                    if priority == 0:
+                        pending -= 1
+
+            # Todos los campos resueltos con su primera alternativa
+            if pending == 0:
+                break
+
+        return {field: found[field][1] for field in self.field_patterns if field in found}
+
+    def _scan_sequential(self, text: str) -> Dict[str, str]:
+        result = {}
+        for field, patterns in self.field_patterns.items():
+            for pattern in patterns:
+                match = pattern.search(text)
+                if match:
+                    result[field] = match.group(1).strip()
+                    break
+        return result
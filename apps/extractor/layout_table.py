@@ -0,0 +1,252 @@
+# apps/extractor/layout_table.py
+"""
+Extracción de la tabla de procedimientos usando las coordenadas de las palabras
+Infiere los límites de columna desde el encabezado de cada página y asigna
+cada palabra a su celda por geometría, en vez de reconstruir filas con regex
+sobre el texto aplanado
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Versión de las filas guardadas en la caché de páginas: subirla al cambiar la extracción
+LAYOUT_ROWS_VERSION = 1
+
+# Columnas de la tabla en el orden del documento y los textos de su encabezado
+COLUMN_HEADERS = [
+    ('codigo', ('código', 'codigo')),
+    ('descripcion', ('descripción', 'descripcion')),
+    ('cantidad', ('cant', 'cant.', 'cantidad')),
+    ('valor_total', ('valor total',)),
+    ('valor_pagado', ('valor pagado',)),
+    ('valor_objetado', ('valor objetado',)),
+    ('observacion', ('observación', 'observacion', 'observaciones')),
+]
+
+# Columnas de texto alineado a la izquierda (pueden extenderse hasta la siguiente columna)
+TEXT_COLUMNS = {'codigo', 'descripcion', 'observacion'}
+
+VALUE_COLUMNS = ('cantidad', 'valor_total', 'valor_pagado', 'valor_objetado')
+
+# Columnas mínimas para considerar que se encontró la tabla
+REQUIRED_COLUMNS = {'codigo', 'descripcion', 'valor_total'}
+
+CODE_PATTERN = re.compile(r'^(?:\d{5}|\d{5,8}-\d{1,2})$')
+TABLE_END_PATTERN = re.compile(r'^Total\s+\$|Valor\s+de\s+Reclamación', re.IGNORECASE)
+PAGE_FOOTER_PATTERN = re.compile(r'^P[aá]gina\s+\d+', re.IGNORECASE)
+OBSERVATION_START_PATTERN = re.compile(r'^(?:\d{4}\s*)?>>')
+
+# Tolerancia (puntos) para agrupar palabras en la misma línea y entre columnas
+LINE_TOLERANCE = 2.5
+COLUMN_TOLERANCE = 2.0
+
+# (x0, y0, x1, y1, texto)
+Word = Tuple[float, float, float, float, str]
+
+
+class ColumnLayout:
+    """Límites horizontales de cada columna inferidos del encabezado"""
+
+    def __init__(self, columns: List[Tuple[str, float, float]]):
+        # columns: (nombre, x0 del encabezado, x1 del encabezado) ordenadas por x0
+        self.columns = sorted(columns, key=lambda column: column[1])
+        self.names = [name for name, _, _ in self.columns]
+        self.boundaries = []
+
+        for (name, _, prev_x1), (_, next_x0, _) in zip(self.columns, self.columns[1:]):
+            if name in TEXT_COLUMNS:
+                # El texto alineado a la izquierda llega hasta donde empieza la siguiente columna
+                self.boundaries.append(next_x0 - COLUMN_TOLERANCE)
+            else:
+                self.boundaries.append((prev_x1 + next_x0) / 2)
+
+    def column_for(self, word: Word) -> str:
+        center = (word[0] + word[2]) / 2
+        for name, boundary in zip(self.names, self.boundaries):
+            if center < boundary:
+                return name
+        return self.names[-1]
+
+    def cells(self, line: List[Word]) -> Dict[str, str]:
+        cells: Dict[str, List[str]] = {}
+        for word in line:
+            cells.setdefault(self.column_for(word), []).append(word[4])
+        return {name: " ".join(texts) for name, texts in cells.items()}
+
+
+def group_lines(words: List[Word]) -> List[List[Word]]:
+    """Agrupa palabras en líneas visuales por su posición vertical"""
+    lines: List[List[Word]] = []
+    line_center = None
+
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if lines and abs(center - line_center) <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+            line_center = center
+
+    for line in lines:
+        line.sort(key=lambda w: w[0])
+    return lines
+
+
+def _line_text(line: List[Word]) -> str:
+    return " ".join(word[4] for word in line)
+
+
+def detect_layout(lines: List[List[Word]]) -> Optional[Tuple[int, ColumnLayout]]:
+    """
+    Busca la línea de encabezado de la tabla y retorna (índice, layout)
+    Los encabezados de dos palabras ("Valor total") pueden estar en la misma
+    línea o partidos en dos líneas consecutivas
+    """
+    single_headers = {
+        header: name for name, headers in COLUMN_HEADERS for header in headers if ' ' not in header
+    }
+    value_headers = {
+        header.split()[1]: name for name, headers in COLUMN_HEADERS for header in headers if ' ' in header
+    }
+
+    for index, line in enumerate(lines):
+        tokens = [word[4].lower().strip(':') for word in line]
+        if 'valor' not in tokens and not any(token in single_headers for token in tokens):
+            continue
+
+        columns = {}
+        position = 0
+        while position < len(line):
+            token = tokens[position]
+            word = line[position]
+
+            if token in single_headers and single_headers[token] not in columns:
+                columns[single_headers[token]] = (word[0], word[2])
+
+            elif token == 'valor':
+                # "Valor total" en la misma línea
+                if position + 1 < len(line) and tokens[position + 1] in value_headers:
+                    name = value_headers[tokens[position + 1]]
+                    columns.setdefault(name, (word[0], max(word[2], line[position + 1][2])))
+                    position += 1
+                # "Valor" arriba y "total" en la línea siguiente
+                elif index + 1 < len(lines):
+                    for below in lines[index + 1]:
+                        below_token = below[4].lower()
+                        if below_token in value_headers and below[0] < word[2] and below[2] > word[0]:
+                            columns.setdefault(value_headers[below_token], (min(word[0], below[0]), max(word[2], below[2])))
+                            break
+
+            position += 1
+
+        if REQUIRED_COLUMNS.issubset(columns):
+            layout = ColumnLayout([(name, x0, x1) for name, (x0, x1) in columns.items()])
+            # Si el encabezado ocupa dos líneas la tabla empieza después de la segunda
+            header_end = index
+            if index + 1 < len(lines) and any(
+                word[4].lower() in value_headers for word in lines[index + 1]
+            ) and not any(CODE_PATTERN.match(word[4]) for word in lines[index + 1]):
+                header_end = index + 1
+            return header_end, layout
+
+    return None
+
+
+class LayoutTableExtractor:
+    """
+    Reconstruye las filas de la tabla de procedimientos de un documento
+    Cada fila es un diccionario de textos crudos por columna; la conversión a
+    números y la validación quedan a cargo del extractor
+    """
+
+    def extract_rows(self, doc, start: int = 0, end: Optional[int] = None) -> List[Dict[str, str]]:
+        last_page = len(doc) - 1 if end is None else min(end, len(doc) - 1)
+        rows: List[Dict[str, str]] = []
+        layout = None
+        table_open = False
+
+        for page_num in range(start, last_page + 1):
+            try:
+                words = [tuple(word[:5]) for word in doc.load_page(page_num).get_text("words")]
+            except Exception as e:
+                logger.warning(f"Error leyendo palabras de la página {page_num}: {e}")
+                continue
+
+            lines = group_lines(words)
+            detected = detect_layout(lines)
+
+            if detected is not None:
+                header_index, layout = detected
+                first_line = header_index + 1
+                table_open = True
+            elif table_open and layout is not None:
+                # Continuación de la tabla de la página anterior sin encabezado repetido
+                first_line = 0
+            else:
+                continue
+
+            table_open = self._collect_rows(lines[first_line:], layout, rows, page_num)
+
+        # Quitar marcas internas de las filas
+        for row in rows:
+            row.pop('_open', None)
+
+        logger.info(f"Tabla por coordenadas: {len(rows)} filas en páginas {start}-{last_page}")
+        return rows
+
+    def _collect_rows(self, lines: List[List[Word]], layout: ColumnLayout,
+                      rows: List[Dict[str, str]], page_num: int) -> bool:
+        """Agrega las filas de la página y retorna si la tabla sigue en la página siguiente"""
+        current = rows[-1] if rows and rows[-1].get('_open') else None
+
+        for line in lines:
+            text = _line_text(line)
+
+            if TABLE_END_PATTERN.search(text):
+                if current is not None:
+                    current.pop('_open', None)
+                return False
+
+            if PAGE_FOOTER_PATTERN.match(text):
+                continue
+
+            cells = layout.cells(line)
+            code = cells.get('codigo', '').strip()
+            has_values = any(cells.get(name) for name in VALUE_COLUMNS)
+            current_has_values = current is not None and any(current.get(name) for name in VALUE_COLUMNS)
+
+            # Observaciones ("4567 >> texto" o ">> continuación") pertenecen a la fila actual
+            if current is not None and OBSERVATION_START_PATTERN.match(text) and not has_values:
+                self._append(current, 'observacion', text)
+                continue
+
+            starts_row = bool(CODE_PATTERN.match(code)) or (has_values and (current is None or current_has_values))
+
+            if starts_row:
+                if current is not None:
+                    current.pop('_open', None)
+                current = {name: '' for name, _ in COLUMN_HEADERS}
+                current['page'] = page_num
+                current['_open'] = True
+                rows.append(current)
+                if CODE_PATTERN.match(code):
+                    current['codigo'] = code
+                    cells.pop('codigo', None)
+
+            if current is None:
+                continue
+
+            for name, value in cells.items():
+                # Texto en la columna de código que no es un código: parte de la descripción
+                target = 'descripcion' if name == 'codigo' else name
+                self._append(current, target, value)
+
+        return True
+
+    def _append(self, row: Dict[str, str], name: str, value: str):
+        value = value.strip()
+        if value:
+            row[name] = f"{row[name]} {value}".strip() if row.get(name) else value
@@ -0,0 +1,161 @@
+# apps/extractor/line_table.py
+"""
+Lectura de la tabla de procedimientos desde el texto plano en una sola pasada
+Cada línea se mira una vez: el primer carácter decide qué patrón probar (fila,
+fila con código compuesto, código solo, fila sin código, observación,
+continuación) y las observaciones se asignan a la fila abierta a medida que
+aparecen, sin volver a revisar las líneas siguientes ni crear objetos por línea
+"""
+
+from typing import Dict, List, Optional
+
+from .soat_patterns import (
+    PROCEDURE_LINE_PATTERN, PROCEDURE_COMPOUND_LINE_PATTERN, PROCEDURE_DESCRIPTION_PATTERN,
+    CODE_ONLY_PATTERN, LETTER_PREFIX_PATTERN, OBSERVATION_CODE_PREFIX_PATTERN,
+    OBSERVATION_CODE_LINE_PATTERN, OBSERVATION_TRAILING_PATTERN, OBSERVATION_CODED_PATTERN,
+)
+from .regex_budget import RegexBudget
+
+# Líneas siguientes a una fila donde se buscan sus observaciones
+OBSERVATION_WINDOW = 4
+
+# Líneas que se unen para leer la descripción de un código solo
+BARE_CODE_LOOKAHEAD = 3
+
+# Palabras que hacen que una línea de texto libre se tome como observación
+OBSERVATION_KEYWORDS = ['GLOSA', 'OBJETA', 'NO', 'PERTINENTE', 'CORRESPONDE']
+
+# Método de extracción según la forma de la fila
+ROW_METHOD = 'table_line'
+COMPOUND_ROW_METHOD = 'table_line_compound'
+BARE_CODE_METHOD = 'multiline'
+NO_CODE_METHOD = 'no_code'
+
+
+def _append(observation: str, text: str) -> str:
+    return observation + " " + text if observation else text
+
+
+class LineTableParser:
+    """
+    Arma las filas de la tabla de procedimientos a partir de las líneas del texto
+    Cada fila es un diccionario de textos crudos por columna; la conversión a
+    números y la validación quedan a cargo del extractor
+    """
+
+    def parse(self, lines: List[str], start: int, end: int,
+              budget: Optional[RegexBudget] = None) -> List[Dict[str, str]]:
+        rows: List[Dict[str, str]] = []
+
+        # Fila cuyas observaciones se siguen leyendo hasta window_end (exclusive)
+        open_row: Optional[Dict[str, str]] = None
+        window_end = 0
+        observation = ""
+
+        for index in range(start, end):
+            # Con presupuesto agotado se devuelven las filas leídas hasta aquí
+            if budget is not None and budget.expired('tabla de procedimientos'):
+                break
+
+            raw_line = lines[index]
+            text = raw_line.strip()
+            if not text:
+                continue
+
+            if text[0].isdecimal():
+                if len(text) >= 5 and text[:5].isdecimal():
+                    # Línea con código: cierra la fila anterior aunque no sea una fila válida
+                    open_row = None
+
+                    match = PROCEDURE_LINE_PATTERN.match(text)
+                    method = ROW_METHOD
+                    if match is None:
+                        match = PROCEDURE_COMPOUND_LINE_PATTERN.match(text)
+                        method = COMPOUND_ROW_METHOD
+
+                    if match is not None:
+                        observation = self._inline_observation(raw_line)
+                        open_row = self._row(method, *match.groups(), observation)
+                        rows.append(open_row)
+                        window_end = index + 1 + OBSERVATION_WINDOW
+
+                    elif CODE_ONLY_PATTERN.match(text):
+                        row = self._bare_code_row(lines, index, end, text)
+                        if row is not None:
+                            rows.append(row)
+                    continue
+
+                if open_row is not None:
+                    if index >= window_end or 'Total' in text:
+                        open_row = None
+                    elif OBSERVATION_CODE_PREFIX_PATTERN.match(text):
+                        match = OBSERVATION_CODE_LINE_PATTERN.match(text)
+                        if match:
+                            observation = _append(observation, match.group(1).strip())
+                            open_row['observacion'] = observation
+                continue
+
+            if text.startswith('>>'):
+                if open_row is not None:
+                    if index >= window_end or 'Total' in text:
+                        open_row = None
+                    else:
+                        observation = _append(observation, text[2:].strip())
+                        open_row['observacion'] = observation
+                continue
+
+            if open_row is not None:
+                if index >= window_end or 'Total' in text:
+                    open_row = None
+                elif not observation and len(text) > 10:
+                    # Texto libre solo si aún no hay observación y parece una glosa
+                    upper = text.upper()
+                    if any(word in upper for word in OBSERVATION_KEYWORDS):
+                        observation = text
+                        open_row['observacion'] = observation
+
+            if '$' in text and LETTER_PREFIX_PATTERN.match(text):
+                match = PROCEDURE_DESCRIPTION_PATTERN.match(text)
+                if match:
+                    rows.append(self._row(NO_CODE_METHOD, '00000', *match.groups(), ''))
+
+        return rows
+
+    def _row(self, method: str, codigo: str, descripcion: str, cantidad: str, valor_total: str,
+             valor_pagado: str, valor_objetado: str, observacion: str) -> Dict[str, str]:
+        return {
+            'codigo': codigo,
+            'descripcion': descripcion,
+            'cantidad': cantidad,
+            'valor_total': valor_total,
+            'valor_pagado': valor_pagado,
+            'valor_objetado': valor_objetado,
+            'observacion': observacion,
+            'extraction_method': method,
+        }
+
+    def _inline_observation(self, raw_line: str) -> str:
+        """Observación en la misma línea de la fila (después de los valores o tras "NNNN >>")"""
+        observation = ""
+
+        match = OBSERVATION_TRAILING_PATTERN.search(raw_line)
+        if match:
+            observation = match.group(1).strip()
+
+        match = OBSERVATION_CODED_PATTERN.search(raw_line)
+        if match:
+            observation = match.group(2).strip()
+
+        return observation
+
+    def _bare_code_row(self, lines: List[str], index: int, end: int, code: str) -> Optional[Dict[str, str]]:
+        """Código solo en su línea: descripción y valores en las líneas siguientes"""
+        if index + 1 >= end or not LETTER_PREFIX_PATTERN.match(lines[index + 1].strip()):
+            return None
+
+        following = lines[index + 1:min(index + 1 + BARE_CODE_LOOKAHEAD, end)]
+        match = PROCEDURE_DESCRIPTION_PATTERN.match(' '.join(line.strip() for line in following))
+        if not match:
+            return None
+
+        return self._row(BARE_CODE_METHOD, code, *match.groups(), '')
@@ -0,0 +1,285 @@
+# apps/extractor/llm_cache.py
+"""
+Caché de resultados de OpenAI a nivel de documento y de chunk de tabla
+La clave es (nivel, modelo, versión del prompt, texto de entrada normalizado): un
+reprocesamiento o un upload duplicado con el mismo texto no vuelve a llamar a la API.
+Los resultados se guardan en Redis como JSON con TTL y un índice por último uso que
+acota el número de entradas. Las llamadas idénticas simultáneas se unen en una sola,
+dentro del proceso (threads) y entre workers (lock en Redis)
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_LEVEL = 'document'
+CHUNK_LEVEL = 'chunk'
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 20000
+
+# Tiempo máximo que un worker espera la llamada en curso de otro antes de hacerla él
+DEFAULT_LOCK_SECONDS = 180.0
+
+POLL_SECONDS = 0.25
+
+DEFAULT_KEY_PREFIX = 'llm_cache'
+
+_MISSING = object()
+
+# Borra el lock solo si sigue siendo del mismo dueño
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def normalize_input_text(text: str) -> str:
+    """Texto de entrada sin diferencias de espacios (no cambian la respuesta)"""
+    return ' '.join(text.split())
+
+
+class _Flight:
+    """Llamada en curso dentro del proceso; los demás threads esperan su resultado"""
+
+    __slots__ = ('done', 'payload')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.payload = None
+
+
+class LLMResultCache:
+    """
+    Resultados JSON de OpenAI en Redis
+    redis_client es cualquier cliente compatible con redis-py (en pruebas, un Redis local)
+    Si Redis falla se llama a la API sin caché: nunca detiene la extracción
+    """
+
+    def __init__(self, redis_client, ttl: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 lock_seconds: float = DEFAULT_LOCK_SECONDS, key_prefix: str = DEFAULT_KEY_PREFIX):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock_seconds = lock_seconds
+        self.key_prefix = key_prefix
+        self.index_key = f'{{{key_prefix}}}:index'
+        self.stats_key = f'{{{key_prefix}}}:stats'
+
+        self._release = redis_client.register_script(_RELEASE_SCRIPT)
+        self._flights: Dict[str, _Flight] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, level: str, model: str, template_version: str, text: str) -> str:
+        digest = hashlib.sha256(
+            '\x1f'.join((level, model, template_version, normalize_input_text(text))).encode('utf-8')
+        ).hexdigest()
+        return f'{level}:{digest}'
+
+    def get_or_compute(self, level: str, model: str, template_version: str, text: str,
+                       compute: Callable[[], Any]) -> Any:
+        """
+        Resultado en caché o el de compute() (que debe ser serializable a JSON)
+        Si compute lanza una excepción no se guarda nada y la excepción se propaga
+        """
+        key = self.make_key(level, model, template_version, text)
+
+        value = self._get(key)
+        if value is not _MISSING:
+            self._count(level, 'hits')
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            # Otro thread del proceso ya está llamando con el mismo texto
+            flight.done.wait(self.lock_seconds)
+            if flight.payload is not None:
+                self._count(level, 'shared')
+                return json.loads(flight.payload)
+            return self._compute(level, key, compute)
+
+        try:
+            value = self._compute(level, key, compute)
+            flight.payload = json.dumps(value)
+            return value
+        finally:
+            flight.done.set()
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _compute(self, level: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Llama a compute con el lock entre workers; si otro worker ya llama, espera su resultado"""
+        lock_key = f'{{{self.key_prefix}}}:lock:{key}'
+        token = uuid.uuid4().hex
+
+        try:
+            owner = bool(self.redis.set(lock_key, token, nx=True, px=int(self.lock_seconds * 1000)))
+        except Exception as e:
+            logger.warning(f"Caché de OpenAI no disponible, se llama sin caché: {e}")
+            self._count(level, 'misses')
+            return compute()
+
+        if not owner:
+            deadline = time.monotonic() + self.lock_seconds
+            while time.monotonic() < deadline:
+                time.sleep(POLL_SECONDS)
+                value = self._get(key)
+                if value is not _MISSING:
+                    self._count(level, 'shared')
+                    return value
+                try:
+                    if not self.redis.exists(lock_key):
+                        break
+                except Exception:
+                    break
+
+        try:
+            self._count(level, 'misses')
+            value = compute()
+            self._set(key, value)
+            return value
+        finally:
+            if owner:
+                try:
+                    self._release(keys=[lock_key], args=[token])
+                except Exception:
+                    pass
+
+    def _entry_key(self, key: str) -> str:
+        return f'{{{self.key_prefix}}}:entry:{key}'
+
+    def _get(self, key: str) -> Any:
+        try:
+            payload = self.redis.get(self._entry_key(key))
+            if payload is None:
+                return _MISSING
+            # Marcar como usada recientemente para el desalojo por tamaño
+            self.redis.zadd(self.index_key, {key: time.time()})
+            return json.loads(payload)
+        except Exception as e:
+            logger.warning(f"Error leyendo caché de OpenAI: {e}")
+            return _MISSING
+
+    def _set(self, key: str, value: Any):
+        now = time.time()
+
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(self._entry_key(key), json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            pipe.zadd(self.index_key, {key: now})
+            # Entradas vencidas por TTL salen del índice
+            pipe.zremrangebyscore(self.index_key, '-inf', now - self.ttl)
+            pipe.zcard(self.index_key)
+            entries = pipe.execute()[-1]
+
+            if entries > self.max_entries:
+                evicted = [member for member, _ in self.redis.zpopmin(self.index_key, entries - self.max_entries)]
+                if evicted:
+                    self.redis.delete(*[
+                        self._entry_key(member.decode() if isinstance(member, bytes) else member)
+                        for member in evicted
+                    ])
+                    logger.debug(f"Caché de OpenAI: {len(evicted)} entradas desalojadas")
+        except Exception as e:
+            logger.warning(f"Error guardando caché de OpenAI: {e}")
+
+    def _count(self, level: str, counter: str):
+        with self._lock:
+            counters = self._counters.setdefault(level, {'hits': 0, 'shared': 0, 'misses': 0})
+            counters[counter] += 1
+
+        try:
+            self.redis.hincrby(self.stats_key, f'{level}:{counter}', 1)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Aciertos (hits), llamadas compartidas con otra en curso (shared) y llamadas a la API
+        (misses) por nivel, del proceso y acumulados de todos los workers (cluster)
+        """
+        with self._lock:
+            process = {level: dict(counters) for level, counters in self._counters.items()}
+
+        cluster: Dict[str, Dict[str, int]] = {}
+        try:
+            for field, count in self.redis.hgetall(self.stats_key).items():
+                field = field.decode() if isinstance(field, bytes) else field
+                level, counter = field.split(':', 1)
+                cluster.setdefault(level, {'hits': 0, 'shared': 0, 'misses': 0})[counter] = int(count)
+        except Exception:
+            pass
+
+        return {'process': process, 'cluster': cluster}
+
+
+_llm_cache = None
+_llm_cache_configured = False
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResultCache]:
+    """
+    Retorna la caché del proceso configurada desde settings
+    Retorna None si está desactivada, Django no está configurado o falta redis-py
+    """
+    global _llm_cache, _llm_cache_configured
+
+    if _llm_cache_configured:
+        return _llm_cache
+
+    with _llm_cache_lock:
+        if _llm_cache_configured:
+            return _llm_cache
+
+        try:
+            from django.conf import settings
+            enabled = getattr(settings, 'LLM_CACHE_ENABLED', True)
+            redis_url = getattr(settings, 'LLM_CACHE_REDIS_URL', None) or settings.CELERY_BROKER_URL
+            ttl = getattr(settings, 'LLM_CACHE_TTL', DEFAULT_TTL_SECONDS)
+            max_entries = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        except Exception:
+            enabled = False
+
+        if enabled:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url, socket_timeout=5, socket_connect_timeout=5)
+                _llm_cache = LLMResultCache(client, ttl, max_entries)
+            except ImportError:
+                logger.warning("redis no está instalado: resultados de OpenAI sin caché")
+
+        _llm_cache_configured = True
+        return _llm_cache
+
+
+def set_llm_cache(cache: Optional[LLMResultCache]):
+    """Reemplaza la caché del proceso (None la desactiva)"""
+    global _llm_cache, _llm_cache_configured
+
+    with _llm_cache_lock:
+        _llm_cache = cache
+        _llm_cache_configured = True
+
+
+def cached_llm_result(level: str, model: str, template_version: str, text: str,
+                      compute: Callable[[], Any]) -> Any:
+    """compute() a través de la caché del proceso (directo si no hay caché)"""
+    cache = get_llm_cache()
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(level, model, template_version, text, compute)
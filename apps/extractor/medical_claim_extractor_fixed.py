@@ -1,22 +1,52 @@
 import logging
 import json
-import fitz  # PyMuPDF
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
-import re
 import os
 import time
 
+from .document_pool import get_document_pool
+from .page_text_cache import get_page_text_store, join_page_texts
+from .pdf_analysis import compute_file_hash
+from .parallel_scanner import scan_page_texts
+from .layout_table import LAYOUT_ROWS_VERSION, LayoutTableExtractor
+from .line_table import LineTableParser
+from .document_regions import DocumentRegions, find_table_bounds, segment_document
+from .procedure_merge import FUZZY_MIN_RATIO, ProcedureMergeIndex, description_key
+from .procedure_record import ProcedureRecord, to_dicts, to_records
+from .regex_budget import RegexBudget
+from .money import parse_money, parse_money_column, sum_money
+from .text_normalizer import get_text_normalizer
+from .openai_client import get_openai_client
+from .rate_limiter import create_chat_completion
+from .llm_cache import DOCUMENT_LEVEL, cached_llm_result
+from .prompt_builder import DocumentPrompt, build_document_prompt
+from .soat_patterns import (
+    PATIENT_PATTERNS, POLICY_PATTERNS, POLICY_FIELD_SCANNER, DIAGNOSTIC_PATTERNS, FINANCIAL_TOTALS_PATTERNS,
+    IPS_PATTERNS, IPS_NIT_PATTERN, PROCEDURE_FULL_TEXT_PATTERNS,
+    CODE_PATTERN, COMPOUND_CODE_PATTERN, CODE_PREFIX_PATTERN,
+    OBSERVATION_CODE_PREFIX_PATTERN, OBSERVATION_MARKER_PATTERN,
+    WHITESPACE_PATTERN, DATE_DMY_PATTERN, DATE_ISO_PATTERN,
+)
+
 logger = logging.getLogger(__name__)
 
+OPENAI_MODEL = "gpt-4o-mini"
+
 class MedicalClaimExtractor:
     """
     Extractor optimizado específicamente para glosas SOAT colombianas
     Versión mejorada que maneja procedimientos en múltiples formatos
     Y extrae información adicional para formato Excel IPS
     """
+
+    # Similitud mínima para unir procedimientos de igual código y valor (None desactiva)
+    merge_fuzzy_ratio = FUZZY_MIN_RATIO
+
+    # Versión del prompt de documento en la clave de la caché de OpenAI: cambiarla al editar el prompt
+    openai_prompt_version = 'documento-v2'
     
-    def __init__(self, openai_api_key=None):
+    def __init__(self, openai_api_key=None, page_text_store=None, openai_client=None):
         # Si no se proporciona API key, intentar obtenerla del entorno
         if openai_api_key is None:
             openai_api_key = os.environ.get('OPENAI_API_KEY')
@@ -24,120 +54,46 @@ class MedicalClaimExtractor:
                 logger.info("API key de OpenAI cargada desde variables de entorno")
         
         self.openai_api_key = openai_api_key
+        # Caché de texto por página (si es None se usa la del proceso)
+        self.page_text_store = page_text_store
+        # Cliente de OpenAI (si es None se usa el compartido del proceso)
+        self.openai_client = openai_client
         self._setup_soat_patterns()
 
     def _setup_soat_patterns(self):
-        """Configura patrones específicos para documentos SOAT"""
-        
-        # Patrones para información del paciente
-        self.patient_patterns = {
-            'nombre': [
-                r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\n|\r|Número)',
-                r'VICTIMA\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+)',
-                r'CC\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\n|\r|Número)',
-            ],
-            'documento': [
-                r'Víctima\s*:\s*([A-Z]{1,3})\s*-\s*(\d+)\s*-',
-                r'VICTIMA\s*:\s*([A-Z]{1,3})\s*-\s*(\d+)\s*-',
-                r'CC\s*-\s*(\d+)\s*-',
-                r'TI\s*-\s*(\d+)\s*-',
-                r'NIT\s*-\s*(\d+)',
-            ],
-            'tipo_documento': [
-                r'Víctima\s*:\s*([A-Z]{1,3})\s*-',
-                r'VICTIMA\s*:\s*([A-Z]{1,3})\s*-',
-            ]
-        }
-        
-        # Patrones para información de póliza
-        self.policy_patterns = {
-            'numero_liquidacion': [
-                r'Liquidación\s+de\s+siniestro\s+No\.\s*([A-Z0-9\-]+)',
-                r'LIQ-(\d+)',
-                r'GNS-LIQ-(\d+)',
-            ],
-            'poliza': [
-                r'Póliza\s*:\s*(\d+)',
-                r'POLIZA\s*:\s*(\d+)',
-            ],
-            'numero_reclamacion': [
-                r'Número\s+de\s+reclamación\s*:\s*([A-Z0-9]+)',
-                r'reclamación\s*:\s*([A-Z0-9]+)',
-            ],
-            'fecha_siniestro': [
-                r'Fecha\s+de\s+siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-                r'siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-            ],
-            'fecha_ingreso': [
-                r'Fecha\s+de\s+ingreso\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-                r'ingreso\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-            ],
-            'fecha_pago': [
-                r'Fecha\s+de\s+Pago\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-                r'Pago\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-            ],
-            'orden_pago': [
-                r'Orden\s+de\s+pago\s*:\s*(\d+)',
-                r'pago\s*:\s*(\d+)',
-            ]
-        }
-        
-        # Patrones para diagnósticos
-        self.diagnostic_patterns = [
-            r'DX\s*:\s*([A-Z]\d{2,3})',
-            r'DIAGNOSTICO\s*:\s*([A-Z]\d{2,3})',
-            r'CIE\s*:\s*([A-Z]\d{2,3})',
-        ]
-        
-        # Patrones financieros
-        self.financial_totals_patterns = {
-            'valor_reclamacion': [
-                r'Valor\s+de\s+Reclamación\s*:\s*\$?([\d,\.]+)',
-                r'Total\s+\$?([\d,\.]+)',
-                r'TOTAL\s+RECLAMADO\s*:\s*\$?([\d,\.]+)',
-            ],
-            'valor_objetado': [
-                r'Valor\s+objetado\s*:\s*\$?([\d,\.]+)',
-                r'VALOR\s+OBJETADO\s*:\s*\$?([\d,\.]+)',
-                r'Total\s+objetado\s*:\s*\$?([\d,\.]+)',
-            ],
-            'valor_pagado': [
-                r'Valor\s+pagado\s*:\s*\$?([\d,\.]+)',
-                r'VALOR\s+PAGADO\s*:\s*\$?([\d,\.]+)',
-                r'Total\s+pagado\s*:\s*\$?([\d,\.]+)',
-                r'Valor\s+Pagado\s*:\s*\$?([\d,\.]+)',
-            ],
-            'valor_nota_credito': [
-                r'Valor\s+Nota\s+Crédito\s*:\s*\$?([\d,\.]+)',
-                r'NOTA\s+CREDITO\s*:\s*\$?([\d,\.]+)',
-            ],
-            'valor_impuestos': [
-                r'Valor\s+impuestos\s*:\s*\$?([\d,\.]+)',
-                r'IMPUESTOS\s*:\s*\$?([\d,\.]+)',
-            ]
-        }
-        
-        # Patrones para IPS
-        self.ips_patterns = [
-            r'Señores\s*:\s*([A-ZÁÉÍÓÚÑ\s\.]+?)(?:\n|\r)',
-            r'([A-ZÁÉÍÓÚÑ\s\.]+?)\s+IPS\s+SAS',
-            r'([A-ZÁÉÍÓÚÑ\s\.]+?)\s+Departamento\s+de\s+cartera',
-        ]
+        """
+        Asigna los patrones SOAT compilados del registro del módulo
+        Se comparten entre instancias: crear un extractor no compila nada
+        """
+        self.patient_patterns = PATIENT_PATTERNS
+        self.policy_patterns = POLICY_PATTERNS
+        self.policy_scanner = POLICY_FIELD_SCANNER
+        self.diagnostic_patterns = DIAGNOSTIC_PATTERNS
+        self.financial_totals_patterns = FINANCIAL_TOTALS_PATTERNS
+        self.ips_patterns = IPS_PATTERNS
 
     # ============================================================================
     # MÉTODO PRINCIPAL DE EXTRACCIÓN
     # ============================================================================
 
-    def extract_from_pdf(self, pdf_path: str, strategy: str = 'hybrid') -> Dict[str, Any]:
-        """Método principal de extracción con logs detallados"""
+    def extract_from_pdf(self, pdf_path: str, strategy: str = 'hybrid',
+                         page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Método principal de extracción con logs detallados
+        page_range (inicio, fin) limita la extracción a esa ventana de páginas del PDF
+        """
         try:
             logger.info(f"=" * 80)
             logger.info(f"Iniciando extracción SOAT con estrategia: {strategy}")
             logger.info(f"Archivo: {pdf_path}")
+            if page_range:
+                logger.info(f"Rango de páginas: {page_range[0]}-{page_range[1]}")
             logger.info(f"API Key configurada: {'Sí' if self.openai_api_key else 'No'}")
+            table_reconciled = False
+            openai_tokens = None
             
             # Extraer texto del PDF
-            text_content = self._extract_text_from_pdf(pdf_path)
+            text_content = self._extract_text_from_pdf(pdf_path, page_range=page_range)
             
             if not text_content.strip():
                 logger.warning("No se pudo extraer texto del PDF")
@@ -153,6 +109,7 @@ class MedicalClaimExtractor:
                         logger.info("=" * 60)
                         logger.info("INICIANDO PROCESO DE OPENAI...")
                         ai_result = self._extract_with_openai(text_content)
+                        openai_tokens = ai_result.pop('token_usage', None) if ai_result else None
                         
                         if ai_result and ai_result.get('procedures'):
                             logger.info(f"OpenAI completó exitosamente: {len(ai_result.get('procedures', []))} procedimientos encontrados")
@@ -175,16 +132,23 @@ class MedicalClaimExtractor:
             
             # Para estrategias 'regex_only' o 'hybrid', usar extracción por regex
             else:
-                # Usar extracción optimizada
-                result = self._extract_soat_data(text_content)
+                # Usar extracción optimizada (tabla por coordenadas y regex como respaldo)
+                result = self._extract_soat_data(text_content, pdf_path=pdf_path, page_range=page_range)
                 logger.info(f"Extracción regex completada: {len(result.get('procedures', []))} procedimientos encontrados")
                 
+                # Tabla leída por coordenadas y cuadrada con el total: no hace falta IA
+                table_reconciled = self._layout_table_reconciles(result)
+                if strategy == 'hybrid' and table_reconciled:
+                    logger.info("Tabla por coordenadas cuadra con el valor de reclamación: se omite OpenAI")
+                
                 # Si es hybrid, mejorar con IA
-                if strategy == 'hybrid' and self.openai_api_key:
+                if strategy == 'hybrid' and self.openai_api_key and not table_reconciled:
                     try:
                         logger.info("=" * 60)
                         logger.info("INICIANDO PROCESO DE OPENAI PARA COMPLEMENTAR...")
-                        ai_result = self._extract_with_openai(text_content)
+                        # Lo que el regex ya resolvió va como contexto en vez de su texto
+                        ai_result = self._extract_with_openai(text_content, known_data=result)
+                        openai_tokens = ai_result.pop('token_usage', None) if ai_result else None
                         
                         if ai_result and ai_result.get('procedures'):
                             logger.info(f"OpenAI encontró {len(ai_result.get('procedures', []))} procedimientos")
@@ -198,24 +162,41 @@ class MedicalClaimExtractor:
                         logger.error(f"Error con OpenAI en modo hybrid: {str(e)}")
                         # En hybrid, si OpenAI falla, continuamos con los resultados de regex
             
+            openai_used = self.openai_api_key is not None and (
+                strategy == 'ai_only' or (strategy == 'hybrid' and not table_reconciled)
+            )
+            
             # Agregar metadata
             result['metadata'] = {
                 'extraction_strategy': strategy,
                 'extraction_date': datetime.now().isoformat(),
                 'file_path': pdf_path,
+                'page_range': list(page_range) if page_range else None,
                 'text_length': len(text_content),
                 'success': True,
                 'document_type': 'SOAT',
-                'openai_used': self.openai_api_key is not None and strategy in ['hybrid', 'ai_only']
+                'openai_used': openai_used,
+                'openai_tokens': openai_tokens
             }
             
+            # Los registros internos se entregan como dict (JSONField)
+            result['procedures'] = to_dicts(result.get('procedures', []))
+            
             logger.info(f"=" * 80)
             logger.info(f"Extracción completada exitosamente:")
             logger.info(f"  - Total procedimientos: {len(result.get('procedures', []))} procedimientos")
             logger.info(f"  - Estrategia: {strategy}")
             logger.info(f"  - OpenAI usado: {result['metadata']['openai_used']}")
+            if openai_tokens:
+                logger.info(f"  - Tokens OpenAI: {openai_tokens['prompt_tokens']} de prompt "
+                            f"(~{openai_tokens['estimated_prompt_tokens']} estimados), "
+                            f"{openai_tokens['completion_tokens']} de respuesta, {openai_tokens['api_calls']} llamadas")
             logger.info(f"=" * 80)
             
+            descriptions = get_text_normalizer().description.stats()
+            logger.debug(f"Caché de descripciones: {descriptions['entries']} entradas, "
+                         f"{descriptions['hit_rate']:.0%} de aciertos")
+            
             return result
             
         except Exception as e:
@@ -226,285 +207,190 @@ class MedicalClaimExtractor:
     # EXTRACCIÓN DE PROCEDIMIENTOS MEJORADA
     # ============================================================================
 
-    def _extract_procedures(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_procedures(self, text: str, regions: Optional[DocumentRegions] = None,
+                            budget: Optional[RegexBudget] = None) -> List[ProcedureRecord]:
         """
         Método principal mejorado para extracción de procedimientos
-        Ahora busca procedimientos línea por línea en la tabla
+        Ubica la tabla y la lee en una sola pasada (LineTableParser)
         """
         procedures = []
-        seen_keys = set()  # Para evitar duplicados
         
         logger.info("Iniciando extracción exhaustiva de procedimientos")
         
         # Buscar la tabla de procedimientos
-        lines = text.split('\n')
-        
-        # Encontrar donde empieza la tabla de procedimientos
-        table_start = -1
-        table_end = -1
-        
-        for i, line in enumerate(lines):
-            # Buscar el encabezado de la tabla
-            if re.search(r'Código\s+Descripción\s+Cant\s+Valor\s+total', line, re.IGNORECASE):
-                table_start = i + 1
-                logger.info(f"Tabla de procedimientos encontrada en línea {i}")
-                break
+        if regions is None:
+            regions = segment_document(text)
         
-        if table_start == -1:
-            # Si no encontramos encabezado, buscar directamente procedimientos
-            for i, line in enumerate(lines):
-                if re.match(r'^\d{5}\s+[A-ZÁÉÍÓÚÑ]', line, re.IGNORECASE):
-                    table_start = i
-                    logger.info(f"Procedimientos encontrados sin encabezado en línea {i}")
-                    break
-        
-        if table_start != -1:
-            # Encontrar el final de la tabla
-            for i in range(table_start, len(lines)):
-                if re.search(r'^Total\s+\$', lines[i], re.IGNORECASE) or \
-                   re.search(r'Valor\s+de\s+Reclamación:', lines[i], re.IGNORECASE):
-                    table_end = i
-                    break
-            
-            if table_end == -1:
-                table_end = len(lines)
-            
-            logger.info(f"Analizando tabla desde línea {table_start} hasta {table_end}")
-            
-            # Procesar cada línea de la tabla
-            i = table_start
-            while i < table_end:
-                line = lines[i].strip()
-                
-                if not line:
-                    i += 1
-                    continue
-                
-                # Intentar extraer procedimiento de la línea actual
-                procedure = self._extract_procedure_from_line(line, lines, i, table_end)
-                
-                if procedure:
-                    # Crear clave única para evitar duplicados
-                    key = f"{procedure['codigo']}_{procedure['descripcion'][:30]}"
-                    if key not in seen_keys:
-                        procedures.append(procedure)
-                        seen_keys.add(key)
-                        logger.debug(f"Procedimiento extraído: {procedure['codigo']} - {procedure['descripcion'][:50]}...")
-                
-                i += 1
+        if regions.has_table:
+            logger.info(f"Analizando tabla desde línea {regions.table_start} hasta {regions.table_end}")
+            procedures = self._extract_table_procedures(regions.lines, regions.table_start, regions.table_end, budget)
         
         # Si no encontramos procedimientos en la tabla, buscar en todo el texto
-        if len(procedures) == 0:
+        if len(procedures) == 0 and not (budget and budget.exceeded):
             logger.warning("No se encontraron procedimientos en tabla estructurada, buscando en texto completo")
-            procedures = self._extract_procedures_from_full_text(text)
+            procedures = self._extract_procedures_from_full_text(text, budget)
         
         logger.info(f"Total procedimientos extraídos: {len(procedures)}")
         return procedures
 
-    def _extract_procedure_from_line(self, line: str, all_lines: List[str], line_idx: int, table_end: int) -> Optional[Dict[str, Any]]:
+    def _find_procedure_table(self, lines: List[str]) -> Tuple[int, int]:
+        """Retorna (inicio, fin) de la tabla de procedimientos; (-1, -1) si no se encuentra"""
+        return find_table_bounds(lines)
+
+    def _extract_table_procedures(self, lines: List[str], table_start: int, table_end: int,
+                                  budget: Optional[RegexBudget] = None) -> List[ProcedureRecord]:
+        """Procedimientos de la tabla: cada línea se lee una sola vez"""
+        procedures = []
+        seen_keys = set()  # Para evitar duplicados
+        
+        rows = LineTableParser().parse(lines, table_start, table_end, budget)
+        
+        # Columnas de valores convertidas en bloque (valores repetidos una sola vez)
+        values = parse_money_column(
+            value for row in rows for value in (row['valor_total'], row['valor_pagado'], row['valor_objetado'])
+        )
+        
+        # El f-string del log por fila se arma solo si el nivel DEBUG está activo
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        for index, row in enumerate(rows):
+            procedure = self._procedure_from_line_row(row, values[index * 3:index * 3 + 3])
+            
+            # is not None: la verdad de un ProcedureRecord recorre todos sus campos
+            if procedure is not None:
+                # Crear clave única para evitar duplicados
+                key = f"{procedure.codigo}_{procedure.descripcion[:30]}"
+                if key not in seen_keys:
+                    procedures.append(procedure)
+                    seen_keys.add(key)
+                    if debug:
+                        logger.debug(f"Procedimiento extraído: {procedure.codigo} - {procedure.descripcion[:50]}...")
+        
+        return procedures
+
+    def _procedure_from_line_row(self, row: Dict[str, str],
+                                 values: Optional[List[int]] = None) -> Optional[ProcedureRecord]:
         """
-        Extrae un procedimiento de una línea específica
-        Maneja todos los formatos posibles y MEJORA la extracción de observaciones
+        Convierte una fila cruda de LineTableParser en procedimiento validado
+        values: (total, pagado, objetado) ya convertidos; si no se pasan se convierten aquí
         """
-        # Patrón 1: Línea completa con código de 5 dígitos
-        pattern1 = r'^(\d{5})\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)'
-        match = re.match(pattern1, line, re.IGNORECASE)
+        codigo = row['codigo'].strip()
+        descripcion = self._clean_description(row['descripcion'].strip())
+        cantidad = float(row['cantidad'].strip())
+        if values is None:
+            values = parse_money_column((row['valor_total'], row['valor_pagado'], row['valor_objetado']))
+        valor_total, valor_pagado, valor_objetado = values
+        
+        if row['extraction_method'] == 'no_code':
+            is_valid = self._is_valid_procedure_without_code(descripcion, valor_total)
+        else:
+            is_valid = self._is_valid_procedure(codigo, descripcion, valor_total)
         
-        if match:
-            codigo = match.group(1).strip()
-            descripcion = self._clean_description(match.group(2).strip())
-            cantidad = float(match.group(3).strip())
-            valor_total = self._parse_money_value(match.group(4))
-            valor_pagado = self._parse_money_value(match.group(5))
-            valor_objetado = self._parse_money_value(match.group(6))
-            
-            # Buscar observación en el resto de la línea o líneas siguientes
-            observacion = self._extract_observation_from_lines(all_lines, line_idx, table_end)
+        if not is_valid:
+            return None
+        
+        return ProcedureRecord.from_values(
+            codigo, descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+            self._clean_observation(row['observacion']), row['extraction_method']
+        )
+
+    def _extract_procedures_from_layout(self, pdf_path: str,
+                                        page_range: Optional[Tuple[int, int]] = None) -> List[ProcedureRecord]:
+        """
+        Extrae la tabla de procedimientos por coordenadas de palabras
+        Las filas se arman por geometría (filas multilínea y códigos en su propia línea incluidos)
+        y se guardan con el texto de las páginas: reprocesar no vuelve a abrir el PDF
+        """
+        try:
+            start, end = page_range if page_range else (0, None)
+            store = self.page_text_store or get_page_text_store()
+            content_hash = compute_file_hash(pdf_path) if store else None
+            rows = store.get_layout_rows(content_hash, start, end, LAYOUT_ROWS_VERSION) if store else None
             
-            if self._is_valid_procedure(codigo, descripcion, valor_total):
-                return {
-                    'codigo': codigo,
-                    'descripcion': descripcion,
-                    'cantidad': int(cantidad),
-                    'valor_unitario': valor_total / cantidad if cantidad > 0 else 0,
-                    'valor_total': valor_total,
-                    'valor_pagado': valor_pagado,
-                    'valor_objetado': valor_objetado,
-                    'observacion': observacion,
-                    'estado': 'objetado' if valor_objetado > 0 else 'aceptado',
-                    'extraction_method': 'table_line'
-                }
+            if rows is None:
+                doc = get_document_pool().get(pdf_path)
+                rows = LayoutTableExtractor().extract_rows(doc, start, end)
+                if store:
+                    store.put_layout_rows(content_hash, rows, start, end, LAYOUT_ROWS_VERSION)
+        except Exception as e:
+            logger.warning(f"Error extrayendo tabla por coordenadas: {e}")
+            return []
         
-        # Patrón 2: Código compuesto (como 19934768-18)
-        pattern_compuesto = r'^(\d{5,8}-\d{1,2})\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)'
-        match = re.match(pattern_compuesto, line, re.IGNORECASE)
+        procedures = []
+        seen_keys = set()
         
-        if match:
-            codigo = match.group(1).strip()
-            descripcion = self._clean_description(match.group(2).strip())
-            cantidad = float(match.group(3).strip())
-            valor_total = self._parse_money_value(match.group(4))
-            valor_pagado = self._parse_money_value(match.group(5))
-            valor_objetado = self._parse_money_value(match.group(6))
+        for row in rows:
+            procedure = self._procedure_from_layout_row(row)
+            if not procedure:
+                continue
             
-            # Buscar observación
-            observacion = self._extract_observation_from_lines(all_lines, line_idx, table_end)
-            
-            if self._is_valid_procedure(codigo, descripcion, valor_total):
-                return {
-                    'codigo': codigo,
-                    'descripcion': descripcion,
-                    'cantidad': int(cantidad),
-                    'valor_unitario': valor_total / cantidad if cantidad > 0 else 0,
-                    'valor_total': valor_total,
-                    'valor_pagado': valor_pagado,
-                    'valor_objetado': valor_objetado,
-                    'observacion': observacion,
-                    'estado': 'objetado' if valor_objetado > 0 else 'aceptado',
-                    'extraction_method': 'table_line_compound'
-                }
+            key = f"{procedure['codigo']}_{procedure['descripcion'][:30]}"
+            if key not in seen_keys:
+                procedures.append(procedure)
+                seen_keys.add(key)
         
-        # Patrón 3: Solo código en la línea
-        if re.match(r'^(\d{5})$', line.strip()):
-            codigo = line.strip()
-            # Buscar descripción y valores en líneas siguientes
-            if line_idx + 1 < table_end:
-                next_line = all_lines[line_idx + 1].strip()
-                # Si la siguiente línea tiene la descripción
-                if re.match(r'^[A-ZÁÉÍÓÚÑ]', next_line, re.IGNORECASE):
-                    # Intentar extraer todo de las siguientes líneas
-                    combined_text = ' '.join([all_lines[j].strip() for j in range(line_idx + 1, min(line_idx + 4, table_end))])
-                    
-                    # Buscar patrón de descripción + valores
-                    desc_pattern = r'^([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)'
-                    desc_match = re.match(desc_pattern, combined_text, re.IGNORECASE)
-                    
-                    if desc_match:
-                        descripcion = self._clean_description(desc_match.group(1).strip())
-                        cantidad = float(desc_match.group(2).strip())
-                        valor_total = self._parse_money_value(desc_match.group(3))
-                        valor_pagado = self._parse_money_value(desc_match.group(4))
-                        valor_objetado = self._parse_money_value(desc_match.group(5))
-                        
-                        if self._is_valid_procedure(codigo, descripcion, valor_total):
-                            return {
-                                'codigo': codigo,
-                                'descripcion': descripcion,
-                                'cantidad': int(cantidad),
-                                'valor_unitario': valor_total / cantidad if cantidad > 0 else 0,
-                                'valor_total': valor_total,
-                                'valor_pagado': valor_pagado,
-                                'valor_objetado': valor_objetado,
-                                'observacion': '',
-                                'estado': 'objetado' if valor_objetado > 0 else 'aceptado',
-                                'extraction_method': 'multiline'
-                            }
-        
-        # Patrón 4: Procedimiento sin código (como VENDA ELASTICA)
-        if re.match(r'^[A-ZÁÉÍÓÚÑ]', line, re.IGNORECASE) and '$' in line:
-            # Patrón para línea sin código
-            no_code_pattern = r'^([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)'
-            match = re.match(no_code_pattern, line, re.IGNORECASE)
-            
-            if match:
-                descripcion = self._clean_description(match.group(1).strip())
-                cantidad = float(match.group(2).strip())
-                valor_total = self._parse_money_value(match.group(3))
-                valor_pagado = self._parse_money_value(match.group(4))
-                valor_objetado = self._parse_money_value(match.group(5))
-                
-                if self._is_valid_procedure_without_code(descripcion, valor_total):
-                    return {
-                        'codigo': '00000',
-                        'descripcion': descripcion,
-                        'cantidad': int(cantidad),
-                        'valor_unitario': valor_total / cantidad if cantidad > 0 else 0,
-                        'valor_total': valor_total,
-                        'valor_pagado': valor_pagado,
-                        'valor_objetado': valor_objetado,
-                        'observacion': '',
-                        'estado': 'objetado' if valor_objetado > 0 else 'aceptado',
-                        'extraction_method': 'no_code'
-                    }
-        
-        return None
+        logger.info(f"Procedimientos extraídos por coordenadas: {len(procedures)} de {len(rows)} filas")
+        return procedures
 
-    def _extract_observation_from_lines(self, lines: List[str], start_idx: int, end_idx: int) -> str:
+    def _procedure_from_layout_row(self, row: Dict[str, str]) -> Optional[ProcedureRecord]:
+        """Convierte una fila cruda de la tabla por coordenadas en procedimiento validado"""
+        codigo = row.get('codigo') or '00000'
+        descripcion = self._clean_description(row.get('descripcion', ''))
+        valor_total = self._parse_money_value(row.get('valor_total', ''))
+        valor_pagado = self._parse_money_value(row.get('valor_pagado', ''))
+        valor_objetado = self._parse_money_value(row.get('valor_objetado', ''))
+        
+        try:
+            cantidad = float(row.get('cantidad', '').replace(',', '.').split()[0])
+        except (ValueError, IndexError):
+            cantidad = 1.0
+        
+        # Quitar los códigos de observación ("4567 >>") y marcas de continuación
+        observacion = OBSERVATION_MARKER_PATTERN.sub(' ', row.get('observacion', ''))
+        observacion = self._clean_observation(observacion)
+        
+        if codigo == '00000':
+            is_valid = self._is_valid_procedure_without_code(descripcion, valor_total)
+        else:
+            is_valid = self._is_valid_procedure(codigo, descripcion, valor_total)
+        
+        if not is_valid:
+            return None
+        
+        return ProcedureRecord.from_values(
+            codigo, descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+            observacion, 'layout_table'
+        )
+
+    def _layout_table_reconciles(self, result: Dict[str, Any]) -> bool:
         """
-        Extrae observaciones que pueden estar en líneas siguientes
-        MEJORADO para capturar mejor las observaciones de glosas
+        Verifica si la tabla leída por coordenadas es confiable: todos los procedimientos
+        vienen de ella y la suma de valores totales coincide con el valor de reclamación
         """
-        observation = ""
-        
-        # Buscar en la misma línea después de los valores
-        current_line = lines[start_idx]
-        
-        # Patrón 1: Observación al final de la línea (después de valores)
-        obs_pattern1 = r'\$[\d,\.]+\s+\$[\d,\.]+\s+\$[\d,\.]+\s+(.+)$'
-        obs_match = re.search(obs_pattern1, current_line)
-        if obs_match:
-            observation = obs_match.group(1).strip()
-        
-        # Patrón 2: Observación con código de error (como 4567 >> texto)
-        obs_pattern2 = r'(\d{4})\s*>>\s*(.+?)$'
-        obs_match = re.search(obs_pattern2, current_line)
-        if obs_match:
-            observation = obs_match.group(2).strip()
-        
-        # Buscar en líneas siguientes
-        for i in range(start_idx + 1, min(start_idx + 5, end_idx)):
-            if i >= len(lines):
-                break
-                
-            line = lines[i].strip()
-            
-            # Si encontramos un nuevo procedimiento, parar
-            if re.match(r'^\d{5}', line) or 'Total' in line:
-                break
-            
-            # Observación con código
-            if re.match(r'^\d{4}\s*>>', line):
-                obs_match = re.search(r'^\d{4}\s*>>\s*(.+)', line)
-                if obs_match:
-                    new_obs = obs_match.group(1).strip()
-                    if observation:
-                        observation += " " + new_obs
-                    else:
-                        observation = new_obs
-            
-            # Continuación de observación (línea que empieza con >>)
-            elif re.match(r'^>>', line):
-                continuation = line[2:].strip()
-                if observation:
-                    observation += " " + continuation
-                else:
-                    observation = continuation
-            
-            # Texto libre que podría ser observación
-            elif line and not re.match(r'^\d', line) and len(line) > 10:
-                # Solo si no tenemos observación aún y la línea parece ser texto descriptivo
-                if not observation and any(word in line.upper() for word in ['GLOSA', 'OBJETA', 'NO', 'PERTINENTE', 'CORRESPONDE']):
-                    observation = line
+        procedures = result.get('procedures', [])
+        claimed = result.get('financial_summary', {}).get('valor_reclamacion', 0)
+        
+        if not procedures or not claimed:
+            return False
+        
+        if any(proc.get('extraction_method') != 'layout_table' for proc in procedures):
+            return False
         
-        return self._clean_observation(observation)
+        # Suma exacta en pesos enteros
+        return sum_money(proc.get('valor_total', 0) for proc in procedures) == parse_money(claimed)
 
-    def _extract_procedures_from_full_text(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_procedures_from_full_text(self, text: str, budget: Optional[RegexBudget] = None) -> List[ProcedureRecord]:
         """
         Extracción de respaldo cuando no se encuentra tabla estructurada
         """
         procedures = []
         
         # Múltiples patrones para capturar diferentes formatos
-        patterns = [
-            # Patrón 1: Código 5 dígitos + descripción + valores
-            r'(\d{5})\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)',
-            # Patrón 2: Código compuesto + descripción + valores
-            r'(\d{5,8}-\d{1,2})\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\w\/\#\,\.\-\(\)\%]+?)\s+(\d+(?:\.\d+)?)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)\s+\$?([\d,\.]+)',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.MULTILINE | re.IGNORECASE)
+        for pattern in PROCEDURE_FULL_TEXT_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
+                if budget and budget.expired('texto completo'):
+                    return procedures
                 try:
                     codigo = match.group(1).strip()
                     descripcion = self._clean_description(match.group(2).strip())
@@ -514,18 +400,10 @@ class MedicalClaimExtractor:
                     valor_objetado = self._parse_money_value(match.group(6))
                     
                     if self._is_valid_procedure(codigo, descripcion, valor_total):
-                        procedure = {
-                            'codigo': codigo,
-                            'descripcion': descripcion,
-                            'cantidad': int(cantidad),
-                            'valor_unitario': valor_total / cantidad if cantidad > 0 else 0,
-                            'valor_total': valor_total,
-                            'valor_pagado': valor_pagado,
-                            'valor_objetado': valor_objetado,
-                            'observacion': '',
-                            'estado': 'objetado' if valor_objetado > 0 else 'aceptado',
-                            'extraction_method': 'full_text'
-                        }
+                        procedure = ProcedureRecord.from_values(
+                            codigo, descripcion, cantidad, valor_total, valor_pagado, valor_objetado,
+                            '', 'full_text'
+                        )
                         procedures.append(procedure)
                 except Exception as e:
                     logger.error(f"Error procesando match: {e}")
@@ -537,8 +415,8 @@ class MedicalClaimExtractor:
         """Validación mejorada de procedimientos"""
         # Validar código - aceptar diferentes formatos
         valid_code = (
-            re.match(r'^\d{5}$', codigo) or  # 5 dígitos
-            re.match(r'^\d{5,8}-\d{1,2}$', codigo) or  # Código compuesto
+            CODE_PATTERN.match(codigo) or  # 5 dígitos
+            COMPOUND_CODE_PATTERN.match(codigo) or  # Código compuesto
             codigo == '00000'  # Sin código
         )
         
@@ -550,7 +428,7 @@ class MedicalClaimExtractor:
             return False
         
         # La descripción no debe ser solo observación
-        if descripcion.startswith('>>') or re.match(r'^\d{4}\s*>>', descripcion):
+        if descripcion.startswith('>>') or OBSERVATION_CODE_PREFIX_PATTERN.match(descripcion):
             return False
         
         # Patrones inválidos en descripción
@@ -691,13 +569,13 @@ class MedicalClaimExtractor:
             return ''
         
         # Si ya está en formato DD/MM/YYYY, mantenerlo
-        if re.match(r'\d{1,2}/\d{1,2}/\d{4}', date_str):
+        if DATE_DMY_PATTERN.match(date_str):
             return date_str
         
         # Convertir otros formatos comunes
         try:
             # Formato YYYY-MM-DD
-            if re.match(r'\d{4}-\d{1,2}-\d{1,2}', date_str):
+            if DATE_ISO_PATTERN.match(date_str):
                 parts = date_str.split('-')
                 return f"{parts[2]}/{parts[1]}/{parts[0]}"
         except:
@@ -709,10 +587,9 @@ class MedicalClaimExtractor:
     # INTEGRACIÓN MEJORADA CON OPENAI
     # ============================================================================
 
-    def _extract_with_openai(self, text: str) -> Dict[str, Any]:
+    def _extract_with_openai(self, text: str, known_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Extrae información usando OpenAI GPT con logs detallados y procesamiento paginado"""
         try:
-            import openai
             import json
             # Importar procesador paginado
             from .openai_paginated_processor import OpenAIPaginatedProcessorV2
@@ -731,7 +608,8 @@ class MedicalClaimExtractor:
             paginated_processor = OpenAIPaginatedProcessorV2(
                 openai_api_key=self.openai_api_key,
                 chunk_size=15,
-                delay_between_calls=2.0
+                delay_between_calls=2.0,
+                openai_client=self.openai_client
             )
             
             should_paginate, analysis = paginated_processor.should_use_pagination(text)
@@ -743,40 +621,55 @@ class MedicalClaimExtractor:
                 # Usar procesamiento paginado con fallback al método tradicional
                 result = paginated_processor.extract_with_pagination(
                     text=text,
-                    fallback_method=lambda t: self._extract_with_openai_traditional(t)
+                    fallback_method=lambda t: self._extract_with_openai_traditional(t, known_data)
                 )
                 
+                metadata = result.get('processing_metadata', {})
+                paginated_usage = {
+                    key: metadata.get(key, 0)
+                    for key in ('estimated_prompt_tokens', 'prompt_tokens', 'completion_tokens', 'api_calls')
+                }
+                
                 # Verificar si el resultado es válido
-                procedures = result.get('procedures', [])
+                procedures = result['procedures'] = to_records(result.get('procedures', []))
                 if len(procedures) == 0 and analysis.get('estimated_procedures', 0) > 10:
                     logger.warning("⚠️ Procesamiento paginado no extrajo procedimientos, usando fallback")
-                    return self._extract_with_openai_traditional(text)
+                    fallback = self._extract_with_openai_traditional(text, known_data)
+                    # Los tokens de los chunks también se gastaron
+                    if fallback and fallback.get('token_usage'):
+                        for key, value in paginated_usage.items():
+                            fallback['token_usage'][key] += value
+                    return fallback
                 
+                result.setdefault('token_usage', paginated_usage)
                 return result
             else:
                 logger.info("📄 DOCUMENTO NORMAL - Usando método tradicional")
-                return self._extract_with_openai_traditional(text)
+                return self._extract_with_openai_traditional(text, known_data)
                 
         except Exception as e:
             logger.error(f"❌ ERROR EN MÉTODO PRINCIPAL: {str(e)}")
             # Fallback al método tradicional
-            return self._extract_with_openai_traditional(text)
+            return self._extract_with_openai_traditional(text, known_data)
     
-    def _extract_with_openai_traditional(self, text: str) -> Dict[str, Any]:
+    def _extract_with_openai_traditional(self, text: str,
+                                         known_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Método tradicional de extracción con OpenAI (para documentos pequeños)"""
         try:
-            import openai
             import json
             
             start_time = time.time()
             
-            # Configurar cliente
-            client = openai.OpenAI(api_key=self.openai_api_key)
-            logger.info("Cliente OpenAI configurado exitosamente")
+            # Cliente compartido del proceso (conexiones keep-alive)
+            client = self.openai_client or get_openai_client(self.openai_api_key)
             
-            # Construir prompt
-            prompt = self._build_enhanced_openai_prompt(text)
-            logger.info(f"Prompt construido: {len(prompt)} caracteres")
+            # Construir prompt dentro del presupuesto de tokens
+            prompt = self._build_enhanced_openai_prompt(text, known_data)
+            logger.info(f"Prompt construido: {len(prompt.text)} caracteres, ~{prompt.tokens} tokens "
+                        f"({', '.join(prompt.sections)})")
+            if prompt.truncated:
+                logger.warning(f"Tabla más larga que el presupuesto de tokens: {prompt.table_lines} "
+                               f"de {prompt.table_lines_total} líneas en el prompt")
             
             # Preparar request
             messages = [
@@ -796,80 +689,48 @@ class MedicalClaimExtractor:
                 },
                 {
                     "role": "user", 
-                    "content": prompt
+                    "content": prompt.text
                 }
             ]
             
-            logger.info("Enviando request a OpenAI API...")
-            logger.info(f"Modelo: gpt-4o-mini")
-            logger.info(f"Max tokens: 4000")
-            logger.info(f"Temperature: 0.1")
-            
-            # Hacer la llamada
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.1,
-                max_tokens=4000
-            )
-            
-            elapsed_time = time.time() - start_time
+            # Reprocesar el mismo texto (o un upload duplicado) reutiliza la respuesta en caché;
+            # las secciones y líneas de tabla incluidas distinguen prompts armados con contexto o presupuesto distintos
+            prompt_version = f"{self.openai_prompt_version}:{','.join(prompt.sections)}:{prompt.table_lines}"
+            usage = {}
+            try:
+                ai_data = cached_llm_result(
+                    DOCUMENT_LEVEL, OPENAI_MODEL, prompt_version, text,
+                    lambda: self._request_openai_document(client, messages, start_time, usage)
+                )
+            except json.JSONDecodeError:
+                return self._get_empty_result()
             
-            # Log de la respuesta
-            logger.info(f"Respuesta recibida en {elapsed_time:.2f} segundos")
-            logger.info(f"Tokens usados:")
-            logger.info(f"  - Prompt tokens: {response.usage.prompt_tokens}")
-            logger.info(f"  - Completion tokens: {response.usage.completion_tokens}")
-            logger.info(f"  - Total tokens: {response.usage.total_tokens}")
+            logger.info(f"Procedimientos encontrados: {len(ai_data.get('procedures', []))}")
             
-            # Estimar costo (precios aproximados para gpt-4o-mini)
-            prompt_cost = response.usage.prompt_tokens * 0.00015 / 1000
-            completion_cost = response.usage.completion_tokens * 0.0006 / 1000
-            total_cost = prompt_cost + completion_cost
+            # Log detallado de procedimientos
+            if ai_data.get('procedures'):
+                logger.info("Detalle de procedimientos encontrados:")
+                for idx, proc in enumerate(ai_data['procedures'], 1):
+                    logger.info(f"  {idx}. Código: {proc.get('codigo', 'N/A')}")
+                    logger.info(f"     Descripción: {proc.get('descripcion', 'N/A')}")
+                    logger.info(f"     Valor: ${proc.get('valor_total', 0):,.0f}")
+                    logger.info(f"     Estado: {proc.get('estado', 'N/A')}")
+                    if proc.get('observacion'):
+                        logger.info(f"     Observación: {proc.get('observacion', '')[:100]}...")
             
-            logger.info(f"Costo estimado: ${total_cost:.4f} USD")
-            logger.info(f"  - Prompt: ${prompt_cost:.4f}")
-            logger.info(f"  - Completion: ${completion_cost:.4f}")
+            # Validar y limpiar datos
+            ai_data = self._validate_openai_data(ai_data)
+            ai_data['token_usage'] = {
+                'estimated_prompt_tokens': prompt.tokens,
+                'prompt_tokens': usage.get('prompt_tokens', 0),
+                'completion_tokens': usage.get('completion_tokens', 0),
+                'api_calls': 1 if usage else 0,
+            }
             
-            # Procesar respuesta
-            ai_response = response.choices[0].message.content.strip()
-            logger.info(f"Respuesta recibida: {len(ai_response)} caracteres")
+            logger.info("PROCESO OPENAI TRADICIONAL - COMPLETADO EXITOSAMENTE")
+            logger.info("=" * 60)
             
-            try:
-                # Limpiar respuesta
-                if '```json' in ai_response:
-                    ai_response = ai_response.split('```json')[1].split('```')[0]
-                elif '```' in ai_response:
-                    ai_response = ai_response.split('```')[1].split('```')[0]
-                
-                ai_data = json.loads(ai_response)
-                
-                logger.info("JSON parseado exitosamente")
-                logger.info(f"Procedimientos encontrados: {len(ai_data.get('procedures', []))}")
-                
-                # Log detallado de procedimientos
-                if ai_data.get('procedures'):
-                    logger.info("Detalle de procedimientos encontrados:")
-                    for idx, proc in enumerate(ai_data['procedures'], 1):
-                        logger.info(f"  {idx}. Código: {proc.get('codigo', 'N/A')}")
-                        logger.info(f"     Descripción: {proc.get('descripcion', 'N/A')}")
-                        logger.info(f"     Valor: ${proc.get('valor_total', 0):,.0f}")
-                        logger.info(f"     Estado: {proc.get('estado', 'N/A')}")
-                        if proc.get('observacion'):
-                            logger.info(f"     Observación: {proc.get('observacion', '')[:100]}...")
-                
-                # Validar y limpiar datos
-                ai_data = self._validate_openai_data(ai_data)
-                
-                logger.info("PROCESO OPENAI TRADICIONAL - COMPLETADO EXITOSAMENTE")
-                logger.info("=" * 60)
-                
-                return ai_data
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parseando JSON de OpenAI: {e}")
-                logger.error(f"Respuesta (primeros 500 chars): {ai_response[:500]}...")
-                return self._get_empty_result()
+            return ai_data
                 
         except ImportError:
             logger.error("OpenAI no está instalado. Instale con: pip install openai")
@@ -878,213 +739,123 @@ class MedicalClaimExtractor:
             logger.error(f"Error en proceso OpenAI tradicional: {str(e)}", exc_info=True)
             return self._get_empty_result()
 
-    def _build_enhanced_openai_prompt(self, text: str) -> str:
-        """Construye prompt mejorado para OpenAI que captura TODOS los procedimientos y observaciones"""
-        # Usar más texto para asegurar que capturamos todos los procedimientos
-        text_sample = text[:8000] if len(text) > 8000 else text
+    def _request_openai_document(self, client, messages: List[Dict[str, str]], start_time: float,
+                                 usage: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Llama a OpenAI con el prompt del documento y retorna el JSON de la respuesta
+        Los tokens reales de la llamada quedan en usage
+        """
+        logger.info("Enviando request a OpenAI API...")
+        logger.info(f"Modelo: {OPENAI_MODEL}")
+        logger.info(f"Max tokens: 4000")
+        logger.info(f"Temperature: 0.1")
+        
+        # Hacer la llamada
+        response = create_chat_completion(
+            client,
+            model=OPENAI_MODEL,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=4000
+        )
         
-        return f"""
-        Analiza este documento de liquidación SOAT colombiano y extrae TODA la información.
-
-        INSTRUCCIONES CRÍTICAS PARA PROCEDIMIENTOS:
-        
-        1. DEBES encontrar TODOS los procedimientos médicos en la tabla, incluyendo:
-           - Procedimientos con código de 5 dígitos (21102, 39145, etc.)
-           - Procedimientos con código compuesto (19922562-10)
-           - Procedimientos SIN código (VENDA ELASTICA, CATETER INTRAVENOSO, etc.)
-           
-        2. Para procedimientos sin código, usa "00000" como código
-        
-        3. IMPORTANTE: En el documento puede aparecer EL MISMO CÓDIGO varias veces con diferente descripción.
-           Por ejemplo:
-           21102 RADIOGRAFIA DE RODILLA AP LATE
-           21102 RADIOGRAFIA DE PIERNA AP Y LAT
-           
-           Estos son DOS PROCEDIMIENTOS DIFERENTES que debes incluir ambos.
-           
-        4. Los procedimientos pueden aparecer en diferentes formatos:
-           - Todo en una línea: código descripción cantidad valores
-           - En múltiples líneas: código en una línea, descripción en otra
-           - Sin código: directamente la descripción seguida de valores
-           
-        5. Busca ESPECÍFICAMENTE en la tabla que tiene columnas como:
-           Código | Descripción | Cant | Valor total | Valor pagado | Valor objetado | Observación
-           
-        6. INCLUYE TODOS los items que aparezcan en esta tabla, sin excepción.
-
-        7. EXTRAE LAS OBSERVACIONES: Las observaciones son CRÍTICAS. Pueden aparecer:
-           - Al final de la línea del procedimiento
-           - En líneas separadas con formato "4567 >> texto de la observación"
-           - Como texto libre después de los valores monetarios
-           
-        8. Para INFORMACIÓN GENERAL, extrae:
-           - Nombre completo del paciente (después de "Víctima :")
-           - Número de documento de identidad  
-           - Número de reclamación/factura
-           - Fechas importantes (siniestro, ingreso, pago)
-           - Valores totales de la liquidación
-
-        TEXTO DEL DOCUMENTO:
-        {text_sample}
-
-        Responde ÚNICAMENTE con el siguiente JSON (sin texto adicional):
-
-        {{
-        "patient_info": {{
-            "nombre": "nombre completo del paciente",
-            "documento": "número de documento",
-            "tipo_documento": "tipo (CC, TI, etc.)"
-        }},
-        "policy_info": {{
-            "numero_liquidacion": "número de liquidación",
-            "poliza": "número de póliza", 
-            "numero_reclamacion": "número de reclamación",
-            "fecha_siniestro": "fecha del siniestro",
-            "fecha_ingreso": "fecha de ingreso",
-            "fecha_pago": "fecha de pago",
-            "orden_pago": "orden de pago"
-        }},
-        "procedures": [
-            {{
-            "codigo": "código del procedimiento (5 dígitos, compuesto, o '00000' si no tiene)",
-            "descripcion": "descripción COMPLETA del procedimiento/medicamento/material",
-            "cantidad": cantidad numérica,
-            "valor_total": valor total numérico,
-            "valor_pagado": valor pagado numérico,
-            "valor_objetado": valor objetado numérico,
-            "observacion": "observación/glosa si existe (MUY IMPORTANTE)",
-            "estado": "objetado o aceptado",
-            "extraction_method": "ai_extraction"
-            }}
-        ],
-        "financial_summary": {{
-            "total_reclamado": valor total reclamado,
-            "total_objetado": valor total objetado,
-            "total_pagado": valor total pagado,
-            "valor_nota_credito": valor nota crédito si existe,
-            "valor_impuestos": valor impuestos si existe
-        }},
-        "diagnostics": [
-            {{
-            "codigo": "código CIE-10",
-            "descripcion": "descripción del diagnóstico",
-            "tipo": "principal o secundario"
-            }}
-        ],
-        "ips_info": {{
-            "nombre": "nombre de la IPS",
-            "nit": "NIT si está disponible"
-        }}
-        }}
+        elapsed_time = time.time() - start_time
+        
+        # Log de la respuesta
+        logger.info(f"Respuesta recibida en {elapsed_time:.2f} segundos")
+        logger.info(f"Tokens usados:")
+        logger.info(f"  - Prompt tokens: {response.usage.prompt_tokens}")
+        logger.info(f"  - Completion tokens: {response.usage.completion_tokens}")
+        logger.info(f"  - Total tokens: {response.usage.total_tokens}")
+        usage['prompt_tokens'] = response.usage.prompt_tokens
+        usage['completion_tokens'] = response.usage.completion_tokens
+        
+        # Estimar costo (precios aproximados para gpt-4o-mini)
+        prompt_cost = response.usage.prompt_tokens * 0.00015 / 1000
+        completion_cost = response.usage.completion_tokens * 0.0006 / 1000
+        total_cost = prompt_cost + completion_cost
+        
+        logger.info(f"Costo estimado: ${total_cost:.4f} USD")
+        logger.info(f"  - Prompt: ${prompt_cost:.4f}")
+        logger.info(f"  - Completion: ${completion_cost:.4f}")
+        
+        # Procesar respuesta
+        ai_response = response.choices[0].message.content.strip()
+        logger.info(f"Respuesta recibida: {len(ai_response)} caracteres")
+        
+        try:
+            # Limpiar respuesta
+            if '```json' in ai_response:
+                ai_response = ai_response.split('```json')[1].split('```')[0]
+            elif '```' in ai_response:
+                ai_response = ai_response.split('```')[1].split('```')[0]
+            
+            ai_data = json.loads(ai_response)
+            logger.info("JSON parseado exitosamente")
+            return ai_data
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parseando JSON de OpenAI: {e}")
+            logger.error(f"Respuesta (primeros 500 chars): {ai_response[:500]}...")
+            raise
 
-        RECUERDA: 
-        - Incluir TODOS los procedimientos que aparezcan en la tabla
-        - Si el mismo código aparece varias veces, incluir TODAS las ocurrencias
-        - Los valores monetarios deben ser números, no strings
-        - Si no tiene código, usar "00000"
-        - EXTRAE LAS OBSERVACIONES - son críticas para el proceso de glosas
+    def _build_enhanced_openai_prompt(self, text: str,
+                                      known_data: Optional[Dict[str, Any]] = None) -> DocumentPrompt:
+        """
+        Construye el prompt para OpenAI que captura TODOS los procedimientos y observaciones
+        La tabla de procedimientos entra primero dentro del presupuesto de tokens; los datos
+        que el regex ya extrajo (known_data) van como contexto (ver prompt_builder)
         """
+        return build_document_prompt(text, known_data)
 
     # ============================================================================
     # MÉTODOS AUXILIARES MEJORADOS
     # ============================================================================
 
-    def _extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extrae texto de PDF usando PyMuPDF"""
+    def _extract_text_from_pdf(self, pdf_path: str, page_range: Optional[Tuple[int, int]] = None) -> str:
+        """
+        Extrae texto de PDF, primero desde la caché de páginas y si no con PyMuPDF
+        Con page_range solo se lee esa ventana de páginas (documentos hijos por rango)
+        """
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
+            store = self.page_text_store or get_page_text_store()
+            content_hash = None
+            start, end = page_range if page_range else (0, None)
+            
+            if store:
+                content_hash = compute_file_hash(pdf_path)
+                page_texts = store.get_pages(content_hash, start, end)
+                if page_texts is not None:
+                    logger.info(f"Texto reutilizado desde caché de páginas ({len(page_texts)} páginas)")
+                    return join_page_texts(page_texts)
             
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text()
-                text += page_text + "\n"
+            # El documento queda abierto en el pool del worker para los siguientes hijos
+            # Los rangos grandes se reparten entre procesos
+            doc = get_document_pool().get(pdf_path)
+            unrecognized = []
+            page_texts = scan_page_texts(pdf_path, start, end, doc=doc, unrecognized=unrecognized)
             
-            doc.close()
-            return text
+            # Páginas escaneadas sin OCR no se guardan: el próximo intento debe reconocerlas
+            if store and not unrecognized:
+                store.put_pages(content_hash, page_texts, start=start, complete=end is None)
+            
+            return join_page_texts(page_texts)
             
         except Exception as e:
             logger.error(f"Error extrayendo texto del PDF: {str(e)}")
             return ""
 
-    def _parse_money_value(self, value_str: str) -> float:
-        """Convierte string monetario a float"""
-        if not value_str:
-            return 0.0
-        
-        try:
-            clean_value = re.sub(r'[\$\s]', '', str(value_str))
-            
-            if ',' in clean_value and clean_value.count(',') == 1:
-                parts = clean_value.split(',')
-                if len(parts[1]) <= 2:
-                    clean_value = clean_value.replace(',', '.')
-                else:
-                    clean_value = clean_value.replace(',', '')
-            else:
-                clean_value = clean_value.replace(',', '')
-            
-            return float(clean_value)
-        except (ValueError, TypeError):
-            return 0.0
+    def _parse_money_value(self, value_str: str) -> int:
+        """Convierte string monetario a pesos enteros (ver money.parse_money)"""
+        return parse_money(value_str)
 
     def _clean_description(self, description: str) -> str:
-        """Limpieza de descripción"""
-        if not description:
-            return ""
-        
-        # No remover contenido antes de guiones si es parte de la descripción
-        # Solo remover si es claramente basura
-        description = re.sub(r'^\d+\s*$', '', description)  # Solo números
-        description = re.sub(r'\$[\d,\.]+', '', description)  # Valores monetarios
-        description = re.sub(r'\s*\d{4}\s+>>', '', description)  # Códigos de observación
-        
-        # Remover observaciones que se colaron en la descripción
-        if '>>' in description:
-            description = description.split('>>')[0].strip()
-        
-        # Remover texto problemático solo si está al inicio
-        stop_words_start = ['LIQ-', 'Pagina', 'Liquidación', 'Fecha de', 'Víctima', 'Número de']
-        for stop_word in stop_words_start:
-            if description.startswith(stop_word):
-                return ""
-        
-        # Normalizar espacios
-        description = re.sub(r'\s+', ' ', description.strip())
-        
-        # No modificar el caso si ya está bien formateado
-        if description and not description.isupper():
-            return description
-        
-        # Si está todo en mayúsculas, convertir a título
-        if description.isupper():
-            words = description.split()
-            cleaned_words = []
-            for word in words:
-                if len(word) <= 3:
-                    cleaned_words.append(word)  # Mantener siglas
-                else:
-                    cleaned_words.append(word.capitalize())
-            description = ' '.join(cleaned_words)
-        
-        return description
+        """Limpieza de descripción (memorizada por proceso, ver text_normalizer)"""
+        return get_text_normalizer().description(description)
 
     def _clean_observation(self, observation: str) -> str:
-        """Limpieza de observación mejorada"""
-        if not observation:
-            return ""
-        
-        # Normalizar espacios
-        observation = re.sub(r'\s+', ' ', observation.strip())
-        
-        # Remover caracteres de inicio problemáticos
-        observation = re.sub(r'^[>\s]+', '', observation)
-        
-        # Truncar si es muy largo
-        if len(observation) > 500:
-            observation = observation[:500] + "..."
-        
-        return observation
+        """Limpieza de observación (memorizada por proceso, ver text_normalizer)"""
+        return get_text_normalizer().observation(observation)
 
     def _get_cie10_description(self, codigo: str) -> str:
         """Obtiene descripción de códigos CIE-10"""
@@ -1105,20 +876,32 @@ class MedicalClaimExtractor:
         
         return ""
 
-    def _extract_soat_data(self, text: str) -> Dict[str, Any]:
-        """Extracción principal de datos SOAT"""
+    def _extract_soat_data(self, text: str, pdf_path: Optional[str] = None,
+                           page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Extracción principal de datos SOAT
+        Con pdf_path la tabla de procedimientos se lee por coordenadas; si no se
+        encuentra se usa la extracción por líneas de texto
+        """
         try:
             result = self._get_empty_result()
             
-            result['patient_info'] = self._extract_patient_info(text)
-            result['policy_info'] = self._extract_policy_info(text)
-            result['procedures'] = self._extract_procedures(text)
-            result['financial_summary'] = self._extract_financial_summary(text)
-            result['diagnostics'] = self._extract_diagnostics(text)
-            result['ips_info'] = self._extract_ips_info(text)
+            # Cada familia de campos se busca solo en su región del documento
+            regions = segment_document(text)
+            budget = RegexBudget()
+            
+            result['patient_info'] = self._extract_patient_info(regions.header)
+            result['policy_info'] = self._extract_policy_info(regions.header)
+            
+            procedures = self._extract_procedures_from_layout(pdf_path, page_range) if pdf_path else []
+            result['procedures'] = procedures or self._extract_procedures(text, regions, budget)
+            result['financial_summary'] = self._extract_financial_summary(regions.footer)
+            result['diagnostics'] = self._extract_diagnostics(regions.header)
+            result['ips_info'] = self._extract_ips_info(regions.header)
             
             # Calcular estadísticas
             result['extraction_details'] = self._calculate_extraction_stats(result)
+            result['extraction_details']['regex_budget_exceeded'] = budget.exceeded
             
             return result
             
@@ -1131,15 +914,15 @@ class MedicalClaimExtractor:
         patient_info = {}
         
         for pattern in self.patient_patterns['nombre']:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            match = pattern.search(text)
             if match:
                 nombre = match.group(1).strip()
-                nombre = re.sub(r'\s+', ' ', nombre)
+                nombre = WHITESPACE_PATTERN.sub(' ', nombre)
                 patient_info['nombre'] = nombre.title()
                 break
         
         for pattern in self.patient_patterns['documento']:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 if len(match.groups()) == 2:
                     patient_info['tipo_documento'] = match.group(1).strip()
@@ -1150,7 +933,7 @@ class MedicalClaimExtractor:
         
         if 'tipo_documento' not in patient_info:
             for pattern in self.patient_patterns['tipo_documento']:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = pattern.search(text)
                 if match:
                     patient_info['tipo_documento'] = match.group(1).strip()
                     break
@@ -1159,16 +942,8 @@ class MedicalClaimExtractor:
 
     def _extract_policy_info(self, text: str) -> Dict[str, Any]:
         """Extrae información de póliza"""
-        policy_info = {}
-        
-        for key, patterns in self.policy_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    policy_info[key] = match.group(1).strip()
-                    break
-        
-        return policy_info
+        # Una sola pasada para todos los campos (misma prioridad que buscar en orden)
+        return self.policy_scanner.scan(text)
 
     def _extract_financial_summary(self, text: str) -> Dict[str, Any]:
         """Extrae resumen financiero"""
@@ -1176,7 +951,7 @@ class MedicalClaimExtractor:
         
         for key, patterns in self.financial_totals_patterns.items():
             for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+                match = pattern.search(text)
                 if match:
                     financial[key] = self._parse_money_value(match.group(1))
                     break
@@ -1203,7 +978,7 @@ class MedicalClaimExtractor:
         diagnostics = []
         
         for pattern in self.diagnostic_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+            matches = pattern.findall(text)
             
             for match in matches:
                 codigo = match.strip().upper()
@@ -1223,15 +998,14 @@ class MedicalClaimExtractor:
         ips_info = {}
         
         for pattern in self.ips_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            match = pattern.search(text)
             if match:
                 nombre = match.group(1).strip()
-                nombre = re.sub(r'\s+', ' ', nombre)
+                nombre = WHITESPACE_PATTERN.sub(' ', nombre)
                 ips_info['nombre'] = nombre.title()
                 break
         
-        nit_pattern = r'NIT\s*-?\s*(\d{9,12})'
-        match = re.search(nit_pattern, text, re.IGNORECASE)
+        match = IPS_NIT_PATTERN.search(text)
         if match:
             ips_info['nit'] = match.group(1).strip()
         
@@ -1310,12 +1084,13 @@ class MedicalClaimExtractor:
         """Valida y limpia los datos extraídos por OpenAI"""
         # Asegurar que los procedimientos tengan los campos correctos
         if 'procedures' in data:
+            data['procedures'] = to_records(data['procedures'])
             for proc in data['procedures']:
                 # Asegurar tipos de datos correctos
                 proc['cantidad'] = int(proc.get('cantidad', 1))
-                proc['valor_total'] = float(proc.get('valor_total', 0))
-                proc['valor_pagado'] = float(proc.get('valor_pagado', 0))
-                proc['valor_objetado'] = float(proc.get('valor_objetado', 0))
+                proc['valor_total'] = parse_money(proc.get('valor_total', 0))
+                proc['valor_pagado'] = parse_money(proc.get('valor_pagado', 0))
+                proc['valor_objetado'] = parse_money(proc.get('valor_objetado', 0))
                 
                 # Calcular valor unitario
                 if proc['cantidad'] > 0:
@@ -1338,7 +1113,7 @@ class MedicalClaimExtractor:
         if 'financial_summary' in data:
             for key in ['total_reclamado', 'total_objetado', 'total_pagado', 'valor_nota_credito', 'valor_impuestos']:
                 if key in data['financial_summary']:
-                    data['financial_summary'][key] = float(data['financial_summary'].get(key, 0))
+                    data['financial_summary'][key] = parse_money(data['financial_summary'].get(key, 0))
         
         return data
 
@@ -1356,62 +1131,31 @@ class MedicalClaimExtractor:
         logger.info(f"AI encontró: {len(ai_procedures)} procedimientos")
 
         for i, proc in enumerate(ocr_procedures):
-            logger.info(f"OCR-{i+1}: {proc['codigo']} - {proc['descripcion'][:30]}... (${proc['valor_total']:,.0f})")
+            logger.debug(f"OCR-{i+1}: {proc['codigo']} - {proc['descripcion'][:30]}... (${proc['valor_total']:,.0f})")
 
         for i, proc in enumerate(ai_procedures):
-            logger.info(f"AI-{i+1}: {proc['codigo']} - {proc['descripcion'][:30]}... (${proc['valor_total']:,.0f})")
+            logger.debug(f"AI-{i+1}: {proc['codigo']} - {proc['descripcion'][:30]}... (${proc['valor_total']:,.0f})")
         
-        # Crear lista de procedimientos combinados
-        merged_procedures = []
+        # Primero, agregar TODOS los procedimientos de OCR (copias) al índice
+        merged_procedures = [ocr_proc.copy() for ocr_proc in ocr_procedures]
+        index = ProcedureMergeIndex(merged_procedures, self._are_exact_same_procedure, self.merge_fuzzy_ratio)
         added_count = 0
         updated_count = 0
         
-        # Primero, agregar TODOS los procedimientos de OCR
-        for ocr_proc in ocr_procedures:
-            merged_procedures.append(dict(ocr_proc))  # Copia profunda
-        
-        # Ahora procesar procedimientos de AI
+        # Ahora procesar procedimientos de AI: cada uno se compara solo con su cubeta
         for ai_proc in ai_procedures:
-            found_exact_match = False
-            
-            for i, merged_proc in enumerate(merged_procedures):
-                if self._are_exact_same_procedure(merged_proc, ai_proc):
-                    
-                    # NUEVO: Priorizar el código más específico
-                    if merged_proc['codigo'] == "00000" and ai_proc['codigo'] != "00000":
-                        merged_procedures[i]['codigo'] = ai_proc['codigo']
-                        logger.info(f"Actualizado código de '00000' a '{ai_proc['codigo']}' para {merged_proc['descripcion'][:30]}...")
-                    elif ai_proc['codigo'] == "00000" and merged_proc['codigo'] != "00000":
-                        # Mantener el código existente
-                        logger.info(f"Manteniendo código '{merged_proc['codigo']}' sobre '00000' para {merged_proc['descripcion'][:30]}...")
-                    
-                    # NUEVO: Priorizar la observación más completa
-                    obs_existing = merged_proc.get('observacion', '').strip()
-                    obs_ai = ai_proc.get('observacion', '').strip()
-                    
-                    if len(obs_ai) > len(obs_existing):
-                        merged_procedures[i]['observacion'] = obs_ai
-                        logger.info(f"Actualizada observación para {merged_proc['codigo']}: {obs_ai[:50]}...")
-                    
-                    # NUEVO: Verificar consistencia de valores
-                    if abs(merged_proc['valor_total'] - ai_proc['valor_total']) > 100:
-                        logger.warning(f"Valores inconsistentes para {merged_proc['codigo']}: {merged_proc['valor_total']} vs {ai_proc['valor_total']}")
-                    
-                    # Actualizar otros campos faltantes
-                    for field in ['descripcion', 'cantidad', 'valor_unitario', 'valor_pagado', 'valor_objetado', 'estado']:
-                        if not merged_procedures[i].get(field) and ai_proc.get(field):
-                            merged_procedures[i][field] = ai_proc[field]
-                    
-                    found_exact_match = True
-                    updated_count += 1
-                    logger.info(f"Actualizado procedimiento existente: {ai_proc['codigo']} - {ai_proc['descripcion'][:30]}...")
-                    break
+            position = index.find(ai_proc)
             
-            # Si no se encontró match exacto, agregar como nuevo
-            if not found_exact_match:
-                merged_procedures.append(ai_proc)
+            # Si no se encontró match, agregar como nuevo
+            if position is None:
+                index.append(ai_proc)
                 added_count += 1
-                logger.info(f"Agregado nuevo procedimiento de AI: {ai_proc['codigo']} - {ai_proc['descripcion'][:30]}...")
+                logger.debug(f"Agregado nuevo procedimiento de AI: {ai_proc['codigo']} - {ai_proc['descripcion'][:30]}...")
+                continue
+            
+            self._merge_procedure_fields(merged_procedures[position], ai_proc)
+            index.reindex_code(position, merged_procedures[position])
+            updated_count += 1
         
         logger.info(f"Merge completado: {len(merged_procedures)} procedimientos totales ({added_count} agregados, {updated_count} actualizados)")
         
@@ -1441,33 +1185,54 @@ class MedicalClaimExtractor:
         return ocr_result
     
 
+    def _merge_procedure_fields(self, merged_proc: Dict[str, Any], ai_proc: Dict[str, Any]):
+        """
+        Completa un procedimiento ya combinado con los datos de su par de AI
+        """
+        # Priorizar el código más específico
+        if merged_proc['codigo'] == "00000" and ai_proc['codigo'] != "00000":
+            logger.debug(f"Actualizado código de '00000' a '{ai_proc['codigo']}' para {merged_proc['descripcion'][:30]}...")
+            merged_proc['codigo'] = ai_proc['codigo']
+        
+        # Priorizar la observación más completa
+        obs_existing = merged_proc.get('observacion', '').strip()
+        obs_ai = ai_proc.get('observacion', '').strip()
+        
+        if len(obs_ai) > len(obs_existing):
+            merged_proc['observacion'] = obs_ai
+            logger.debug(f"Actualizada observación para {merged_proc['codigo']}: {obs_ai[:50]}...")
+        
+        # Verificar consistencia de valores
+        if abs(merged_proc['valor_total'] - ai_proc['valor_total']) > 100:
+            logger.warning(f"Valores inconsistentes para {merged_proc['codigo']}: {merged_proc['valor_total']} vs {ai_proc['valor_total']}")
+        
+        # Actualizar otros campos faltantes
+        for field in ['descripcion', 'cantidad', 'valor_unitario', 'valor_pagado', 'valor_objetado', 'estado']:
+            if not merged_proc.get(field) and ai_proc.get(field):
+                merged_proc[field] = ai_proc[field]
+
     def _validate_merged_procedures(self, procedures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Valida y limpia procedimientos después del merge
         """
         validated_procedures = []
-        seen_descriptions = {}
+        seen_positions = {}
         
         for proc in procedures:
-            desc_key = proc.get('descripcion', '').upper().strip()
+            desc_key = description_key(proc)
+            position = seen_positions.get(desc_key)
             
-            if desc_key in seen_descriptions:
-                existing_proc = seen_descriptions[desc_key]
-                logger.warning(f"Posible duplicado detectado: {desc_key[:30]}...")
-                
-                # Comparar y mantener el más completo
-                if self._is_more_complete_procedure(proc, existing_proc):
-                    seen_descriptions[desc_key] = proc
-                    # Reemplazar en la lista validada
-                    for i, vp in enumerate(validated_procedures):
-                        if vp.get('descripcion', '').upper().strip() == desc_key:
-                            validated_procedures[i] = proc
-                            logger.info(f"Reemplazado procedimiento duplicado con versión más completa: {desc_key[:30]}...")
-                            break
-                # Si no es más completo, no agregar
-            else:
-                seen_descriptions[desc_key] = proc
+            if position is None:
+                seen_positions[desc_key] = len(validated_procedures)
                 validated_procedures.append(proc)
+                continue
+            
+            logger.debug(f"Posible duplicado detectado: {desc_key[:30]}...")
+            
+            # Comparar y mantener el más completo; si no lo es, no agregar
+            if self._is_more_complete_procedure(proc, validated_procedures[position]):
+                validated_procedures[position] = proc
+                logger.debug(f"Reemplazado procedimiento duplicado con versión más completa: {desc_key[:30]}...")
         
         logger.info(f"Validación completada: {len(validated_procedures)} procedimientos únicos de {len(procedures)} originales")
         return validated_procedures
@@ -1483,9 +1248,9 @@ class MedicalClaimExtractor:
         score2 = 0
         
         # Puntuación por código válido
-        if proc1.get('codigo') != "00000" and re.match(r'^\d{5}', proc1.get('codigo', '')):
+        if proc1.get('codigo') != "00000" and CODE_PREFIX_PATTERN.match(proc1.get('codigo', '')):
             score1 += 3
-        if proc2.get('codigo') != "00000" and re.match(r'^\d{5}', proc2.get('codigo', '')):
+        if proc2.get('codigo') != "00000" and CODE_PREFIX_PATTERN.match(proc2.get('codigo', '')):
             score2 += 3
         
         # Puntuación por observación
@@ -1578,9 +1343,9 @@ class MedicalClaimExtractor:
             codigo2 = proc2.get('codigo', '')
             
             # Si uno es "00000" y el otro es un código válido, considerar como el mismo
-            if (codigo1 == "00000" and re.match(r'^\d{5}', codigo2)) or \
-            (codigo2 == "00000" and re.match(r'^\d{5}', codigo1)):
-                logger.info(f"Detectado procedimiento con códigos inconsistentes: {codigo1} vs {codigo2} - {desc1[:30]}...")
+            if (codigo1 == "00000" and CODE_PREFIX_PATTERN.match(codigo2)) or \
+            (codigo2 == "00000" and CODE_PREFIX_PATTERN.match(codigo1)):
+                logger.debug(f"Detectado procedimiento con códigos inconsistentes: {codigo1} vs {codigo2} - {desc1[:30]}...")
                 return True
             
             # Si ambos códigos son iguales
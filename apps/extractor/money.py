@@ -0,0 +1,100 @@
+# apps/extractor/money.py
+"""
+Conversión de valores monetarios colombianos a pesos enteros
+Un único criterio para los separadores, usado por el extractor, el procesador
+paginado, las utilidades de limpieza y los totales del admin y el dashboard:
+- Con punto y coma a la vez, el último que aparece es el decimal ("1.234.567,50")
+- Un separador repetido es de miles ("1,234,567" o "1.234.567")
+- Un separador único seguido de exactamente 3 dígitos es de miles ("120,000", "5.000");
+  con otra cantidad de dígitos es decimal ("95500.00", "1234,5")
+Los centavos se redondean al peso (mitad hacia arriba) para que las sumas sean exactas
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional
+
+_STRIP_SYMBOLS = str.maketrans('', '', '$ \t\r\n\xa0')
+_ONE_PESO = Decimal(1)
+
+
+def parse_money(value: Any) -> int:
+    """Valor monetario (texto, int, float o Decimal) en pesos enteros; 0 si no es válido"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        value = Decimal(repr(value))
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            return 0
+        return int(value.quantize(_ONE_PESO, rounding=ROUND_HALF_UP))
+
+    text = str(value).replace('$', '').replace(' ', '').strip()
+    pesos = _parse_text(text)
+    if pesos is None:
+        # Espacios internos poco comunes (tabs, espacio no separable)
+        pesos = _parse_text(text.translate(_STRIP_SYMBOLS))
+    return pesos or 0
+
+
+def _parse_text(text: str) -> Optional[int]:
+    """Pesos de un texto ya sin símbolo; None si no es un número válido"""
+    if text.isdigit() and text.isascii():
+        return int(text)
+
+    negative = text.startswith('-')
+    if negative:
+        text = text[1:]
+
+    last_comma = text.rfind(',')
+    last_dot = text.rfind('.')
+
+    if last_comma != -1 and last_dot != -1:
+        # El último separador es el decimal
+        decimal_at = max(last_comma, last_dot)
+        thousands = '.' if decimal_at == last_comma else ','
+        integer, decimals = text[:decimal_at].replace(thousands, ''), text[decimal_at + 1:]
+    elif last_comma == -1 and last_dot == -1:
+        integer, decimals = text, ''
+    else:
+        separator, position = (',', last_comma) if last_comma != -1 else ('.', last_dot)
+        if len(text) - position == 4 or text.count(separator) > 1:
+            integer, decimals = text.replace(separator, ''), ''
+        else:
+            integer, decimals = text[:position], text[position + 1:]
+
+    if not (integer.isdigit() and integer.isascii()) or not (decimals == '' or decimals.isdigit()):
+        return None
+
+    if decimals.strip('0'):
+        pesos = int(Decimal(f'{integer}.{decimals}').quantize(_ONE_PESO, rounding=ROUND_HALF_UP))
+    else:
+        pesos = int(integer)
+
+    return -pesos if negative else pesos
+
+
+def parse_money_column(values: Iterable[Any]) -> List[int]:
+    """
+    Convierte una columna completa de valores (p. ej. los totales de la tabla)
+    Los valores repetidos ("$0", tarifas iguales) se convierten una sola vez
+    """
+    parsed: Dict[Any, int] = {}
+    result = []
+
+    for value in values:
+        try:
+            pesos = parsed[value]
+        except KeyError:
+            pesos = parsed[value] = parse_money(value)
+        except TypeError:
+            pesos = parse_money(value)
+        result.append(pesos)
+
+    return result
+
+
+def sum_money(values: Iterable[Any]) -> int:
+    """Suma exacta en pesos de valores en cualquier formato"""
+    return sum(parse_money_column(values))
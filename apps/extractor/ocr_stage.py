@@ -0,0 +1,214 @@
+# apps/extractor/ocr_stage.py
+"""
+Etapa de OCR para páginas escaneadas
+Un clasificador barato (largo del texto vs. cobertura de imágenes) decide qué
+páginas no tienen capa de texto; solo esas se reconocen con Tesseract a través
+de PyMuPDF, en el pool de procesos y con caché por hash de la imagen de la página
+"""
+
+import hashlib
+import logging
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from .page_text_cache import get_page_text_store
+
+logger = logging.getLogger(__name__)
+
+# Páginas con menos caracteres que esto se consideran sin capa de texto
+MIN_TEXT_CHARS = 25
+
+# Fracción mínima de la página cubierta por imágenes para considerarla escaneada
+MIN_IMAGE_COVERAGE = 0.5
+
+PAGE_TEXT = 'text'
+PAGE_IMAGE = 'image'
+
+DEFAULT_OCR_LANGUAGE = 'spa'
+DEFAULT_OCR_DPI = 300
+
+# Mensajes de PyMuPDF cuando falta Tesseract o los datos del idioma (TESSDATA_PREFIX)
+OCR_ENVIRONMENT_ERRORS = ('No OCR support', 'OCR initialisation failed')
+
+_ocr_unavailable = False
+
+
+def get_ocr_settings() -> Tuple[bool, str, int]:
+    """Retorna (habilitado, idioma, dpi) configurados"""
+    enabled = True
+    language = DEFAULT_OCR_LANGUAGE
+    dpi = DEFAULT_OCR_DPI
+
+    try:
+        from django.conf import settings
+        enabled = getattr(settings, 'PDF_OCR_ENABLED', enabled)
+        language = getattr(settings, 'PDF_OCR_LANGUAGE', language)
+        dpi = getattr(settings, 'PDF_OCR_DPI', dpi)
+    except Exception:
+        pass
+
+    return enabled, language, dpi
+
+
+def image_coverage(page) -> float:
+    """Fracción del área de la página cubierta por imágenes"""
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+    if page_area <= 0:
+        return 0.0
+
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info['bbox']) & page_rect
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+
+    return min(covered / page_area, 1.0)
+
+
+def classify_page(page, text: str) -> str:
+    """Clasifica la página como de texto o escaneada (solo imagen)"""
+    if len(text.strip()) >= MIN_TEXT_CHARS:
+        return PAGE_TEXT
+
+    return PAGE_IMAGE if image_coverage(page) >= MIN_IMAGE_COVERAGE else PAGE_TEXT
+
+
+def page_image_hash(doc, page, language: str, dpi: int) -> str:
+    """
+    Hash de las imágenes de la página (streams sin decodificar) y de los
+    parámetros de OCR; la misma página escaneada en otro PDF reutiliza el resultado
+    """
+    digest = hashlib.sha256(f"ocr:{language}:{dpi}:{page.rotation}".encode('utf-8'))
+
+    for image in page.get_images(full=True):
+        try:
+            digest.update(doc.xref_stream_raw(image[0]) or b'')
+        except Exception:
+            digest.update(str(image).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+def is_ocr_environment_error(error: Exception) -> bool:
+    """El error viene del entorno (Tesseract o datos de idioma ausentes), no de una página"""
+    return isinstance(error, RuntimeError) and any(marker in str(error) for marker in OCR_ENVIRONMENT_ERRORS)
+
+
+def _ocr_page(pdf_file_path: str, page_num: int, language: str, dpi: int) -> Optional[str]:
+    """
+    Tarea de worker: reconoce el texto de una página con Tesseract
+    Retorna None si la página falla; los errores del entorno se propagan
+    """
+    doc = None
+    try:
+        doc = fitz.open(pdf_file_path)
+        page = doc.load_page(page_num)
+        textpage = page.get_textpage_ocr(language=language, dpi=dpi, full=True)
+        return page.get_text("text", textpage=textpage)
+    except Exception as e:
+        if is_ocr_environment_error(e):
+            raise
+        logger.warning(f"Error en OCR de la página {page_num}: {e}")
+        return None
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+def _run_ocr(pdf_file_path: str, page_nums: List[int], language: str, dpi: int) -> List[Optional[str]]:
+    """
+    Ejecuta el OCR de las páginas en el pool de procesos (o en serie si no se puede)
+    Las páginas que fallan quedan en None
+    """
+    from .parallel_scanner import can_use_process_pool, get_process_executor, get_scan_settings
+
+    workers, _ = get_scan_settings()
+
+    if len(page_nums) > 1 and workers > 1 and can_use_process_pool():
+        try:
+            executor = get_process_executor(workers)
+            futures = [executor.submit(_ocr_page, pdf_file_path, num, language, dpi) for num in page_nums]
+            return [future.result() for future in futures]
+        except Exception as e:
+            if is_ocr_environment_error(e):
+                raise
+            logger.warning(f"Fallo OCR en paralelo, usando camino serial: {e}")
+
+    return [_ocr_page(pdf_file_path, num, language, dpi) for num in page_nums]
+
+
+def recognize_image_pages(pdf_file_path: str, doc, start: int, page_texts: List[str],
+                          unrecognized: Optional[List[int]] = None) -> List[str]:
+    """
+    Completa el texto de las páginas escaneadas del rango que empieza en start
+    Las páginas con texto no se tocan; las escaneadas que quedan sin texto (OCR deshabilitado,
+    no disponible o fallido en esa página) se agregan a unrecognized (no deben guardarse en caché)
+    """
+    global _ocr_unavailable
+
+    enabled, language, dpi = get_ocr_settings()
+    ocr_ready = enabled and not _ocr_unavailable
+    if not ocr_ready and unrecognized is None:
+        return page_texts
+
+    candidates = []
+    for offset, text in enumerate(page_texts):
+        # Camino rápido: página con texto suficiente, sin cargarla de nuevo
+        if len(text.strip()) >= MIN_TEXT_CHARS:
+            continue
+
+        try:
+            page = doc.load_page(start + offset)
+            if classify_page(page, text) == PAGE_IMAGE:
+                candidates.append((offset, page_image_hash(doc, page, language, dpi)))
+        except Exception as e:
+            logger.warning(f"Error clasificando página {start + offset}: {e}")
+
+    if not candidates:
+        return page_texts
+
+    if not ocr_ready:
+        unrecognized.extend(start + offset for offset, _ in candidates)
+        return page_texts
+
+    page_texts = list(page_texts)
+    store = get_page_text_store()
+    pending = []
+
+    for offset, image_hash in candidates:
+        cached = store.get_pages(image_hash, 0, 0) if store else None
+        if cached is not None:
+            page_texts[offset] = cached[0]
+        else:
+            pending.append((offset, image_hash))
+
+    logger.info(
+        f"Páginas escaneadas: {len(candidates)} ({len(candidates) - len(pending)} desde caché de OCR)"
+    )
+
+    if not pending:
+        return page_texts
+
+    try:
+        results = _run_ocr(pdf_file_path, [start + offset for offset, _ in pending], language, dpi)
+    except Exception as e:
+        if is_ocr_environment_error(e):
+            # Tesseract no instalado o sin datos de idioma: no reintentar en este proceso
+            _ocr_unavailable = True
+            logger.warning(f"OCR no disponible, las páginas escaneadas quedan sin texto: {e}")
+        else:
+            logger.warning(f"Error en OCR, las páginas escaneadas quedan sin texto: {e}")
+        results = [None] * len(pending)
+
+    for (offset, image_hash), text in zip(pending, results):
+        if text is None:
+            if unrecognized is not None:
+                unrecognized.append(start + offset)
+            continue
+        page_texts[offset] = text
+        if store:
+            store.put_pages(image_hash, [text])
+
+    return page_texts
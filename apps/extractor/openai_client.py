@@ -0,0 +1,148 @@
+# apps/extractor/openai_client.py
+"""
+Cliente de OpenAI compartido por proceso worker
+Un único cliente por API key con pool de conexiones HTTP keep-alive y timeouts
+explícitos de conexión y lectura, para no abrir una conexión TLS nueva en cada
+llamada ni dejar un request colgado ocupando el slot de Celery
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 120.0
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_MAX_RETRIES = 2
+
+
+def get_openai_client_settings() -> Dict[str, Any]:
+    """Timeouts y límites del pool configurados"""
+    options = {
+        'connect_timeout': DEFAULT_CONNECT_TIMEOUT,
+        'read_timeout': DEFAULT_READ_TIMEOUT,
+        'max_connections': DEFAULT_MAX_CONNECTIONS,
+        'keepalive_expiry': DEFAULT_KEEPALIVE_EXPIRY,
+        'max_retries': DEFAULT_MAX_RETRIES,
+    }
+
+    try:
+        from django.conf import settings
+        options['connect_timeout'] = getattr(settings, 'OPENAI_CONNECT_TIMEOUT', options['connect_timeout'])
+        options['read_timeout'] = getattr(settings, 'OPENAI_REQUEST_TIMEOUT', options['read_timeout'])
+        options['max_connections'] = getattr(settings, 'OPENAI_MAX_CONNECTIONS', options['max_connections'])
+        options['keepalive_expiry'] = getattr(settings, 'OPENAI_KEEPALIVE_EXPIRY', options['keepalive_expiry'])
+        options['max_retries'] = getattr(settings, 'OPENAI_MAX_RETRIES', options['max_retries'])
+    except Exception:
+        pass
+
+    return options
+
+
+def create_openai_client(api_key: str, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                         read_timeout: float = DEFAULT_READ_TIMEOUT,
+                         max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                         keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                         max_retries: int = DEFAULT_MAX_RETRIES, base_url: Optional[str] = None):
+    """Crea un cliente de OpenAI con pool keep-alive y timeouts explícitos"""
+    import httpx
+    import openai
+
+    http_client = openai.DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+
+    return openai.OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        max_retries=max_retries,
+        http_client=http_client,
+    )
+
+
+class OpenAIClientPool:
+    """
+    Clientes de OpenAI del proceso, uno por (API key, base URL)
+    factory permite reemplazar la creación del cliente (p. ej. por un servidor local de pruebas)
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(self, api_key: str, base_url: Optional[str] = None):
+        key = (api_key, base_url)
+
+        with self._lock:
+            # Tras un fork las conexiones heredadas no son seguras: empezar de cero
+            if self._pid != os.getpid():
+                self._clients.clear()
+                self._pid = os.getpid()
+
+            client = self._clients.get(key)
+            if client is None:
+                if self.factory is not None:
+                    client = self.factory(api_key, base_url)
+                else:
+                    options = get_openai_client_settings()
+                    client = create_openai_client(api_key, base_url=base_url, **options)
+                    logger.debug(
+                        f"Cliente OpenAI creado: pool de {options['max_connections']} conexiones, "
+                        f"timeouts {options['connect_timeout']:g}s conexión / {options['read_timeout']:g}s lectura"
+                    )
+                self._clients[key] = client
+
+            return client
+
+    def close_all(self):
+        """Cierra los clientes y sus conexiones"""
+        with self._lock:
+            for client in self._clients.values():
+                try:
+                    client.close()
+                except Exception:
+                    pass
+            self._clients.clear()
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_openai_client_pool() -> OpenAIClientPool:
+    """Retorna el pool de clientes del proceso actual"""
+    global _client_pool
+
+    if _client_pool is None:
+        with _client_pool_lock:
+            if _client_pool is None:
+                _client_pool = OpenAIClientPool()
+
+    return _client_pool
+
+
+def set_openai_client_factory(factory) -> OpenAIClientPool:
+    """
+    Reemplaza la fábrica de clientes del proceso (None restaura la de OpenAI)
+    Los clientes ya creados se cierran para que las llamadas siguientes usen la nueva
+    """
+    pool = get_openai_client_pool()
+    pool.close_all()
+    pool.factory = factory
+    return pool
+
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None):
+    """Cliente de OpenAI compartido del proceso para api_key"""
+    return get_openai_client_pool().get(api_key, base_url)
@@ -6,24 +6,64 @@ Soluciona problemas de extracción en documentos grandes
 
 import logging
 import json
+import threading
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+from .money import parse_money, parse_money_column
+from .openai_client import get_openai_client
+from .rate_limiter import create_chat_completion
+from .llm_cache import CHUNK_LEVEL, cached_llm_result
+from .prompt_builder import estimate_tokens
+from .soat_patterns import HEADER_PATIENT_PATTERNS, HEADER_POLICY_PATTERNS, FOOTER_TOTALS_PATTERNS, TOTALS_LINE_PATTERN
+
 logger = logging.getLogger(__name__)
 
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Chunks de la tabla enviados a OpenAI al mismo tiempo por documento
+DEFAULT_CHUNK_CONCURRENCY = 4
+
+
+def get_chunk_concurrency() -> int:
+    """Chunks simultáneos configurados (1 = uno tras otro con pausa entre llamadas)"""
+    concurrency = DEFAULT_CHUNK_CONCURRENCY
+
+    try:
+        from django.conf import settings
+        concurrency = getattr(settings, 'OPENAI_CHUNK_CONCURRENCY', concurrency)
+    except Exception:
+        pass
+
+    return max(int(concurrency), 1)
+
+
 class OpenAIPaginatedProcessorV2:
     """
     Versión mejorada del procesador paginado que maneja mejor la extracción
     """
     
-    def __init__(self, openai_api_key: str, chunk_size: int = 10, delay_between_calls: float = 2.0):
+    # Versión del prompt de chunk en la clave de la caché de OpenAI: cambiarla al editar el prompt
+    chunk_prompt_version = 'chunk-v1'
+    
+    def __init__(self, openai_api_key: str, chunk_size: int = 10, delay_between_calls: float = 2.0,
+                 openai_client=None, max_concurrency: Optional[int] = None):
         self.openai_api_key = openai_api_key
+        # Cliente de OpenAI (si es None se usa el compartido del proceso)
+        self.openai_client = openai_client
         self.chunk_size = chunk_size
+        # La pausa solo aplica al modo secuencial (max_concurrency=1)
         self.delay = delay_between_calls
+        self.max_concurrency = max_concurrency if max_concurrency is not None else get_chunk_concurrency()
         self.total_api_calls = 0
         self.total_tokens_used = 0
+        self.estimated_prompt_tokens = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._counters_lock = threading.Lock()
         
     def should_use_pagination(self, text: str) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -110,7 +150,10 @@ class OpenAIPaginatedProcessorV2:
                     "method": "paginated_v2",
                     "total_procedures": len(all_procedures),
                     "processing_time": time.time() - start_time,
-                    "api_calls": self.total_api_calls
+                    "api_calls": self.total_api_calls,
+                    "estimated_prompt_tokens": self.estimated_prompt_tokens,
+                    "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens
                 }
             }
             
@@ -186,54 +229,17 @@ class OpenAIPaginatedProcessorV2:
         }
         
         # Extraer información del paciente
-        patient_patterns = {
-            'nombre': [
-                r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\s*Número|\s*$)',
-                r'VICTIMA\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+)',
-                r'Paciente\s*:\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\s*\n|\s*$)'
-            ],
-            'documento': [
-                r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*(\d+)\s*-',
-                r'CC\s*-\s*(\d+)',
-                r'TI\s*-\s*(\d+)'
-            ],
-            'tipo_documento': [
-                r'Víctima\s*:\s*([A-Z]{1,3})\s*-',
-                r'(CC|TI|CE)\s*-\s*\d+'
-            ]
-        }
-        
-        for field, patterns in patient_patterns.items():
+        for field, patterns in HEADER_PATIENT_PATTERNS.items():
             for pattern in patterns:
-                match = re.search(pattern, header_text, re.IGNORECASE)
+                match = pattern.search(header_text)
                 if match:
                     result["patient_info"][field] = match.group(1).strip()
                     break
         
         # Extraer información de póliza
-        policy_patterns = {
-            'numero_liquidacion': [
-                r'Liquidación\s+de\s+siniestro\s+No\.\s*([A-Z0-9\-]+)',
-                r'LIQ-(\d+)',
-                r'No\.\s*(\d{2}-\d{4}-\d+)'
-            ],
-            'poliza': [
-                r'Póliza\s*:\s*(\d+)',
-                r'POLIZA\s*:\s*(\d+)'
-            ],
-            'numero_reclamacion': [
-                r'Número\s+de\s+reclamación\s*:\s*([A-Z0-9]+)',
-                r'reclamación\s*:\s*([A-Z0-9]+)'
-            ],
-            'fecha_siniestro': [
-                r'Fecha\s+de\s+siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})',
-                r'siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})'
-            ]
-        }
-        
-        for field, patterns in policy_patterns.items():
+        for field, patterns in HEADER_POLICY_PATTERNS.items():
             for pattern in patterns:
-                match = re.search(pattern, header_text, re.IGNORECASE)
+                match = pattern.search(header_text)
                 if match:
                     result["policy_info"][field] = match.group(1).strip()
                     break
@@ -246,8 +252,7 @@ class OpenAIPaginatedProcessorV2:
         Procesa la tabla de procedimientos usando OpenAI
         """
         try:
-            import openai
-            client = openai.OpenAI(api_key=self.openai_api_key)
+            client = self.openai_client or get_openai_client(self.openai_api_key)
             
             # Si la tabla es pequeña, procesarla completa
             if len(table_text) < 3000:
@@ -257,13 +262,23 @@ class OpenAIPaginatedProcessorV2:
             chunks = self._split_table_intelligently(table_text)
             all_procedures = []
             
-            for i, chunk in enumerate(chunks, 1):
-                logger.info(f"   Procesando chunk {i}/{len(chunks)}...")
-                procedures = self._extract_procedures_from_text(chunk, client)
-                all_procedures.extend(procedures)
+            if self.max_concurrency <= 1 or len(chunks) == 1:
+                for i, chunk in enumerate(chunks, 1):
+                    logger.info(f"   Procesando chunk {i}/{len(chunks)}...")
+                    procedures = self._extract_procedures_from_text(chunk, client)
+                    all_procedures.extend(procedures)
+                    
+                    if i < len(chunks):
+                        time.sleep(self.delay)
                 
-                if i < len(chunks):
-                    time.sleep(self.delay)
+                return all_procedures
+            
+            # Chunks en paralelo (hasta max_concurrency); map conserva el orden de la tabla
+            workers = min(self.max_concurrency, len(chunks))
+            logger.info(f"   Procesando {len(chunks)} chunks con {workers} llamadas simultáneas...")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='openai-chunk') as executor:
+                for procedures in executor.map(lambda chunk: self._extract_procedures_from_text(chunk, client), chunks):
+                    all_procedures.extend(procedures)
             
             return all_procedures
             
@@ -305,28 +320,12 @@ Responde SOLO con JSON válido:
 }}"""
 
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Eres un experto en procesamiento de documentos médicos SOAT. Extrae información con precisión."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=3000,
-                temperature=0.1
+            # Un chunk ya enviado (reprocesamiento, upload duplicado) sale de la caché
+            procedures = cached_llm_result(
+                CHUNK_LEVEL, OPENAI_MODEL, self.chunk_prompt_version, text,
+                lambda: self._request_chunk_procedures(prompt, client)
             )
             
-            self.total_api_calls += 1
-            content = response.choices[0].message.content.strip()
-            
-            # Limpiar respuesta
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0]
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0]
-            
-            result = json.loads(content)
-            procedures = result.get('procedures', [])
-            
             logger.info(f"   ✅ Extraídos {len(procedures)} procedimientos")
             return procedures
             
@@ -334,6 +333,39 @@ Responde SOLO con JSON válido:
             logger.error(f"   ❌ Error: {str(e)}")
             return []
     
+    def _request_chunk_procedures(self, prompt: str, client) -> List[Dict[str, Any]]:
+        """Llama a OpenAI con el prompt de un chunk y retorna sus procedimientos"""
+        messages = [
+            {"role": "system", "content": "Eres un experto en procesamiento de documentos médicos SOAT. Extrae información con precisión."},
+            {"role": "user", "content": prompt}
+        ]
+        response = create_chat_completion(
+            client,
+            model=OPENAI_MODEL,
+            messages=messages,
+            max_tokens=3000,
+            temperature=0.1
+        )
+        
+        usage = getattr(response, 'usage', None)
+        with self._counters_lock:
+            self.total_api_calls += 1
+            self.estimated_prompt_tokens += sum(estimate_tokens(message['content']) for message in messages)
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens
+                self.completion_tokens += usage.completion_tokens
+                self.total_tokens_used += usage.total_tokens
+        content = response.choices[0].message.content.strip()
+        
+        # Limpiar respuesta
+        if '```json' in content:
+            content = content.split('```json')[1].split('```')[0]
+        elif '```' in content:
+            content = content.split('```')[1].split('```')[0]
+        
+        result = json.loads(content)
+        return result.get('procedures', [])
+    
     def _split_table_intelligently(self, table_text: str) -> List[str]:
         """
         Divide la tabla en chunks inteligentes preservando procedimientos completos
@@ -383,43 +415,21 @@ Responde SOLO con JSON válido:
             'total_pagado': 0
         }
         
-        # Patrones para totales
-        patterns = {
-            'total_reclamado': [
-                r'Valor\s+de\s+Reclamación\s*:\s*\$?([\d,]+)',
-                r'Total\s+Reclamado\s*:\s*\$?([\d,]+)',
-                r'TOTAL\s*:\s*\$?([\d,]+)'
-            ],
-            'total_objetado': [
-                r'Valor\s+objetado\s*:\s*\$?([\d,]+)',
-                r'Total\s+Objetado\s*:\s*\$?([\d,]+)'
-            ],
-            'total_pagado': [
-                r'Valor\s+a\s+Pagar\s*:\s*\$?([\d,]+)',
-                r'Total\s+Pagado\s*:\s*\$?([\d,]+)',
-                r'Valor\s+Aceptado\s*:\s*\$?([\d,]+)'
-            ]
-        }
-        
-        for field, field_patterns in patterns.items():
+        for field, field_patterns in FOOTER_TOTALS_PATTERNS.items():
             for pattern in field_patterns:
-                match = re.search(pattern, footer_text, re.IGNORECASE)
+                match = pattern.search(footer_text)
                 if match:
-                    value_str = match.group(1).replace(',', '')
-                    totals[field] = int(value_str)
+                    totals[field] = parse_money(match.group(1))
                     break
         
         # Si no encontramos totales en el footer, buscar en toda la tabla
         if totals['total_reclamado'] == 0:
             # Buscar línea de totales en formato de tabla
-            total_line_pattern = r'^\s*.*?\s+\$?([\d,]+)\s+\$?([\d,]+)\s+\$?([\d,]+)\s*$'
-            matches = re.findall(total_line_pattern, text, re.MULTILINE)
+            matches = TOTALS_LINE_PATTERN.findall(text)
             if matches:
                 # Tomar la última coincidencia (probablemente los totales)
-                last_match = matches[-1]
-                totals['total_reclamado'] = int(last_match[0].replace(',', ''))
-                totals['total_pagado'] = int(last_match[1].replace(',', ''))
-                totals['total_objetado'] = int(last_match[2].replace(',', ''))
+                totals['total_reclamado'], totals['total_pagado'], totals['total_objetado'] = \
+                    parse_money_column(matches[-1])
         
         logger.info(f"💰 Totales extraídos: {totals}")
         return totals
@@ -0,0 +1,253 @@
+# apps/extractor/page_text_cache.py
+"""
+Caché persistente de texto por página
+Guarda el texto ya extraído de un PDF como sidecars comprimidos en el
+directorio de media, indexados por hash de contenido y rango de páginas,
+para que las tareas hijas y los reprocesamientos no vuelvan a leer el PDF.
+Junto al texto se guardan las filas de la tabla leídas por coordenadas
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo por defecto de la caché en disco (512MB)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Al desalojar se libera espacio hasta quedar en esta fracción del máximo
+EVICTION_TARGET_RATIO = 0.9
+
+SIDECAR_SUFFIX = '.pages.json.gz'
+LAYOUT_SUFFIX = '.layout.json.gz'
+
+
+def join_page_texts(page_texts: List[str]) -> str:
+    """Une el texto de las páginas con el mismo formato que el extractor"""
+    return "".join(page_text + "\n" for page_text in page_texts)
+
+
+class PageTextStore:
+    """
+    Almacén de texto por página en disco con desalojo LRU por tamaño
+    Cada sidecar contiene las páginas [start, end] de un contenido identificado por su SHA-256
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._approx_bytes = None
+        self._lock = threading.Lock()
+
+    def _sidecar_path(self, content_hash: str, start: int, end: int) -> str:
+        return os.path.join(
+            self.cache_dir, content_hash[:2], f"{content_hash}.{start}-{end}{SIDECAR_SUFFIX}"
+        )
+
+    def _candidate_ranges(self, content_hash: str) -> List[Tuple[int, int, str]]:
+        """Rangos guardados para un hash (inicio, fin, ruta)"""
+        pattern = os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.*{SIDECAR_SUFFIX}")
+        ranges = []
+        for path in glob.glob(pattern):
+            name = os.path.basename(path)[len(content_hash) + 1:-len(SIDECAR_SUFFIX)]
+            try:
+                start, end = (int(part) for part in name.split('-'))
+            except ValueError:
+                continue
+            ranges.append((start, end, path))
+        return ranges
+
+    def _layout_path(self, content_hash: str, start: int, end: Optional[int], version: int) -> str:
+        last = 'fin' if end is None else end
+        return os.path.join(
+            self.cache_dir, content_hash[:2], f"{content_hash}.v{version}.{start}-{last}{LAYOUT_SUFFIX}"
+        )
+
+    def get_pages(self, content_hash: str, start: int = 0, end: Optional[int] = None) -> Optional[List[str]]:
+        """
+        Retorna el texto de las páginas [start, end] o None si no está en caché
+        Con end=None retorna desde start hasta la última página del documento
+        """
+        if not content_hash:
+            return None
+
+        try:
+            for range_start, range_end, path in self._candidate_ranges(content_hash):
+                if range_start > start or (end is not None and range_end < end):
+                    continue
+
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    payload = json.load(f)
+
+                if end is None and not payload.get('complete'):
+                    continue
+
+                # Marcar como usado recientemente para el desalojo LRU
+                os.utime(path, None)
+
+                pages = payload['pages']
+                offset = start - range_start
+                last = len(pages) if end is None else end - range_start + 1
+                logger.debug(f"Texto de páginas reutilizado desde caché: {content_hash[:12]} [{start}-{end}]")
+                return pages[offset:last]
+
+        except Exception as e:
+            logger.warning(f"Error leyendo caché de texto {content_hash[:12]}: {e}")
+
+        return None
+
+    def put_pages(self, content_hash: str, page_texts: List[str], start: int = 0, complete: bool = True):
+        """
+        Guarda el texto de páginas consecutivas empezando en start
+        complete indica que el rango llega hasta la última página del documento
+        """
+        if not content_hash or not page_texts:
+            return
+
+        end = start + len(page_texts) - 1
+        path = self._sidecar_path(content_hash, start, end)
+
+        try:
+            if os.path.exists(path):
+                os.utime(path, None)
+                return
+
+            self._write_payload(path, {
+                'content_hash': content_hash,
+                'start': start,
+                'end': end,
+                'complete': complete,
+                'pages': page_texts,
+            })
+            logger.debug(f"Texto de páginas guardado en caché: {content_hash[:12]} [{start}-{end}]")
+
+        except Exception as e:
+            logger.warning(f"Error guardando caché de texto {content_hash[:12]}: {e}")
+
+    def get_layout_rows(self, content_hash: str, start: int = 0, end: Optional[int] = None,
+                        version: int = 1) -> Optional[List[Dict[str, str]]]:
+        """Filas de la tabla por coordenadas guardadas para exactamente ese rango, o None"""
+        if not content_hash:
+            return None
+
+        path = self._layout_path(content_hash, start, end, version)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                rows = json.load(f)['rows']
+            os.utime(path, None)
+            logger.debug(f"Filas de la tabla reutilizadas desde caché: {content_hash[:12]} [{start}-{end}]")
+            return rows
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Error leyendo filas en caché {content_hash[:12]}: {e}")
+            return None
+
+    def put_layout_rows(self, content_hash: str, rows: List[Dict[str, str]], start: int = 0,
+                        end: Optional[int] = None, version: int = 1):
+        """Guarda las filas de la tabla por coordenadas del rango [start, end]"""
+        if not content_hash:
+            return
+
+        path = self._layout_path(content_hash, start, end, version)
+        try:
+            if os.path.exists(path):
+                os.utime(path, None)
+                return
+
+            self._write_payload(path, {'content_hash': content_hash, 'start': start, 'end': end, 'rows': rows})
+            logger.debug(f"Filas de la tabla guardadas en caché: {content_hash[:12]} [{start}-{end}]")
+
+        except Exception as e:
+            logger.warning(f"Error guardando filas en caché {content_hash[:12]}: {e}")
+
+    def _write_payload(self, path: str, payload: dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Escritura atómica para que un lector concurrente nunca vea un archivo a medias
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._register_write(os.path.getsize(path))
+
+    def _iter_sidecars(self):
+        for suffix in (SIDECAR_SUFFIX, LAYOUT_SUFFIX):
+            for path in glob.glob(os.path.join(self.cache_dir, '*', f"*{suffix}")):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _register_write(self, size: int):
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = sum(size for _, size, _ in self._iter_sidecars())
+            else:
+                self._approx_bytes += size
+
+            if self._approx_bytes > self.max_bytes:
+                self._approx_bytes = self._evict()
+
+    def _evict(self) -> int:
+        """Elimina los sidecars menos usados hasta quedar bajo el límite"""
+        sidecars = sorted(self._iter_sidecars(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in sidecars)
+        target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+        evicted = 0
+
+        for path, size, _ in sidecars:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                evicted += 1
+            except OSError:
+                continue
+
+        if evicted:
+            logger.info(f"Caché de texto: {evicted} sidecars desalojados, {total:,} bytes en uso")
+        return total
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_page_text_store() -> Optional[PageTextStore]:
+    """
+    Retorna el almacén de texto del proceso configurado desde settings
+    Retorna None si Django no está configurado (uso del extractor fuera de la app)
+    """
+    global _default_store
+
+    if _default_store is not None:
+        return _default_store
+
+    try:
+        from django.conf import settings
+        cache_dir = getattr(settings, 'PAGE_TEXT_CACHE_DIR', None) or os.path.join(
+            str(settings.MEDIA_ROOT), 'page_text_cache'
+        )
+        max_bytes = getattr(settings, 'PAGE_TEXT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+    except Exception:
+        return None
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PageTextStore(cache_dir, max_bytes)
+    return _default_store
@@ -0,0 +1,223 @@
+# apps/extractor/parallel_scanner.py
+"""
+Extracción de texto por página repartida en un pool de procesos
+Cada worker abre el PDF por su cuenta y extrae un rango contiguo de páginas;
+los resultados se unen en orden. Los PDFs pequeños siguen por el camino serial.
+El pool solo existe en los procesos que lo habilitan (workers de Celery), nunca
+en los del servidor web
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+try:
+    # Los workers prefork de Celery son daemon: solo billiard les permite crear hijos
+    from billiard.pool import Pool as BilliardPool
+except ImportError:
+    BilliardPool = None
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este número de páginas el costo del pool no compensa
+DEFAULT_PARALLEL_MIN_PAGES = 200
+
+# Páginas mínimas por rango enviado a un worker
+MIN_PAGES_PER_SLICE = 25
+
+_pool_enabled = False
+_pool_concurrency = 1
+_executor = None
+_executor_pid = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_scan_settings() -> Tuple[int, int]:
+    """
+    Retorna (workers, páginas mínimas) configurados por proceso del worker
+    workers=0 reparte los núcleos disponibles entre los procesos del worker de Celery
+    """
+    workers = 0
+    min_pages = DEFAULT_PARALLEL_MIN_PAGES
+
+    try:
+        from django.conf import settings
+        workers = getattr(settings, 'PDF_SCAN_WORKERS', workers)
+        min_pages = getattr(settings, 'PDF_SCAN_PARALLEL_MIN_PAGES', min_pages)
+    except Exception:
+        pass
+
+    if not workers:
+        workers = max(((os.cpu_count() or 1) - 1) // _pool_concurrency, 1)
+
+    return workers, min_pages
+
+
+def _extract_texts(doc, start: int, end: int) -> List[str]:
+    """Extrae el texto de las páginas [start, end] de un documento abierto"""
+    page_texts = []
+
+    for page_num in range(start, end + 1):
+        try:
+            page_texts.append(doc.load_page(page_num).get_text("text"))
+        except Exception as e:
+            logger.warning(f"Error analizando página {page_num}: {e}")
+            page_texts.append("")
+
+    return page_texts
+
+
+def _scan_slice(pdf_file_path: str, start: int, end: int) -> List[str]:
+    """Tarea de worker: abre el PDF de forma independiente y extrae su rango"""
+    doc = fitz.open(pdf_file_path)
+    try:
+        return _extract_texts(doc, start, end)
+    finally:
+        doc.close()
+
+
+def _split_range(start: int, end: int, workers: int) -> List[Tuple[int, int]]:
+    """Divide [start, end] en rangos contiguos de tamaño similar"""
+    total = end - start + 1
+    slices = max(min(workers * 2, total // MIN_PAGES_PER_SLICE), 1)
+    size, remainder = divmod(total, slices)
+
+    ranges = []
+    current = start
+    for i in range(slices):
+        last = current + size - 1 + (1 if i < remainder else 0)
+        ranges.append((current, last))
+        current = last + 1
+
+    return ranges
+
+
+class _BilliardFuture:
+    def __init__(self, async_result):
+        self._async_result = async_result
+
+    def result(self, timeout=None):
+        return self._async_result.get(timeout)
+
+
+class _BilliardExecutor:
+    """Pool de billiard con la interfaz submit/result/shutdown de ProcessPoolExecutor"""
+
+    def __init__(self, workers: int):
+        self._pool = BilliardPool(processes=workers)
+
+    def submit(self, fn, *args):
+        return _BilliardFuture(self._pool.apply_async(fn, args))
+
+    def shutdown(self, wait: bool = True):
+        self._pool.close()
+        if wait:
+            self._pool.join()
+
+
+def enable_process_pool(concurrency: Optional[int] = None):
+    """
+    Habilita el pool en este proceso (se llama al iniciar los workers de Celery)
+    Sin esto el scanner y el OCR van por el camino serial: así el servidor web
+    nunca crea procesos hijos
+    concurrency: procesos del worker que tendrán cada uno su pool (reparten los núcleos)
+    """
+    global _pool_enabled, _pool_concurrency
+
+    if concurrency:
+        _pool_concurrency = max(int(concurrency), 1)
+
+    if not _pool_enabled:
+        _pool_enabled = True
+        atexit.register(shutdown_scanner)
+
+
+def can_use_process_pool() -> bool:
+    if not _pool_enabled:
+        return False
+    # Los procesos daemon (workers prefork de Celery) necesitan billiard para crear hijos
+    return BilliardPool is not None or not multiprocessing.current_process().daemon
+
+
+def get_process_executor(workers: int):
+    """Pool de procesos compartido por el scanner y la etapa de OCR"""
+    global _executor, _executor_pid, _executor_workers
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid() or _executor_workers != workers:
+            if _executor is not None and _executor_pid == os.getpid():
+                _executor.shutdown(wait=False)
+            if multiprocessing.current_process().daemon:
+                _executor = _BilliardExecutor(workers)
+            else:
+                _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_pid = os.getpid()
+            _executor_workers = workers
+        return _executor
+
+
+def scan_page_texts(pdf_file_path: str, start: int = 0, end: Optional[int] = None,
+                    doc=None, unrecognized: Optional[List[int]] = None) -> List[str]:
+    """
+    Extrae el texto de las páginas [start, end] (end=None hasta la última)
+    Usa el pool de procesos cuando el rango supera el umbral configurado
+    Si se pasa doc abierto se usa para el camino serial
+    Las páginas escaneadas que el OCR no pudo leer se agregan a unrecognized
+    """
+    own_doc = doc is None
+    if own_doc:
+        doc = fitz.open(pdf_file_path)
+
+    try:
+        last_page = len(doc) - 1 if end is None else min(end, len(doc) - 1)
+        if last_page < start:
+            return []
+
+        workers, min_pages = get_scan_settings()
+        total = last_page - start + 1
+        page_texts = None
+
+        if workers > 1 and total >= min_pages and can_use_process_pool():
+            try:
+                ranges = _split_range(start, last_page, workers)
+                executor = get_process_executor(workers)
+                futures = [executor.submit(_scan_slice, pdf_file_path, s, e) for s, e in ranges]
+
+                page_texts = []
+                for future in futures:
+                    page_texts.extend(future.result())
+
+                logger.debug(f"Texto extraído en paralelo: {total} páginas en {len(ranges)} rangos")
+
+            except Exception as e:
+                logger.warning(f"Fallo extracción paralela, usando camino serial: {e}")
+                page_texts = None
+
+        if page_texts is None:
+            logger.debug(f"Extrayendo texto de {total} páginas")
+            page_texts = _extract_texts(doc, start, last_page)
+
+        # Solo las páginas escaneadas (sin capa de texto) pasan por OCR
+        from .ocr_stage import recognize_image_pages
+        return recognize_image_pages(pdf_file_path, doc, start, page_texts, unrecognized)
+
+    finally:
+        if own_doc:
+            doc.close()
+
+
+def shutdown_scanner():
+    """Cierra el pool de procesos del scanner"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,403 @@
+# apps/extractor/pdf_analysis.py
+"""
+Análisis de PDFs de glosas en una sola pasada
+Comparte el texto por página, las palabras clave y las secciones detectadas
+entre la validación, la detección de múltiples pacientes y la división
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from .page_text_cache import get_page_text_store
+from .ocr_stage import recognize_image_pages
+from .parallel_scanner import scan_page_texts
+from .soat_patterns import VICTIM_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Palabras clave que delimitan la sección de cada paciente
+START_KEYWORD = "Víctima"
+END_KEYWORD = "Valor de Reclamación:"
+
+# Indicadores de glosa SOAT buscados en las primeras páginas
+SOAT_INDICATORS = [
+    "liquidación de siniestros soat",
+    "seguros mundial",
+    "víctima",
+    "reclamación",
+    "póliza"
+]
+
+# Partes del texto que cambian entre reimpresiones sin cambiar el contenido de la sección
+FINGERPRINT_VOLATILE_PATTERNS = [
+    # Numeración de páginas: "Página 3 de 10", "Pág. 3/10", "Page 3 of 10"
+    re.compile(r'\b(?:p[áa]gina|p[áa]g\.?|page)\s*\d+\s*(?:de|of|/)\s*\d+', re.IGNORECASE),
+    # Fechas y horas de impresión: "Fecha de impresión: 12/03/2024 10:15:22"
+    re.compile(r'\bfecha\s+(?:y\s+hora\s+)?de\s+impresi[óo]n\s*:?[^\n]*', re.IGNORECASE),
+    re.compile(r'\bimpreso\s+(?:el|por)\b[^\n]*', re.IGNORECASE),
+    # Sellos de generación con fecha y hora: "Generado el 12/03/2024 10:15", "Hora de impresión: 10:15"
+    # (solo tras su etiqueta: las fechas y horas de servicio o ingreso sí son contenido de la sección)
+    re.compile(
+        r'\b(?:generado|emitido|consultado)(?:\s+(?:el|por))?\s*:?\s*'
+        r'\d{1,4}[/-]\d{1,2}[/-]\d{1,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]\.?\s*m\.?)?)?',
+        re.IGNORECASE
+    ),
+    re.compile(r'\bhora\s+de\s+impresi[óo]n\s*:?\s*\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]\.?\s*m\.?)?', re.IGNORECASE),
+    # Número de página suelto en su propia línea
+    re.compile(r'^\s*\d{1,4}\s*$', re.MULTILINE),
+]
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_section_text(page_texts: List[str]) -> str:
+    """Texto de la sección sin numeración de páginas ni marcas de impresión"""
+    text = "\n".join(page_texts)
+    for pattern in FINGERPRINT_VOLATILE_PATTERNS:
+        text = pattern.sub(' ', text)
+    return _WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+
+def section_fingerprint(page_texts: List[str]) -> str:
+    """SHA-256 del texto normalizado de una sección de paciente"""
+    return hashlib.sha256(normalize_section_text(page_texts).encode('utf-8')).hexdigest()
+
+
+# Número máximo de análisis conservados en memoria por proceso
+ANALYSIS_CACHE_SIZE = 16
+
+_analysis_cache: "OrderedDict[Tuple[str, str, str], PdfAnalysis]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+
+# Hashes de archivos ya calculados, por (ruta, tamaño, fecha de modificación)
+FILE_HASH_CACHE_SIZE = 256
+
+_file_hash_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_file_hash_cache_lock = threading.Lock()
+
+
+def compute_file_hash(pdf_file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Calcula el SHA-256 del archivo leyendo por bloques
+    Memoriza el resultado mientras el archivo no cambie (los hijos por rango
+    de páginas comparten el archivo del padre y no deben rehashearlo)
+    """
+    stat = os.stat(pdf_file_path)
+    key = (os.path.abspath(pdf_file_path), stat.st_size, stat.st_mtime_ns)
+
+    with _file_hash_cache_lock:
+        cached = _file_hash_cache.get(key)
+        if cached is not None:
+            _file_hash_cache.move_to_end(key)
+            return cached
+
+    digest = hashlib.sha256()
+    with open(pdf_file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    file_hash = digest.hexdigest()
+
+    with _file_hash_cache_lock:
+        _file_hash_cache[key] = file_hash
+        while len(_file_hash_cache) > FILE_HASH_CACHE_SIZE:
+            _file_hash_cache.popitem(last=False)
+
+    return file_hash
+
+
+def pair_sections(start_pages: List[int], end_pages: List[int]) -> List[Tuple[int, int]]:
+    """Empareja páginas de inicio con la siguiente página de fin disponible"""
+    sections = []
+    used_end_pages = set()
+
+    for start_page in start_pages:
+        end_page = next(
+            (ep for ep in end_pages if ep >= start_page and ep not in used_end_pages),
+            None
+        )
+
+        if end_page is not None:
+            sections.append((start_page, end_page))
+            used_end_pages.add(end_page)
+            logger.debug(f"Sección emparejada: páginas {start_page}-{end_page}")
+        else:
+            logger.warning(f"No se encontró página de fin para la sección que empieza en {start_page}")
+
+    return sections
+
+
+class IncrementalSectionDetector:
+    """
+    Detecta secciones página a página: emite cada sección en cuanto aparece
+    su palabra clave de fin, sin esperar a leer el resto del documento
+    Empareja igual que pair_sections (cada fin cierra el inicio pendiente más antiguo)
+    """
+
+    def __init__(self, start_keyword: str = START_KEYWORD, end_keyword: str = END_KEYWORD):
+        self.start_lower = start_keyword.lower()
+        self.end_lower = end_keyword.lower()
+        self.start_pages: List[int] = []
+        self.end_pages: List[int] = []
+        self.sections: List[Tuple[int, int]] = []
+        self.patient_hints: Dict[int, str] = {}
+        self._pending_starts = deque()
+
+    def feed(self, page_num: int, text: str) -> Optional[Tuple[int, int]]:
+        """Procesa una página y retorna la sección que se cierra en ella, si hay"""
+        text_lower = text.lower()
+
+        if self.start_lower in text_lower:
+            self.start_pages.append(page_num)
+            self._pending_starts.append(page_num)
+            match = VICTIM_PATTERN.search(text)
+            if match:
+                self.patient_hints[page_num] = match.group(1).strip()
+
+        if self.end_lower in text_lower:
+            self.end_pages.append(page_num)
+            if self._pending_starts:
+                section = (self._pending_starts.popleft(), page_num)
+                self.sections.append(section)
+                logger.debug(f"Sección emparejada: páginas {section[0]}-{section[1]}")
+                return section
+
+        return None
+
+    def finish(self) -> List[Tuple[int, int]]:
+        """Cierra la detección y retorna todas las secciones emparejadas"""
+        for start_page in self._pending_starts:
+            logger.warning(f"No se encontró página de fin para la sección que empieza en {start_page}")
+        self._pending_starts.clear()
+        return self.sections
+
+
+class PdfAnalysis:
+    """
+    Resultado de leer un PDF una sola vez: texto por página, páginas con
+    palabras clave de inicio/fin, secciones emparejadas y pistas de paciente
+    unrecognized_pages son páginas escaneadas que el OCR no pudo leer (su texto no se guarda en caché)
+    """
+
+    def __init__(self, file_hash: str, file_size: int, page_texts: List[str],
+                 start_pages: List[int], end_pages: List[int],
+                 sections: List[Tuple[int, int]], patient_hints: Dict[int, str],
+                 unrecognized_pages: Optional[List[int]] = None):
+        self.file_hash = file_hash
+        self.file_size = file_size
+        self.page_texts = page_texts
+        self.start_pages = start_pages
+        self.end_pages = end_pages
+        self.sections = sections
+        self.patient_hints = patient_hints
+        self.unrecognized_pages = unrecognized_pages or []
+
+    @property
+    def total_pages(self) -> int:
+        return len(self.page_texts)
+
+    @property
+    def is_multi_patient(self) -> bool:
+        """Más de una página de inicio indica un documento múltiple"""
+        return len(self.start_pages) > 1
+
+    def is_range_cacheable(self, start: int = 0, end: Optional[int] = None) -> bool:
+        """True si ninguna página del rango quedó sin OCR"""
+        last = self.total_pages - 1 if end is None else end
+        return not any(start <= page_num <= last for page_num in self.unrecognized_pages)
+
+    def leading_text(self, max_pages: int = 3) -> str:
+        """Texto de las primeras páginas (usado para validar el formato)"""
+        return " ".join(self.page_texts[:max_pages])
+
+    def section_metadata(self, start: int, end: int) -> dict:
+        """Metadata básica de una sección sin volver a leer el PDF"""
+        return {
+            'start_page': start,
+            'end_page': end,
+            'total_pages': end - start + 1,
+            'patient_hint': self.patient_hints.get(start),
+            'fingerprint': section_fingerprint(self.page_texts[start:end + 1])
+        }
+
+    @classmethod
+    def from_page_texts(cls, file_hash: str, file_size: int, page_texts: List[str],
+                        start_keyword: str = START_KEYWORD, end_keyword: str = END_KEYWORD,
+                        unrecognized_pages: Optional[List[int]] = None) -> 'PdfAnalysis':
+        """Construye el análisis a partir del texto ya extraído de cada página"""
+        detector = IncrementalSectionDetector(start_keyword, end_keyword)
+
+        for page_num, text in enumerate(page_texts):
+            detector.feed(page_num, text)
+
+        sections = detector.finish()
+        start_pages = detector.start_pages
+        end_pages = detector.end_pages
+        patient_hints = detector.patient_hints
+
+        logger.info(
+            f"Análisis completado: {len(page_texts)} páginas, "
+            f"{len(start_pages)} inicios, {len(end_pages)} finales, {len(sections)} secciones"
+        )
+
+        return cls(
+            file_hash=file_hash,
+            file_size=file_size,
+            page_texts=page_texts,
+            start_pages=start_pages,
+            end_pages=end_pages,
+            sections=sections,
+            patient_hints=patient_hints,
+            unrecognized_pages=unrecognized_pages,
+        )
+
+    @classmethod
+    def build(cls, pdf_file_path: str, file_hash: Optional[str] = None,
+              start_keyword: str = START_KEYWORD, end_keyword: str = END_KEYWORD) -> 'PdfAnalysis':
+        """Construye el análisis recorriendo cada página exactamente una vez"""
+        if file_hash is None:
+            file_hash = compute_file_hash(pdf_file_path)
+
+        unrecognized = []
+        page_texts = extract_page_texts(pdf_file_path, unrecognized)
+
+        return cls.from_page_texts(
+            file_hash, os.path.getsize(pdf_file_path), page_texts, start_keyword, end_keyword, unrecognized
+        )
+
+
+def extract_page_texts(pdf_file_path: str, unrecognized: Optional[List[int]] = None) -> List[str]:
+    """Extrae el texto de cada página del PDF con PyMuPDF (en paralelo si es grande) y OCR"""
+    return scan_page_texts(pdf_file_path, unrecognized=unrecognized)
+
+
+def get_pdf_analysis(pdf_file_path: str, start_keyword: str = START_KEYWORD,
+                     end_keyword: str = END_KEYWORD) -> PdfAnalysis:
+    """
+    Obtiene el análisis de un PDF, reutilizando el de la caché del proceso
+    si ya se analizó un archivo con el mismo contenido
+    """
+    file_hash = compute_file_hash(pdf_file_path)
+    key = (file_hash, start_keyword, end_keyword)
+
+    with _analysis_cache_lock:
+        analysis = _analysis_cache.get(key)
+        if analysis is not None:
+            _analysis_cache.move_to_end(key)
+            logger.debug(f"Análisis reutilizado desde caché: {file_hash[:12]}")
+            return analysis
+
+    # El texto puede estar ya en la caché persistente (p.ej. reprocesamientos)
+    store = get_page_text_store()
+    page_texts = store.get_pages(file_hash) if store else None
+
+    if page_texts is not None:
+        analysis = PdfAnalysis.from_page_texts(
+            file_hash, os.path.getsize(pdf_file_path), page_texts, start_keyword, end_keyword
+        )
+    else:
+        analysis = PdfAnalysis.build(pdf_file_path, file_hash, start_keyword, end_keyword)
+        if store and analysis.is_range_cacheable():
+            store.put_pages(file_hash, analysis.page_texts)
+
+    _cache_analysis(key, analysis)
+    return analysis
+
+
+def _cache_analysis(key: Tuple[str, str, str], analysis: PdfAnalysis):
+    with _analysis_cache_lock:
+        _analysis_cache[key] = analysis
+        _analysis_cache.move_to_end(key)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+
+def iter_pdf_sections(pdf_file_path: str, start_keyword: str = START_KEYWORD,
+                      end_keyword: str = END_KEYWORD, doc=None) -> Iterator[Tuple[int, int, dict]]:
+    """
+    Genera (inicio, fin, metadata) de cada sección a medida que se detecta
+    Si el PDF ya fue analizado reutiliza ese análisis; si no, lee las páginas en
+    orden y al terminar deja el análisis completo en las cachés
+    """
+    file_hash = compute_file_hash(pdf_file_path)
+    key = (file_hash, start_keyword, end_keyword)
+
+    with _analysis_cache_lock:
+        analysis = _analysis_cache.get(key)
+
+    store = get_page_text_store()
+    if analysis is None and store:
+        page_texts = store.get_pages(file_hash)
+        if page_texts is not None:
+            analysis = PdfAnalysis.from_page_texts(
+                file_hash, os.path.getsize(pdf_file_path), page_texts, start_keyword, end_keyword
+            )
+            _cache_analysis(key, analysis)
+
+    if analysis is not None:
+        for start, end in analysis.sections:
+            yield start, end, analysis.section_metadata(start, end)
+        return
+
+    detector = IncrementalSectionDetector(start_keyword, end_keyword)
+    page_texts = []
+    unrecognized = []
+
+    own_doc = doc is None
+    if own_doc:
+        doc = fitz.open(pdf_file_path)
+
+    try:
+        for page_num in range(len(doc)):
+            try:
+                text = doc.load_page(page_num).get_text("text")
+            except Exception as e:
+                logger.warning(f"Error analizando página {page_num}: {e}")
+                text = ""
+
+            # Páginas escaneadas: OCR antes de buscar las palabras clave
+            text = recognize_image_pages(pdf_file_path, doc, page_num, [text], unrecognized)[0]
+
+            page_texts.append(text)
+            section = detector.feed(page_num, text)
+
+            if section is not None:
+                start, end = section
+                yield start, end, {
+                    'start_page': start,
+                    'end_page': end,
+                    'total_pages': end - start + 1,
+                    'patient_hint': detector.patient_hints.get(start),
+                    'fingerprint': section_fingerprint(page_texts[start:end + 1])
+                }
+    finally:
+        if own_doc:
+            doc.close()
+
+    detector.finish()
+    analysis = PdfAnalysis(
+        file_hash=file_hash,
+        file_size=os.path.getsize(pdf_file_path),
+        page_texts=page_texts,
+        start_pages=detector.start_pages,
+        end_pages=detector.end_pages,
+        sections=detector.sections,
+        patient_hints=detector.patient_hints,
+        unrecognized_pages=unrecognized,
+    )
+    _cache_analysis(key, analysis)
+    if store and analysis.is_range_cacheable():
+        store.put_pages(file_hash, page_texts)
+
+
+def clear_analysis_cache():
+    """Vacía la caché de análisis del proceso"""
+    with _analysis_cache_lock:
+        _analysis_cache.clear()
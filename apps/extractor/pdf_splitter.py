@@ -1,15 +1,63 @@
 # apps/extractor/pdf_splitter.py
 
 import fitz  # PyMuPDF
+import hashlib
 import os
 import tempfile
 import logging
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 
+from .pdf_analysis import (
+    PdfAnalysis, get_pdf_analysis, iter_pdf_sections, pair_sections, compute_file_hash,
+    START_KEYWORD, END_KEYWORD, SOAT_INDICATORS
+)
+from .soat_patterns import VICTIM_PATTERN
+from .document_pool import get_document_pool
+from .ocr_stage import PAGE_IMAGE, classify_page
+from .page_text_cache import get_page_text_store
+
 logger = logging.getLogger(__name__)
 
+# Páginas que el sondeo de la subida lee además de las iniciales; si no alcanza
+# para decidir, la tarea de división lee el resto en background
+PROBE_EXTRA_PAGES = 5
+
+# Opciones de guardado de las secciones: eliminar objetos no usados y duplicados
+# (fuentes, logos e imágenes copiados del padre) y comprimir los streams
+SECTION_SAVE_OPTIONS = {
+    'garbage': 4,
+    'deflate': True,
+    'deflate_images': True,
+    'deflate_fonts': True,
+}
+
+
+class SplitSection:
+    """
+    Handle liviano de una sección ya escrita a disco por iter_split_pdf
+    index es el número de la sección en el PDF (desde 1); si no se pudo escribir,
+    error tiene el motivo y path es None
+    """
+    
+    __slots__ = ('path', 'filename', 'metadata', 'file_size', 'index', 'error')
+    
+    def __init__(self, path: Optional[str], filename: str, metadata: dict, file_size: int,
+                 index: int = 0, error: Optional[str] = None):
+        self.path = path
+        self.filename = filename
+        self.metadata = metadata
+        self.file_size = file_size
+        self.index = index
+        self.error = error
+    
+    def open(self):
+        """Abre el PDF de la sección en modo binario"""
+        return open(self.path, 'rb')
+
+
 class GlosaPDFSplitter:
     """
     Divisor de PDFs de glosas médicas integrado con Django
@@ -18,27 +66,83 @@ class GlosaPDFSplitter:
     
     def __init__(self):
         # Palabras clave para definir las secciones
-        self.start_keyword = "Víctima"
-        self.end_keyword = "Valor de Reclamación:"
+        self.start_keyword = START_KEYWORD
+        self.end_keyword = END_KEYWORD
+    
+    def analyze(self, pdf_file_path: str) -> PdfAnalysis:
+        """
+        Analiza el PDF en una sola pasada (con caché por hash de archivo)
+        El resultado puede pasarse al resto de métodos para no releer el PDF
+        """
+        return get_pdf_analysis(pdf_file_path, self.start_keyword, self.end_keyword)
         
-    def detect_multiple_patients(self, pdf_file_path: str) -> bool:
+    def detect_multiple_patients(self, pdf_file_path: str, analysis: Optional[PdfAnalysis] = None) -> bool:
         """
         Detecta si un PDF contiene múltiples pacientes
         Retorna True si encuentra más de una sección
         """
         try:
-            doc = fitz.open(pdf_file_path)
-            start_pages, end_pages = self._detect_sections(doc)
-            doc.close()
+            analysis = analysis or self.analyze(pdf_file_path)
             
             # Si hay más de una página de inicio, es un documento múltiple
-            return len(start_pages) > 1
+            return analysis.is_multi_patient
             
         except Exception as e:
             logger.error(f"Error detectando múltiples pacientes: {str(e)}")
             return False
     
-    def split_pdf(self, pdf_file_path: str) -> List[Tuple[bytes, str, dict]]:
+    def probe_multiple_patients(self, pdf_file_path: str, max_leading_pages: int = 3) -> Tuple[Optional[bool], str]:
+        """
+        Lee pocas páginas (solo la capa de texto, sin OCR) buscando dos inicios de sección
+        Retorna (es_múltiple, texto de las primeras páginas) sin analizar todo el PDF;
+        es_múltiple es None si no se puede decidir y lo decide la tarea de división
+        """
+        start_lower = self.start_keyword.lower()
+        doc = get_document_pool().get(pdf_file_path)
+        probe_pages = min(len(doc), max_leading_pages + PROBE_EXTRA_PAGES)
+        leading_texts = []
+        start_count = 0
+        
+        for page_num in range(probe_pages):
+            try:
+                page = doc.load_page(page_num)
+                text = page.get_text("text")
+                scanned = classify_page(page, text) == PAGE_IMAGE
+            except Exception as e:
+                logger.warning(f"Error analizando página {page_num}: {e}")
+                text = ""
+                scanned = False
+            
+            # Página escaneada: el OCR no corre en la petición web, decide la tarea de división
+            if scanned:
+                return None, " ".join(leading_texts)
+            
+            if page_num < max_leading_pages:
+                leading_texts.append(text)
+            
+            if start_lower in text.lower():
+                start_count += 1
+            
+            if start_count > 1 and page_num + 1 >= max_leading_pages:
+                break
+        
+        if start_count > 1:
+            return True, " ".join(leading_texts)
+        
+        # Solo es de un paciente con seguridad si se leyó el documento completo
+        return (False if probe_pages == len(doc) else None), " ".join(leading_texts)
+    
+    def iter_sections(self, pdf_file_path: str) -> Iterator[Tuple[int, int, dict]]:
+        """
+        Genera (inicio, fin, metadata) de cada sección apenas se encuentra su página de fin
+        Permite crear y despachar cada documento hijo mientras se sigue leyendo el PDF
+        """
+        return iter_pdf_sections(
+            pdf_file_path, self.start_keyword, self.end_keyword,
+            doc=get_document_pool().get(pdf_file_path)
+        )
+    
+    def split_pdf(self, pdf_file_path: str, analysis: Optional[PdfAnalysis] = None) -> List[Tuple[bytes, str, dict]]:
         """
         Divide un PDF en secciones por paciente
         Retorna lista de tuplas (contenido_pdf, nombre_archivo, metadata)
@@ -46,23 +150,32 @@ class GlosaPDFSplitter:
         try:
             logger.info(f"Iniciando división de PDF: {pdf_file_path}")
             
-            doc = fitz.open(pdf_file_path)
-            start_pages, end_pages = self._detect_sections(doc)
-            sections = self._pair_sections(start_pages, end_pages)
+            analysis = analysis or self.analyze(pdf_file_path)
+            sections = analysis.sections
             
             if len(sections) <= 1:
                 logger.info("PDF contiene un solo paciente")
-                doc.close()
                 return []  # No necesita división
             
             logger.info(f"Detectadas {len(sections)} secciones de pacientes")
             
+            doc = fitz.open(pdf_file_path)
+            store = get_page_text_store()
             split_pdfs = []
             
             for i, (start, end) in enumerate(sections):
                 try:
                     pdf_content = self._extract_section(doc, start, end)
-                    section_metadata = self._extract_section_metadata(doc, start, end)
+                    section_metadata = analysis.section_metadata(start, end)
+                    
+                    # Registrar el texto de la sección bajo su propio hash para que
+                    # la tarea de extracción hija no vuelva a leer el PDF
+                    # (no si alguna página escaneada quedó sin OCR)
+                    if store and analysis.is_range_cacheable(start, end):
+                        store.put_pages(
+                            hashlib.sha256(pdf_content).hexdigest(),
+                            analysis.page_texts[start:end + 1]
+                        )
                     
                     filename = f"section_{i+1}.pdf"
                     split_pdfs.append((pdf_content, filename, section_metadata))
@@ -81,69 +194,117 @@ class GlosaPDFSplitter:
             logger.error(f"Error dividiendo PDF: {str(e)}")
             raise Exception(f"Error dividiendo PDF: {str(e)}")
     
-    def _detect_sections(self, doc) -> Tuple[List[int], List[int]]:
-        """Detecta páginas de inicio y fin de secciones"""
-        start_pages = []
-        end_pages = []
+    def iter_split_pdf(self, pdf_file_path: str, analysis: Optional[PdfAnalysis] = None,
+                       output_dir: Optional[str] = None) -> Iterator[SplitSection]:
+        """
+        Divide un PDF en secciones por paciente escribiendo cada una a disco apenas se corta
+        Genera handles SplitSection livianos, así la memoria no crece con el número de pacientes
         
-        logger.debug(f"Analizando {len(doc)} páginas para detectar secciones")
+        Sin output_dir las secciones van a un directorio temporal y cada archivo se
+        elimina cuando el consumidor pide la siguiente sección (debe copiarlo antes)
+        Una sección que no se pudo escribir se genera igual con error, para no correr la numeración
+        """
+        logger.info(f"Iniciando división en streaming de PDF: {pdf_file_path}")
         
-        for page_num in range(len(doc)):
-            try:
-                text = doc[page_num].get_text("text").lower()
+        analysis = analysis or self.analyze(pdf_file_path)
+        sections = analysis.sections
+        
+        if len(sections) <= 1:
+            logger.info("PDF contiene un solo paciente")
+            return
+        
+        logger.info(f"Detectadas {len(sections)} secciones de pacientes")
+        
+        temp_dir = None
+        if output_dir is None:
+            temp_dir = tempfile.TemporaryDirectory(prefix='glosa_split_')
+            target_dir = temp_dir.name
+        else:
+            os.makedirs(output_dir, exist_ok=True)
+            target_dir = output_dir
+        
+        doc = fitz.open(pdf_file_path)
+        store = get_page_text_store()
+        written = 0
+        
+        try:
+            for i, (start, end) in enumerate(sections):
+                filename = f"section_{i+1}.pdf"
+                output_path = os.path.join(target_dir, filename)
                 
-                # Buscar inicio de sección
-                if self.start_keyword.lower() in text:
-                    start_pages.append(page_num)
-                    logger.debug(f"Inicio de sección encontrado en página {page_num}")
+                try:
+                    file_size = self._write_section(doc, start, end, output_path)
+                except Exception as e:
+                    logger.error(f"Error extrayendo sección {i+1}: {e}")
+                    yield SplitSection(
+                        None, filename, analysis.section_metadata(start, end), 0, index=i + 1, error=str(e)
+                    )
+                    continue
                 
-                # Buscar fin de sección
-                if self.end_keyword.lower() in text:
-                    end_pages.append(page_num)
-                    logger.debug(f"Fin de sección encontrado en página {page_num}")
-                    
-            except Exception as e:
-                logger.warning(f"Error analizando página {page_num}: {e}")
-                continue
-        
-        logger.info(f"Detección completada: {len(start_pages)} inicios, {len(end_pages)} finales")
-        return start_pages, end_pages
+                # Registrar el texto de la sección bajo su propio hash (si todo tiene OCR)
+                if store and analysis.is_range_cacheable(start, end):
+                    store.put_pages(
+                        compute_file_hash(output_path, chunk_size=64 * 1024),
+                        analysis.page_texts[start:end + 1]
+                    )
+                
+                written += 1
+                yield SplitSection(
+                    output_path, filename, analysis.section_metadata(start, end), file_size, index=i + 1
+                )
+                
+                if temp_dir is not None and os.path.exists(output_path):
+                    os.remove(output_path)
+        finally:
+            doc.close()
+            if temp_dir is not None:
+                temp_dir.cleanup()
+            logger.info(f"División en streaming completada: {written} secciones escritas")
+    
+    def extract_section_bytes(self, pdf_file_path: str, start: int, end: int) -> bytes:
+        """
+        Genera bajo demanda el PDF de una sección (documentos hijos por rango)
+        Usa el pool de documentos abiertos del proceso
+        """
+        doc = get_document_pool().get(pdf_file_path)
+        return self._extract_section(doc, start, end)
     
     def _pair_sections(self, start_pages: List[int], end_pages: List[int]) -> List[Tuple[int, int]]:
         """Empareja páginas de inicio con páginas de fin"""
-        sections = []
-        used_end_pages = set()
-        
         logger.debug("Emparejando páginas de inicio y fin")
+        return pair_sections(start_pages, end_pages)
+    
+    def _build_section_document(self, doc, start: int, end: int):
+        """Crea un documento PyMuPDF nuevo con las páginas de la sección"""
+        new_pdf = fitz.open()
         
-        for start_page in start_pages:
-            # Buscar la siguiente página de finalización disponible
-            end_page = next(
-                (ep for ep in end_pages if ep >= start_page and ep not in used_end_pages), 
-                None
-            )
-            
-            if end_page is not None:
-                sections.append((start_page, end_page))
-                used_end_pages.add(end_page)
-                logger.debug(f"Sección emparejada: páginas {start_page}-{end_page}")
-            else:
-                logger.warning(f"No se encontró página de fin para la sección que empieza en {start_page}")
+        # Insertar las páginas de la sección en un solo bloque (recursos compartidos una vez)
+        last_page = min(end, len(doc) - 1)
+        if start <= last_page:
+            new_pdf.insert_pdf(doc, from_page=start, to_page=last_page)
+        
+        self._subset_fonts(new_pdf)
+        return new_pdf
+    
+    def _subset_fonts(self, new_pdf):
+        """Reduce las fuentes incrustadas a los glifos usados (requiere fontTools)"""
+        if not getattr(settings, 'PDF_SECTION_SUBSET_FONTS', True):
+            return
         
-        return sections
+        try:
+            new_pdf.subset_fonts()
+        except ImportError:
+            logger.debug("fontTools no está instalado: secciones sin subconjunto de fuentes")
+        except Exception as e:
+            logger.warning(f"No se pudo reducir las fuentes de la sección: {e}")
     
     def _extract_section(self, doc, start: int, end: int) -> bytes:
         """Extrae una sección específica como PDF"""
         try:
-            new_pdf = fitz.open()
-            
-            # Insertar las páginas de la sección
-            for page_num in range(start, end + 1):
-                if page_num < len(doc):
-                    new_pdf.insert_pdf(doc, from_page=page_num, to_page=page_num)
+            new_pdf = self._build_section_document(doc, start, end)
             
             # Convertir a bytes
-            pdf_bytes = new_pdf.tobytes()
+            pdf_bytes = new_pdf.tobytes(**SECTION_SAVE_OPTIONS)
             new_pdf.close()
             
             logger.debug(f"Sección extraída: {len(pdf_bytes)} bytes")
@@ -153,6 +314,21 @@ class GlosaPDFSplitter:
             logger.error(f"Error extrayendo sección páginas {start}-{end}: {e}")
             raise
     
+    def _write_section(self, doc, start: int, end: int, output_path: str) -> int:
+        """Escribe una sección directamente a disco sin pasar por bytes en memoria"""
+        try:
+            new_pdf = self._build_section_document(doc, start, end)
+            new_pdf.save(output_path, **SECTION_SAVE_OPTIONS)
+            new_pdf.close()
+            
+            file_size = os.path.getsize(output_path)
+            logger.debug(f"Sección escrita: {output_path} ({file_size} bytes)")
+            return file_size
+            
+        except Exception as e:
+            logger.error(f"Error escribiendo sección páginas {start}-{end}: {e}")
+            raise
+    
     def _extract_section_metadata(self, doc, start: int, end: int) -> dict:
         """Extrae metadata básica de una sección"""
         metadata = {
@@ -168,9 +344,7 @@ class GlosaPDFSplitter:
                 first_page_text = doc[start].get_text("text")
                 
                 # Buscar patrón de víctima
-                import re
-                victim_pattern = r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\n|\r|Número)'
-                match = re.search(victim_pattern, first_page_text, re.IGNORECASE)
+                match = VICTIM_PATTERN.search(first_page_text)
                 
                 if match:
                     patient_name = match.group(1).strip()
@@ -182,59 +356,48 @@ class GlosaPDFSplitter:
         
         return metadata
     
-    def validate_pdf_format(self, pdf_file_path: str) -> Tuple[bool, str]:
+    def validate_pdf_format(self, pdf_file_path: str, analysis: Optional[PdfAnalysis] = None) -> Tuple[bool, str]:
         """
         Valida que el PDF tenga el formato esperado de glosa SOAT
         Retorna (es_válido, mensaje)
         """
         try:
-            doc = fitz.open(pdf_file_path)
+            analysis = analysis or self.analyze(pdf_file_path)
             
-            # Buscar indicadores de glosa SOAT en las primeras páginas
-            soat_indicators = [
-                "liquidación de siniestros soat",
-                "seguros mundial",
-                "víctima",
-                "reclamación",
-                "póliza"
-            ]
-            
-            text_found = ""
-            for page_num in range(min(3, len(doc))):  # Revisar primeras 3 páginas
-                page_text = doc[page_num].get_text("text").lower()
-                text_found += page_text + " "
-            
-            doc.close()
-            
-            # Verificar que contenga al menos 3 indicadores
-            indicators_found = sum(1 for indicator in soat_indicators if indicator in text_found)
-            
-            if indicators_found >= 3:
-                return True, "Formato de glosa SOAT válido"
-            else:
-                return False, f"Formato no reconocido como glosa SOAT (indicadores: {indicators_found}/5)"
+            # Buscar indicadores de glosa SOAT en las primeras 3 páginas
+            return self.validate_leading_text(analysis.leading_text(3))
                 
         except Exception as e:
             return False, f"Error validando PDF: {str(e)}"
     
-    def get_pdf_info(self, pdf_file_path: str) -> dict:
+    def validate_leading_text(self, leading_text: str) -> Tuple[bool, str]:
+        """Valida el formato SOAT a partir del texto de las primeras páginas"""
+        text_found = leading_text.lower()
+        
+        # Verificar que contenga al menos 3 indicadores
+        indicators_found = sum(1 for indicator in SOAT_INDICATORS if indicator in text_found)
+        
+        if indicators_found >= 3:
+            return True, "Formato de glosa SOAT válido"
+        else:
+            return False, f"Formato no reconocido como glosa SOAT (indicadores: {indicators_found}/5)"
+    
+    def get_pdf_info(self, pdf_file_path: str, analysis: Optional[PdfAnalysis] = None) -> dict:
         """Obtiene información general del PDF"""
         try:
-            doc = fitz.open(pdf_file_path)
+            analysis = analysis or self.analyze(pdf_file_path)
             
             info = {
-                'total_pages': len(doc),
-                'file_size': os.path.getsize(pdf_file_path),
+                'total_pages': analysis.total_pages,
+                'file_size': analysis.file_size,
                 'is_valid': True,
                 'error': None
             }
             
-            # Detectar secciones
-            start_pages, end_pages = self._detect_sections(doc)
-            info['sections_detected'] = len(start_pages)
-            info['is_multi_patient'] = len(start_pages) > 1
+            # Secciones detectadas en el análisis
+            info['sections_detected'] = len(analysis.start_pages)
+            info['is_multi_patient'] = analysis.is_multi_patient
             
-            doc.close()
             return info
             
         except Exception as e:
@@ -0,0 +1,107 @@
+# apps/extractor/procedure_merge.py
+"""
+Índice para conciliar procedimientos de OCR y de IA sin comparar todos contra todos
+Los procedimientos se indexan por descripción normalizada (regla exacta) y por
+(código, valor total); dentro de cada cubeta se permite una comparación difusa
+acotada para descripciones truncadas o con pequeñas diferencias de OCR
+"""
+
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Similitud mínima de descripciones para unir procedimientos de la misma cubeta
+FUZZY_MIN_RATIO = 0.9
+
+# Candidatos revisados como máximo por cubeta en la comparación difusa
+MAX_FUZZY_CANDIDATES = 5
+
+# Largo mínimo de descripción para considerarla sustancial (igual que la regla exacta)
+MIN_DESCRIPTION_LENGTH = 10
+
+
+def description_key(procedure: Dict[str, Any]) -> str:
+    return procedure.get('descripcion', '').upper().strip()
+
+
+def _digits(text: str) -> str:
+    return ''.join(char for char in text if char.isdigit())
+
+
+def similar_descriptions(desc1: str, desc2: str, min_ratio: float) -> bool:
+    """Descripciones casi iguales o una truncada de la otra"""
+    shorter, longer = sorted((desc1, desc2), key=len)
+    if len(shorter) <= MIN_DESCRIPTION_LENGTH:
+        return False
+
+    # Un número distinto (día, sesión, ítem) indica otro procedimiento
+    if longer.startswith(shorter):
+        return not shorter[-1].isdigit()
+
+    if _digits(desc1) != _digits(desc2):
+        return False
+
+    matcher = SequenceMatcher(None, desc1, desc2)
+    return matcher.real_quick_ratio() >= min_ratio and matcher.quick_ratio() >= min_ratio \
+        and matcher.ratio() >= min_ratio
+
+
+class ProcedureMergeIndex:
+    """
+    Ubica, para un procedimiento nuevo, el primero de la lista que representa lo mismo
+    same_procedure es la regla exacta (misma descripción y código o valor compatible);
+    con fuzzy_ratio=None no se hace comparación difusa
+    """
+
+    def __init__(self, procedures: List[Dict[str, Any]],
+                 same_procedure: Callable[[Dict[str, Any], Dict[str, Any]], bool],
+                 fuzzy_ratio: Optional[float] = FUZZY_MIN_RATIO):
+        self.procedures = procedures
+        self.same_procedure = same_procedure
+        self.fuzzy_ratio = fuzzy_ratio
+        self._by_description: Dict[str, List[int]] = {}
+        self._by_code_value: Dict[Tuple[str, Any], List[int]] = {}
+
+        for position, procedure in enumerate(procedures):
+            self._index(position, procedure)
+
+    def _index(self, position: int, procedure: Dict[str, Any]):
+        self._by_description.setdefault(description_key(procedure), []).append(position)
+        self.reindex_code(position, procedure)
+
+    def reindex_code(self, position: int, procedure: Dict[str, Any]):
+        """Registra el (código, valor) actual; se llama cuando el merge cambia el código"""
+        codigo = procedure.get('codigo', '')
+        if not codigo or codigo == '00000':
+            return
+
+        bucket = self._by_code_value.setdefault((codigo, procedure.get('valor_total', 0)), [])
+        if position not in bucket:
+            bucket.append(position)
+
+    def append(self, procedure: Dict[str, Any]) -> int:
+        self.procedures.append(procedure)
+        position = len(self.procedures) - 1
+        self._index(position, procedure)
+        return position
+
+    def find(self, procedure: Dict[str, Any]) -> Optional[int]:
+        # Regla exacta: solo procedimientos con la misma descripción normalizada
+        for position in self._by_description.get(description_key(procedure), ()):
+            if self.same_procedure(self.procedures[position], procedure):
+                return position
+
+        if self.fuzzy_ratio is None:
+            return None
+
+        codigo = procedure.get('codigo', '')
+        if not codigo or codigo == '00000':
+            return None
+
+        # Misma cubeta (código, valor total) y descripción parecida
+        bucket = self._by_code_value.get((codigo, procedure.get('valor_total', 0)), ())
+        desc = description_key(procedure)
+        for position in bucket[:MAX_FUZZY_CANDIDATES]:
+            if similar_descriptions(description_key(self.procedures[position]), desc, self.fuzzy_ratio):
+                return position
+
+        return None
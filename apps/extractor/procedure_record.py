@@ -0,0 +1,135 @@
+# apps/extractor/procedure_record.py
+"""
+Registro compacto de procedimiento usado dentro del pipeline de extracción
+Tiene __slots__ para los campos conocidos y se comporta como un dict (proc['codigo'],
+proc.get(...), 'observacion' in proc), así el código existente no cambia.
+Solo al final de extract_from_pdf se convierte en dict para guardarlo en el JSONField
+"""
+
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterable, List
+
+PROCEDURE_FIELDS = (
+    'codigo', 'descripcion', 'cantidad', 'valor_unitario', 'valor_total',
+    'valor_pagado', 'valor_objetado', 'observacion', 'estado', 'extraction_method',
+)
+
+_FIELD_SET = frozenset(PROCEDURE_FIELDS)
+
+_MISSING = object()
+
+
+class ProcedureRecord(MutableMapping):
+    """
+    Procedimiento con slots; un campo sin asignar equivale a una clave ausente del dict
+    Las claves fuera de PROCEDURE_FIELDS (p. ej. de la respuesta de IA) van en extra
+    """
+
+    __slots__ = PROCEDURE_FIELDS + ('extra',)
+
+    def __init__(self, codigo: str, descripcion: str, cantidad: int, valor_unitario: float,
+                 valor_total: float, valor_pagado: float, valor_objetado: float,
+                 observacion: str, estado: str, extraction_method: str):
+        self.codigo = codigo
+        self.descripcion = descripcion
+        self.cantidad = cantidad
+        self.valor_unitario = valor_unitario
+        self.valor_total = valor_total
+        self.valor_pagado = valor_pagado
+        self.valor_objetado = valor_objetado
+        self.observacion = observacion
+        self.estado = estado
+        self.extraction_method = extraction_method
+        self.extra = None
+
+    @classmethod
+    def from_values(cls, codigo: str, descripcion: str, cantidad: float, valor_total: float,
+                    valor_pagado: float, valor_objetado: float, observacion: str,
+                    extraction_method: str) -> 'ProcedureRecord':
+        """Procedimiento de una fila de la tabla: valor unitario y estado derivados"""
+        return cls(
+            codigo, descripcion, int(cantidad),
+            valor_total / cantidad if cantidad > 0 else 0,
+            valor_total, valor_pagado, valor_objetado, observacion,
+            'objetado' if valor_objetado > 0 else 'aceptado',
+            extraction_method,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'ProcedureRecord':
+        record = cls.__new__(cls)
+        record.extra = None
+        for key, value in data.items():
+            record[key] = value
+        return record
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra is None:
+            raise KeyError(key)
+        else:
+            del self.extra[key]
+
+    def __iter__(self):
+        for field in PROCEDURE_FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return self.extra.get(key, default) if self.extra else default
+
+    def copy(self) -> 'ProcedureRecord':
+        return ProcedureRecord.from_dict(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for field in PROCEDURE_FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"ProcedureRecord({self.to_dict()!r})"
+
+
+def to_records(procedures: Iterable[Mapping]) -> List[ProcedureRecord]:
+    """Convierte procedimientos recibidos como dict (p. ej. JSON de OpenAI) en registros"""
+    return [proc if isinstance(proc, ProcedureRecord) else ProcedureRecord.from_dict(proc)
+            for proc in procedures]
+
+
+def to_dicts(procedures: Iterable[Mapping]) -> List[Dict[str, Any]]:
+    """Procedimientos listos para serializar en el JSONField"""
+    return [proc.to_dict() if isinstance(proc, ProcedureRecord) else proc for proc in procedures]
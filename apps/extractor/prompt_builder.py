@@ -0,0 +1,283 @@
+# apps/extractor/prompt_builder.py
+"""
+Prompt de documento para OpenAI armado dentro de un presupuesto de tokens
+Se estima localmente cuántos tokens ocupa cada parte y se empaca primero la
+tabla de procedimientos (lo que el regex no siempre resuelve); el encabezado y el
+pie solo entran si sobra presupuesto, y los datos que el regex ya extrajo van como
+contexto compacto en vez del texto que los contiene
+"""
+
+import json
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from .document_regions import segment_document
+
+logger = logging.getLogger(__name__)
+
+# Tokens máximos del texto del documento dentro del prompt (sin instrucciones)
+DEFAULT_PROMPT_MAX_INPUT_TOKENS = 6000
+
+# Caracteres por token de una palabra en español (heurística sin tokenizador)
+CHARS_PER_TOKEN = 4
+
+_TOKEN_PIECES = re.compile(r'\w+|[^\w\s]')
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('o200k_base')
+except Exception:
+    _ENCODING = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Tokens de un texto: exacto con tiktoken si está instalado; si no, cada palabra
+    cuenta un token por cada 4 caracteres y cada signo de puntuación uno
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return sum(math.ceil(len(piece) / CHARS_PER_TOKEN) for piece in _TOKEN_PIECES.findall(text))
+
+
+def get_prompt_max_input_tokens() -> int:
+    """Tokens de documento configurados por prompt"""
+    max_tokens = DEFAULT_PROMPT_MAX_INPUT_TOKENS
+
+    try:
+        from django.conf import settings
+        max_tokens = getattr(settings, 'OPENAI_PROMPT_MAX_INPUT_TOKENS', max_tokens)
+    except Exception:
+        pass
+
+    return max_tokens
+
+
+DOCUMENT_INSTRUCTIONS = """\
+Analiza este documento de liquidación SOAT colombiano y extrae TODA la información.
+
+INSTRUCCIONES CRÍTICAS PARA PROCEDIMIENTOS:
+
+1. DEBES encontrar TODOS los procedimientos médicos en la tabla, incluyendo:
+   - Procedimientos con código de 5 dígitos (21102, 39145, etc.)
+   - Procedimientos con código compuesto (19922562-10)
+   - Procedimientos SIN código (VENDA ELASTICA, CATETER INTRAVENOSO, etc.)
+
+2. Para procedimientos sin código, usa "00000" como código
+
+3. IMPORTANTE: En el documento puede aparecer EL MISMO CÓDIGO varias veces con diferente descripción.
+   Por ejemplo:
+   21102 RADIOGRAFIA DE RODILLA AP LATE
+   21102 RADIOGRAFIA DE PIERNA AP Y LAT
+
+   Estos son DOS PROCEDIMIENTOS DIFERENTES que debes incluir ambos.
+
+4. Los procedimientos pueden aparecer en diferentes formatos:
+   - Todo en una línea: código descripción cantidad valores
+   - En múltiples líneas: código en una línea, descripción en otra
+   - Sin código: directamente la descripción seguida de valores
+
+5. Busca ESPECÍFICAMENTE en la tabla que tiene columnas como:
+   Código | Descripción | Cant | Valor total | Valor pagado | Valor objetado | Observación
+
+6. INCLUYE TODOS los items que aparezcan en esta tabla, sin excepción.
+
+7. EXTRAE LAS OBSERVACIONES: Las observaciones son CRÍTICAS. Pueden aparecer:
+   - Al final de la línea del procedimiento
+   - En líneas separadas con formato "4567 >> texto de la observación"
+   - Como texto libre después de los valores monetarios
+
+8. Para INFORMACIÓN GENERAL, extrae:
+   - Nombre completo del paciente (después de "Víctima :")
+   - Número de documento de identidad
+   - Número de reclamación/factura
+   - Fechas importantes (siniestro, ingreso, pago)
+   - Valores totales de la liquidación
+"""
+
+DOCUMENT_RESPONSE_FORMAT = """\
+Responde ÚNICAMENTE con el siguiente JSON (sin texto adicional):
+
+{
+"patient_info": {
+    "nombre": "nombre completo del paciente",
+    "documento": "número de documento",
+    "tipo_documento": "tipo (CC, TI, etc.)"
+},
+"policy_info": {
+    "numero_liquidacion": "número de liquidación",
+    "poliza": "número de póliza",
+    "numero_reclamacion": "número de reclamación",
+    "fecha_siniestro": "fecha del siniestro",
+    "fecha_ingreso": "fecha de ingreso",
+    "fecha_pago": "fecha de pago",
+    "orden_pago": "orden de pago"
+},
+"procedures": [
+    {
+    "codigo": "código del procedimiento (5 dígitos, compuesto, o '00000' si no tiene)",
+    "descripcion": "descripción COMPLETA del procedimiento/medicamento/material",
+    "cantidad": cantidad numérica,
+    "valor_total": valor total numérico,
+    "valor_pagado": valor pagado numérico,
+    "valor_objetado": valor objetado numérico,
+    "observacion": "observación/glosa si existe (MUY IMPORTANTE)",
+    "estado": "objetado o aceptado",
+    "extraction_method": "ai_extraction"
+    }
+],
+"financial_summary": {
+    "total_reclamado": valor total reclamado,
+    "total_objetado": valor total objetado,
+    "total_pagado": valor total pagado,
+    "valor_nota_credito": valor nota crédito si existe,
+    "valor_impuestos": valor impuestos si existe
+},
+"diagnostics": [
+    {
+    "codigo": "código CIE-10",
+    "descripcion": "descripción del diagnóstico",
+    "tipo": "principal o secundario"
+    }
+],
+"ips_info": {
+    "nombre": "nombre de la IPS",
+    "nit": "NIT si está disponible"
+}
+}
+
+RECUERDA:
+- Incluir TODOS los procedimientos que aparezcan en la tabla
+- Si el mismo código aparece varias veces, incluir TODAS las ocurrencias
+- Los valores monetarios deben ser números, no strings
+- Si no tiene código, usar "00000"
+- EXTRAE LAS OBSERVACIONES - son críticas para el proceso de glosas
+"""
+
+KNOWN_DATA_INSTRUCTIONS = (
+    "DATOS YA EXTRAÍDOS DEL ENCABEZADO Y EL PIE (úsalos tal cual salvo que el texto los contradiga):"
+)
+
+TRUNCATED_TABLE_NOTE = "(La tabla continúa; extrae solo los procedimientos de las líneas incluidas)"
+
+
+class DocumentPrompt:
+    """Prompt armado y su cuenta de tokens"""
+
+    __slots__ = ('text', 'tokens', 'document_tokens', 'table_lines', 'table_lines_total', 'sections')
+
+    def __init__(self, text: str, tokens: int, document_tokens: int,
+                 table_lines: int, table_lines_total: int, sections: List[str]):
+        self.text = text
+        self.tokens = tokens
+        self.document_tokens = document_tokens
+        self.table_lines = table_lines
+        self.table_lines_total = table_lines_total
+        self.sections = sections
+
+    @property
+    def truncated(self) -> bool:
+        return self.table_lines < self.table_lines_total
+
+
+def _compact_known_data(known_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Campos no vacíos de paciente, póliza, totales, diagnósticos e IPS del regex"""
+    if not known_data:
+        return {}
+
+    compact = {}
+    for section in ('patient_info', 'policy_info', 'financial_summary', 'ips_info'):
+        values = {key: value for key, value in (known_data.get(section) or {}).items() if value not in (None, '', 0)}
+        if values:
+            compact[section] = values
+
+    diagnostics = [
+        {key: value for key, value in diagnostic.items() if key in ('codigo', 'descripcion', 'tipo') and value}
+        for diagnostic in known_data.get('diagnostics') or []
+    ]
+    if diagnostics:
+        compact['diagnostics'] = diagnostics
+
+    return compact
+
+
+def _pack_lines(lines: List[str], budget: int) -> List[str]:
+    """Líneas desde el inicio mientras quepan en el presupuesto"""
+    packed = []
+    for line in lines:
+        tokens = estimate_tokens(line) + 1
+        if tokens > budget:
+            break
+        packed.append(line)
+        budget -= tokens
+    return packed
+
+
+def build_document_prompt(text: str, known_data: Optional[Dict[str, Any]] = None,
+                          max_input_tokens: Optional[int] = None) -> DocumentPrompt:
+    """
+    Arma el prompt del documento con max_input_tokens para su texto
+    Orden de empaque: datos ya extraídos, tabla de procedimientos, encabezado, pie
+    (estos dos se omiten si sus datos ya están en known_data o si la tabla no entró completa)
+    Sin tabla identificable se empaca el texto desde el inicio
+    """
+    if max_input_tokens is None:
+        max_input_tokens = get_prompt_max_input_tokens()
+
+    budget = max_input_tokens
+    sections = []
+    parts = [DOCUMENT_INSTRUCTIONS]
+
+    compact = _compact_known_data(known_data)
+    if compact:
+        context = json.dumps(compact, ensure_ascii=False, separators=(',', ':'), default=str)
+        budget -= estimate_tokens(context)
+        parts.append(f"{KNOWN_DATA_INSTRUCTIONS}\n{context}\n")
+        sections.append('contexto')
+
+    regions = segment_document(text)
+    if regions.has_table:
+        table_lines = regions.lines[regions.table_start:regions.table_end]
+        packed_table = _pack_lines(table_lines, max(budget, 0))
+        budget -= sum(estimate_tokens(line) + 1 for line in packed_table)
+        table_text = "\n".join(packed_table)
+        if len(packed_table) < len(table_lines):
+            table_text += "\n" + TRUNCATED_TABLE_NOTE
+        parts.append(f"TABLA DE PROCEDIMIENTOS:\n{table_text}\n")
+        sections.append('tabla')
+
+        # Encabezado y pie solo si la tabla entró completa, el regex no resolvió sus datos
+        # y hasta donde alcance el presupuesto
+        pending = []
+        table_complete = len(packed_table) == len(table_lines)
+        if table_complete and not (compact.get('patient_info') and compact.get('policy_info')):
+            pending.append(('encabezado', regions.lines[:regions.table_start]))
+        if table_complete and not compact.get('financial_summary'):
+            pending.append(('pie', regions.lines[regions.table_end:]))
+
+        for name, region_lines in pending:
+            packed = _pack_lines(region_lines, max(budget, 0))
+            if packed and any(line.strip() for line in packed):
+                budget -= sum(estimate_tokens(line) + 1 for line in packed)
+                parts.append(f"{name.upper()} DEL DOCUMENTO:\n" + "\n".join(packed) + "\n")
+                sections.append(name)
+        table_lines_total = len(table_lines)
+    else:
+        lines = text.split('\n')
+        packed = _pack_lines(lines, max(budget, 0))
+        budget -= sum(estimate_tokens(line) + 1 for line in packed)
+        parts.append("TEXTO DEL DOCUMENTO:\n" + "\n".join(packed) + "\n")
+        sections.append('texto')
+        packed_table, table_lines_total = packed, len(lines)
+
+    parts.append(DOCUMENT_RESPONSE_FORMAT)
+    prompt = "\n".join(parts)
+
+    return DocumentPrompt(
+        prompt, estimate_tokens(prompt), max_input_tokens - budget,
+        len(packed_table), table_lines_total, sections,
+    )
@@ -0,0 +1,257 @@
+# apps/extractor/rate_limiter.py
+"""
+Límite de requests y tokens por minuto de OpenAI compartido por todos los workers
+Dos token buckets en Redis (requests y tokens) que se actualizan con scripts Lua
+atómicos usando el reloj de Redis. Antes de cada llamada se reservan los tokens
+estimados, esperando lo necesario en vez de fallar con 429, y al recibir la
+respuesta se ajusta la reserva con los tokens reales de response.usage
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Límites por defecto (nivel 1 de gpt-4o-mini)
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200000
+
+# Espera máxima por una reserva; después se llama igual (mejor un 429 que bloquear la tarea)
+DEFAULT_MAX_WAIT_SECONDS = 300.0
+
+# Espera máxima entre consultas al bucket, para repartir turnos entre workers
+MAX_POLL_SECONDS = 5.0
+
+DEFAULT_KEY_PREFIX = 'openai_rate_limit'
+
+# Tokens de formato que OpenAI agrega por mensaje
+TOKENS_PER_MESSAGE = 4
+
+# Rellena ambos buckets según el tiempo transcurrido y reserva si alcanzan los dos
+# Retorna {1, 0} si reservó o {0, ms a esperar}
+_ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local ttl = tonumber(ARGV[6])
+
+local function refill(key, capacity, rate)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, level + math.max(0, now - ts) * rate)
+end
+
+local request_capacity, request_rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local token_capacity, token_rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+local cost = tonumber(ARGV[5])
+
+local requests = refill(KEYS[1], request_capacity, request_rate)
+local tokens = refill(KEYS[2], token_capacity, token_rate)
+
+local wait = 0
+if requests < 1 then
+    wait = (1 - requests) / request_rate
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) / token_rate)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+
+redis.call('HSET', KEYS[1], 'level', tostring(requests), 'ts', tostring(now))
+redis.call('HSET', KEYS[2], 'level', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], ttl)
+redis.call('PEXPIRE', KEYS[2], ttl)
+
+if wait == 0 then
+    return {1, 0}
+end
+return {0, math.ceil(wait)}
+"""
+
+# Devuelve (o cobra, si es negativo) la diferencia entre lo reservado y lo usado
+_RECONCILE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local capacity, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+
+local state = redis.call('HMGET', KEYS[1], 'level', 'ts')
+local level = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+level = math.min(capacity, level + math.max(0, now - ts) * rate)
+level = math.min(capacity, level + tonumber(ARGV[3]))
+
+redis.call('HSET', KEYS[1], 'level', tostring(level), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[4]))
+return 1
+"""
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: int = 0) -> int:
+    """
+    Tokens estimados de un request de chat
+    OpenAI descuenta max_tokens del límite por minuto, así que se suma completo
+    """
+    content_tokens = sum(estimate_tokens(str(message.get('content') or '')) for message in messages)
+    return content_tokens + TOKENS_PER_MESSAGE * len(messages) + (max_tokens or 0)
+
+
+class RedisTokenBucketLimiter:
+    """
+    Buckets de requests y tokens por minuto en Redis
+    redis_client es cualquier cliente compatible con redis-py (en pruebas, un Redis local)
+    Si Redis falla la llamada sigue sin límite: el limitador nunca detiene la extracción
+    """
+
+    def __init__(self, redis_client, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+                 max_wait: float = DEFAULT_MAX_WAIT_SECONDS, key_prefix: str = DEFAULT_KEY_PREFIX):
+        self.redis = redis_client
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        # Misma hash tag para que ambas claves queden en el mismo nodo de un cluster
+        self.requests_key = f'{{{key_prefix}}}:requests'
+        self.tokens_key = f'{{{key_prefix}}}:tokens'
+        # Las claves se borran solas tras dos minutos sin uso (buckets llenos)
+        self.ttl_ms = 120000
+
+        self._acquire = redis_client.register_script(_ACQUIRE_SCRIPT)
+        self._reconcile = redis_client.register_script(_RECONCILE_SCRIPT)
+
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> int:
+        """
+        Bloquea hasta reservar un request y tokens; retorna los tokens reservados
+        (0 si no se reservó nada por un error de Redis o por superar max_wait)
+        """
+        # Un request más grande que el bucket nunca cabría: se limita a la capacidad
+        tokens = min(max(int(tokens), 0), self.tokens_per_minute)
+        started = time.monotonic()
+        slept = False
+
+        while True:
+            try:
+                granted, wait_ms = self._acquire(
+                    keys=[self.requests_key, self.tokens_key],
+                    args=[self.requests_per_minute, self.requests_per_minute / 60000.0,
+                          self.tokens_per_minute, self.tokens_per_minute / 60000.0, tokens, self.ttl_ms],
+                )
+            except Exception as e:
+                logger.warning(f"Limitador de OpenAI no disponible, se llama sin límite: {e}")
+                return 0
+
+            waited = time.monotonic() - started
+            if int(granted):
+                # Solo cuenta como espera si hubo que dormir (waited incluye el ida y vuelta a Redis)
+                if slept:
+                    with self._stats_lock:
+                        self.waits += 1
+                        self.waited_seconds += waited
+                return tokens
+
+            if waited >= self.max_wait:
+                logger.warning(f"Límite de OpenAI: {waited:.0f}s esperando {tokens} tokens, se llama igual")
+                return 0
+
+            # Jitter para que los workers que esperan no consulten todos a la vez
+            pause = min(int(wait_ms) / 1000.0, MAX_POLL_SECONDS, self.max_wait - waited)
+            time.sleep(pause * random.uniform(1.0, 1.1))
+            slept = True
+
+    def reconcile(self, reserved: int, used: int):
+        """Ajusta la reserva con los tokens reales (devuelve lo sobrante o cobra lo que faltó)"""
+        if not reserved or reserved == used:
+            return
+
+        try:
+            self._reconcile(
+                keys=[self.tokens_key],
+                args=[self.tokens_per_minute, self.tokens_per_minute / 60000.0, reserved - used, self.ttl_ms],
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo ajustar la reserva de tokens de OpenAI: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {'waits': self.waits, 'waited_seconds': self.waited_seconds}
+
+
+def create_chat_completion(client, limiter: Optional[RedisTokenBucketLimiter] = None, **request):
+    """client.chat.completions.create pasando por el limitador compartido"""
+    if limiter is None:
+        limiter = get_openai_rate_limiter()
+    if limiter is None:
+        return client.chat.completions.create(**request)
+
+    reserved = limiter.acquire(estimate_request_tokens(request.get('messages', []), request.get('max_tokens', 0)))
+    used = 0
+
+    try:
+        response = client.chat.completions.create(**request)
+        usage = getattr(response, 'usage', None)
+        used = getattr(usage, 'total_tokens', None) or reserved
+        return response
+    finally:
+        # Si la llamada falló no se consumieron tokens: se devuelve la reserva
+        limiter.reconcile(reserved, used)
+
+
+_rate_limiter = None
+_rate_limiter_configured = False
+_rate_limiter_lock = threading.Lock()
+
+
+def get_openai_rate_limiter() -> Optional[RedisTokenBucketLimiter]:
+    """
+    Retorna el limitador del proceso configurado desde settings
+    Retorna None si está desactivado, Django no está configurado o falta redis-py
+    """
+    global _rate_limiter, _rate_limiter_configured
+
+    if _rate_limiter_configured:
+        return _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter_configured:
+            return _rate_limiter
+
+        try:
+            from django.conf import settings
+            enabled = getattr(settings, 'OPENAI_RATE_LIMIT_ENABLED', True)
+            redis_url = getattr(settings, 'OPENAI_RATE_LIMIT_REDIS_URL', None) or settings.CELERY_BROKER_URL
+            requests_per_minute = getattr(settings, 'OPENAI_MAX_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE)
+            tokens_per_minute = getattr(settings, 'OPENAI_MAX_TOKENS_PER_MINUTE', DEFAULT_TOKENS_PER_MINUTE)
+            max_wait = getattr(settings, 'OPENAI_RATE_LIMIT_MAX_WAIT', DEFAULT_MAX_WAIT_SECONDS)
+        except Exception:
+            enabled = False
+
+        if enabled:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url, socket_timeout=5, socket_connect_timeout=5)
+                _rate_limiter = RedisTokenBucketLimiter(client, requests_per_minute, tokens_per_minute, max_wait)
+            except ImportError:
+                logger.warning("redis no está instalado: llamadas a OpenAI sin limitador compartido")
+
+        _rate_limiter_configured = True
+        return _rate_limiter
+
+
+def set_openai_rate_limiter(limiter: Optional[RedisTokenBucketLimiter]):
+    """Reemplaza el limitador del proceso (None lo desactiva)"""
+    global _rate_limiter, _rate_limiter_configured
+
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
+        _rate_limiter_configured = True
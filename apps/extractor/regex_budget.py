@@ -0,0 +1,51 @@
+# apps/extractor/regex_budget.py
+"""
+Presupuesto de tiempo de regex por documento
+El módulo re no se puede interrumpir, así que el presupuesto se revisa entre líneas
+y entre coincidencias: al agotarse se corta la etapa y se conserva lo extraído hasta
+ahí (en modo hybrid OpenAI completa lo que falte)
+"""
+
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGEX_BUDGET_SECONDS = 5.0
+
+
+def get_regex_budget_seconds() -> float:
+    """Segundos de regex por documento configurados (0 = sin límite)"""
+    seconds = DEFAULT_REGEX_BUDGET_SECONDS
+
+    try:
+        from django.conf import settings
+        seconds = getattr(settings, 'EXTRACTION_REGEX_BUDGET_SECONDS', seconds)
+    except Exception:
+        pass
+
+    return seconds
+
+
+class RegexBudget:
+    """Plazo de regex de un documento; exceeded queda en True desde que se agota"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        if seconds is None:
+            seconds = get_regex_budget_seconds()
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds if seconds > 0 else None
+        self.exceeded = False
+        self.stage = None
+
+    def expired(self, stage: str) -> bool:
+        if self.exceeded:
+            return True
+        if self.deadline is None or time.perf_counter() < self.deadline:
+            return False
+
+        self.exceeded = True
+        self.stage = stage
+        logger.warning(f"Presupuesto de regex agotado ({self.seconds:g}s) en {stage}: se conservan los resultados parciales")
+        return True
@@ -0,0 +1,265 @@
+# apps/extractor/soat_patterns.py
+"""
+Registro de patrones compilados para las glosas SOAT
+Se compilan una sola vez al importar el módulo y los comparten el extractor,
+el procesador paginado, el divisor de PDFs y las utilidades de limpieza
+"""
+
+import re
+from typing import Optional
+
+from .header_scanner import AnchoredFieldScanner
+
+_I = re.IGNORECASE
+_IM = re.IGNORECASE | re.MULTILINE
+
+# Palabra de la descripción: las mismas clases de antes sin el espacio
+_DESCRIPTION_WORD = r'[A-ZÁÉÍÓÚÑ\w\/\#\,\.\-\(\)\%]+'
+
+# Palabras de descripción revisadas como máximo por código en el texto completo
+MAX_FULL_TEXT_DESCRIPTION_WORDS = 40
+
+
+def _description_and_values(space: str, max_words: Optional[int] = None) -> str:
+    """
+    Descripción + cantidad + valor total, pagado y objetado
+    La descripción se arma por palabras separadas por espacio: cada carácter solo
+    puede pertenecer a una palabra o a un separador, así el motor no prueba todos los
+    cortes posibles y el costo es lineal en el largo de la línea. Equivale a la
+    versión anterior ([...\s...]+? seguido de \s+): la descripción más corta que
+    tenga al menos dos caracteres y a continuación los cuatro números
+    """
+    repeat = '*?' if max_words is None else f'{{0,{max_words}}}?'
+    return (
+        rf'([A-ZÁÉÍÓÚÑ](?:{_DESCRIPTION_WORD}|{space}(?={space})|{space}+{_DESCRIPTION_WORD})'
+        rf'(?:{space}+{_DESCRIPTION_WORD}){repeat})'
+        rf'{space}+(\d+(?:\.\d+)?)'
+        rf'{space}+\$?([\d,\.]+){space}+\$?([\d,\.]+){space}+\$?([\d,\.]+)'
+    )
+
+
+# Por línea se usa cualquier espacio; en el texto completo solo espacios horizontales
+# para que una búsqueda no cruce líneas, y un máximo de palabras por descripción
+_DESCRIPTION_AND_VALUES = _description_and_values(r'\s')
+_FULL_TEXT_SPACE = r'[^\S\n]'
+_FULL_TEXT_DESCRIPTION_AND_VALUES = _description_and_values(_FULL_TEXT_SPACE, MAX_FULL_TEXT_DESCRIPTION_WORDS)
+
+# ============================================================================
+# PACIENTE Y VÍCTIMA
+# ============================================================================
+
+VICTIM_PATTERN = re.compile(
+    r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\n|\r|Número)', _I
+)
+
+PATIENT_PATTERNS = {
+    'nombre': [
+        re.compile(r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\n|\r|Número)', _IM),
+        re.compile(r'VICTIMA\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+)', _IM),
+        re.compile(r'CC\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\n|\r|Número)', _IM),
+    ],
+    'documento': [
+        re.compile(r'Víctima\s*:\s*([A-Z]{1,3})\s*-\s*(\d+)\s*-', _I),
+        re.compile(r'VICTIMA\s*:\s*([A-Z]{1,3})\s*-\s*(\d+)\s*-', _I),
+        re.compile(r'CC\s*-\s*(\d+)\s*-', _I),
+        re.compile(r'TI\s*-\s*(\d+)\s*-', _I),
+        re.compile(r'NIT\s*-\s*(\d+)', _I),
+    ],
+    'tipo_documento': [
+        re.compile(r'Víctima\s*:\s*([A-Z]{1,3})\s*-', _I),
+        re.compile(r'VICTIMA\s*:\s*([A-Z]{1,3})\s*-', _I),
+    ]
+}
+
+# ============================================================================
+# PÓLIZA, DIAGNÓSTICOS, TOTALES E IPS
+# ============================================================================
+
+POLICY_PATTERNS = {
+    'numero_liquidacion': [
+        re.compile(r'Liquidación\s+de\s+siniestro\s+No\.\s*([A-Z0-9\-]+)', _IM),
+        re.compile(r'LIQ-(\d+)', _IM),
+        re.compile(r'GNS-LIQ-(\d+)', _IM),
+    ],
+    'poliza': [
+        re.compile(r'Póliza\s*:\s*(\d+)', _IM),
+        re.compile(r'POLIZA\s*:\s*(\d+)', _IM),
+    ],
+    'numero_reclamacion': [
+        re.compile(r'Número\s+de\s+reclamación\s*:\s*([A-Z0-9]+)', _IM),
+        re.compile(r'reclamación\s*:\s*([A-Z0-9]+)', _IM),
+    ],
+    'fecha_siniestro': [
+        re.compile(r'Fecha\s+de\s+siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _IM),
+        re.compile(r'siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _IM),
+    ],
+    'fecha_ingreso': [
+        re.compile(r'Fecha\s+de\s+ingreso\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _IM),
+        re.compile(r'ingreso\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _IM),
+    ],
+    'fecha_pago': [
+        re.compile(r'Fecha\s+de\s+Pago\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _IM),
+        re.compile(r'Pago\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _IM),
+    ],
+    'orden_pago': [
+        re.compile(r'Orden\s+de\s+pago\s*:\s*(\d+)', _IM),
+        re.compile(r'pago\s*:\s*(\d+)', _IM),
+    ]
+}
+
+# Todos los campos de póliza en una sola pasada, con la misma prioridad por campo
+POLICY_FIELD_SCANNER = AnchoredFieldScanner(POLICY_PATTERNS)
+
+DIAGNOSTIC_PATTERNS = [
+    re.compile(r'DX\s*:\s*([A-Z]\d{2,3})', _I),
+    re.compile(r'DIAGNOSTICO\s*:\s*([A-Z]\d{2,3})', _I),
+    re.compile(r'CIE\s*:\s*([A-Z]\d{2,3})', _I),
+]
+
+FINANCIAL_TOTALS_PATTERNS = {
+    'valor_reclamacion': [
+        re.compile(r'Valor\s+de\s+Reclamación\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'Total\s+\$?([\d,\.]+)', _IM),
+        re.compile(r'TOTAL\s+RECLAMADO\s*:\s*\$?([\d,\.]+)', _IM),
+    ],
+    'valor_objetado': [
+        re.compile(r'Valor\s+objetado\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'VALOR\s+OBJETADO\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'Total\s+objetado\s*:\s*\$?([\d,\.]+)', _IM),
+    ],
+    'valor_pagado': [
+        re.compile(r'Valor\s+pagado\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'VALOR\s+PAGADO\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'Total\s+pagado\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'Valor\s+Pagado\s*:\s*\$?([\d,\.]+)', _IM),
+    ],
+    'valor_nota_credito': [
+        re.compile(r'Valor\s+Nota\s+Crédito\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'NOTA\s+CREDITO\s*:\s*\$?([\d,\.]+)', _IM),
+    ],
+    'valor_impuestos': [
+        re.compile(r'Valor\s+impuestos\s*:\s*\$?([\d,\.]+)', _IM),
+        re.compile(r'IMPUESTOS\s*:\s*\$?([\d,\.]+)', _IM),
+    ]
+}
+
+IPS_PATTERNS = [
+    re.compile(r'Señores\s*:\s*([A-ZÁÉÍÓÚÑ\s\.]+?)(?:\n|\r)', _IM),
+    re.compile(r'([A-ZÁÉÍÓÚÑ\s\.]+?)\s+IPS\s+SAS', _IM),
+    re.compile(r'([A-ZÁÉÍÓÚÑ\s\.]+?)\s+Departamento\s+de\s+cartera', _IM),
+]
+
+IPS_NIT_PATTERN = re.compile(r'NIT\s*-?\s*(\d{9,12})', _I)
+
+# ============================================================================
+# TABLA DE PROCEDIMIENTOS
+# ============================================================================
+
+TABLE_HEADER_PATTERN = re.compile(r'Código\s+Descripción\s+Cant\s+Valor\s+total', _I)
+TABLE_FIRST_ROW_PATTERN = re.compile(r'^\d{5}\s+[A-ZÁÉÍÓÚÑ]', _I)
+TABLE_TOTAL_PATTERN = re.compile(r'^Total\s+\$', _I)
+TABLE_CLAIM_VALUE_PATTERN = re.compile(r'Valor\s+de\s+Reclamación:', _I)
+
+PROCEDURE_LINE_PATTERN = re.compile(r'^(\d{5})\s+' + _DESCRIPTION_AND_VALUES, _I)
+PROCEDURE_COMPOUND_LINE_PATTERN = re.compile(r'^(\d{5,8}-\d{1,2})\s+' + _DESCRIPTION_AND_VALUES, _I)
+PROCEDURE_DESCRIPTION_PATTERN = re.compile(r'^' + _DESCRIPTION_AND_VALUES, _I)
+PROCEDURE_FULL_TEXT_PATTERNS = [
+    re.compile(r'(\d{5})' + _FULL_TEXT_SPACE + '+' + _FULL_TEXT_DESCRIPTION_AND_VALUES, _IM),
+    re.compile(r'(\d{5,8}-\d{1,2})' + _FULL_TEXT_SPACE + '+' + _FULL_TEXT_DESCRIPTION_AND_VALUES, _IM),
+]
+
+CODE_ONLY_PATTERN = re.compile(r'^(\d{5})$')
+CODE_PATTERN = re.compile(r'^\d{5}$')
+COMPOUND_CODE_PATTERN = re.compile(r'^\d{5,8}-\d{1,2}$')
+CODE_PREFIX_PATTERN = re.compile(r'^\d{5}')
+DIGIT_PREFIX_PATTERN = re.compile(r'^\d')
+LETTER_PREFIX_PATTERN = re.compile(r'^[A-ZÁÉÍÓÚÑ]', _I)
+
+# Observaciones: "$1 $2 $3 texto", "4567 >> texto" y continuaciones ">> texto"
+OBSERVATION_TRAILING_PATTERN = re.compile(r'\$[\d,\.]+\s+\$[\d,\.]+\s+\$[\d,\.]+\s+(.+)$')
+OBSERVATION_CODED_PATTERN = re.compile(r'(\d{4})\s*>>\s*(.+?)$')
+OBSERVATION_CODE_PREFIX_PATTERN = re.compile(r'^\d{4}\s*>>')
+OBSERVATION_CODE_LINE_PATTERN = re.compile(r'^\d{4}\s*>>\s*(.+)')
+OBSERVATION_CONTINUATION_PATTERN = re.compile(r'^>>')
+OBSERVATION_MARKER_PATTERN = re.compile(r'(?:^|\s)(?:\d{4}\s*)?>>\s*')
+OBSERVATION_LEADING_PATTERN = re.compile(r'^[>\s]+')
+
+# ============================================================================
+# LIMPIEZA Y FORMATOS
+# ============================================================================
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+MONEY_SYMBOLS_PATTERN = re.compile(r'[\$\s]')
+DIGITS_ONLY_PATTERN = re.compile(r'^\d+\s*$')
+MONEY_AMOUNT_PATTERN = re.compile(r'\$[\d,\.]+')
+OBSERVATION_CODE_PATTERN = re.compile(r'\s*\d{4}\s+>>')
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s\.\,\:\;\-\$\(\)\/\%]')
+THOUSANDS_DOT_PATTERN = re.compile(r'(\d+)\.(\d{3})')
+
+DATE_DMY_PATTERN = re.compile(r'\d{1,2}/\d{1,2}/\d{4}')
+DATE_ISO_PATTERN = re.compile(r'\d{4}-\d{1,2}-\d{1,2}')
+DATE_NORMALIZE_PATTERNS = [
+    re.compile(r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})', _I),  # DD/MM/YYYY o DD-MM-YYYY
+    re.compile(r'(\d{4})[\/\-](\d{1,2})[\/\-](\d{1,2})', _I),  # YYYY/MM/DD o YYYY-MM-DD
+    re.compile(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', _I),   # DD de MMMM de YYYY
+]
+
+# ============================================================================
+# PROCESADOR PAGINADO (ENCABEZADO Y TOTALES)
+# ============================================================================
+
+HEADER_PATIENT_PATTERNS = {
+    'nombre': [
+        re.compile(r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\s*Número|\s*$)', _I),
+        re.compile(r'VICTIMA\s*:\s*[A-Z]{1,3}\s*-\s*\d+\s*-\s*([A-ZÁÉÍÓÚÑ\s]+)', _I),
+        re.compile(r'Paciente\s*:\s*([A-ZÁÉÍÓÚÑ\s]+?)(?:\s*\n|\s*$)', _I)
+    ],
+    'documento': [
+        re.compile(r'Víctima\s*:\s*[A-Z]{1,3}\s*-\s*(\d+)\s*-', _I),
+        re.compile(r'CC\s*-\s*(\d+)', _I),
+        re.compile(r'TI\s*-\s*(\d+)', _I)
+    ],
+    'tipo_documento': [
+        re.compile(r'Víctima\s*:\s*([A-Z]{1,3})\s*-', _I),
+        re.compile(r'(CC|TI|CE)\s*-\s*\d+', _I)
+    ]
+}
+
+HEADER_POLICY_PATTERNS = {
+    'numero_liquidacion': [
+        re.compile(r'Liquidación\s+de\s+siniestro\s+No\.\s*([A-Z0-9\-]+)', _I),
+        re.compile(r'LIQ-(\d+)', _I),
+        re.compile(r'No\.\s*(\d{2}-\d{4}-\d+)', _I)
+    ],
+    'poliza': [
+        re.compile(r'Póliza\s*:\s*(\d+)', _I),
+        re.compile(r'POLIZA\s*:\s*(\d+)', _I)
+    ],
+    'numero_reclamacion': [
+        re.compile(r'Número\s+de\s+reclamación\s*:\s*([A-Z0-9]+)', _I),
+        re.compile(r'reclamación\s*:\s*([A-Z0-9]+)', _I)
+    ],
+    'fecha_siniestro': [
+        re.compile(r'Fecha\s+de\s+siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _I),
+        re.compile(r'siniestro\s*:\s*(\d{1,2}/\d{1,2}/\d{4})', _I)
+    ]
+}
+
+FOOTER_TOTALS_PATTERNS = {
+    'total_reclamado': [
+        re.compile(r'Valor\s+de\s+Reclamación\s*:\s*\$?([\d,]+)', _I),
+        re.compile(r'Total\s+Reclamado\s*:\s*\$?([\d,]+)', _I),
+        re.compile(r'TOTAL\s*:\s*\$?([\d,]+)', _I)
+    ],
+    'total_objetado': [
+        re.compile(r'Valor\s+objetado\s*:\s*\$?([\d,]+)', _I),
+        re.compile(r'Total\s+Objetado\s*:\s*\$?([\d,]+)', _I)
+    ],
+    'total_pagado': [
+        re.compile(r'Valor\s+a\s+Pagar\s*:\s*\$?([\d,]+)', _I),
+        re.compile(r'Total\s+Pagado\s*:\s*\$?([\d,]+)', _I),
+        re.compile(r'Valor\s+Aceptado\s*:\s*\$?([\d,]+)', _I)
+    ]
+}
+
+TOTALS_LINE_PATTERN = re.compile(r'^\s*.*?\s+\$?([\d,]+)\s+\$?([\d,]+)\s+\$?([\d,]+)\s*$', re.MULTILINE)
@@ -4,7 +4,10 @@ from celery import shared_task, group
 from django.utils import timezone
 from django.core.files.base import ContentFile
 from django.conf import settings
+import itertools
 import json
+import os
+import tempfile
 import traceback
 import logging
 import time
@@ -38,6 +41,29 @@ def process_batch_documents(self, batch_id):
         if not child_documents.exists():
             raise Exception("No se encontraron documentos hijos para procesar")
         
+        # Las secciones con resultado reutilizado ya están completas
+        reused_count = child_documents.filter(status='completed', is_reused_result=True).count()
+        child_documents = child_documents.exclude(status='completed', is_reused_result=True)
+        
+        # Las secciones que no se pudieron cortar quedan con error (no hay archivo que procesar)
+        child_documents = child_documents.exclude(status='error')
+        
+        if reused_count:
+            ProcessingLog.objects.create(
+                glosa=master_document,
+                level='INFO',
+                message=f'{reused_count} secciones reutilizadas de glosas ya procesadas'
+            )
+        
+        if not child_documents.exists():
+            batch.update_progress()
+            return {
+                'batch_id': str(batch_id),
+                'status': batch.batch_status,
+                'total_tasks': 0,
+                'message': 'Todas las secciones fueron reutilizadas'
+            }
+        
         # PROCESAMIENTO PARALELO USANDO CELERY GROUP
         child_ids = [str(child.id) for child in child_documents]
         
@@ -107,6 +133,226 @@ def process_batch_documents(self, batch_id):
         raise self.retry(exc=e, countdown=300 * (2 ** self.request.retries))
 
 
+@shared_task
+def split_and_dispatch_batch(batch_id, force_reprocess=False, confirm_multiple=False):
+    """
+    DIVISIÓN EN PIPELINE: crea cada documento hijo y despacha su extracción
+    apenas se detecta su sección, mientras se sigue leyendo el resto del PDF
+    El total del batch se fija al terminar la división
+    Con force_reprocess ningún hijo reutiliza el resultado de una sección idéntica
+    Con confirm_multiple (la subida no pudo decidir) se espera a la segunda sección antes
+    de crear hijos; si hay una sola, el documento completo se procesa sin batch
+    """
+    try:
+        logger.info(f"=== DIVIDIENDO BATCH {batch_id} EN PIPELINE ===")
+
+        batch = ProcessingBatch.objects.get(id=batch_id)
+        master_document = batch.master_document
+        pdf_path = master_document.original_file.path
+        split_mode = getattr(settings, 'GLOSA_SPLIT_MODE', 'page_range')
+
+        from .pdf_splitter import GlosaPDFSplitter
+        from .document_pool import get_document_pool
+        splitter = GlosaPDFSplitter()
+        total_pages = max(len(get_document_pool().get(pdf_path)), 1)
+
+        # Si la tarea se re-ejecuta, continuar después de los hijos ya creados
+        created_sections = master_document.child_documents.count()
+        dispatched = 0
+        reused = 0
+        section_number = 0
+
+        sections = splitter.iter_sections(pdf_path)
+
+        # La subida no pudo decidir: sin una segunda sección no hay nada que dividir
+        # (leer las dos primeras agota el PDF de un solo paciente y deja su texto en caché)
+        if confirm_multiple and not created_sections:
+            first_sections = list(itertools.islice(sections, 2))
+            if len(first_sections) < 2:
+                return _process_as_single_document(batch, master_document)
+            sections = itertools.chain(first_sections, sections)
+
+        ProcessingLog.objects.create(
+            glosa=master_document,
+            level='INFO',
+            message='Dividiendo PDF y despachando cada paciente en cuanto se detecta'
+        )
+
+        for start, end, metadata in sections:
+            section_number += 1
+            if section_number <= created_sections:
+                continue
+
+            child_glosa = None
+            try:
+                child_fields = dict(
+                    user=master_document.user,
+                    parent_document=master_document,
+                    status='pending',
+                    strategy=master_document.strategy,
+                    original_filename=f"{master_document.original_filename}_paciente_{section_number}",
+                    patient_section_number=section_number,
+                    total_sections=0
+                )
+
+                if split_mode == 'page_range':
+                    # Documento hijo por rango: comparte el archivo del padre
+                    child_glosa = GlosaDocument.objects.create(
+                        original_file=master_document.original_file.name,
+                        file_size=max(master_document.file_size * metadata['total_pages'] // total_pages, 1),
+                        start_page=start,
+                        end_page=end,
+                        section_fingerprint=metadata.get('fingerprint'),
+                        **child_fields
+                    )
+                else:
+                    # Escribir la sección a disco y guardarla como archivo propio
+                    child_glosa = GlosaDocument.objects.create(
+                        file_size=1, section_fingerprint=metadata.get('fingerprint'), **child_fields
+                    )
+                    _save_section_file(splitter, child_glosa, pdf_path, start, end, section_number)
+
+                ProcessingLog.objects.create(
+                    glosa=child_glosa,
+                    level='INFO',
+                    message=f'Documento hijo creado (sección {section_number}, páginas {start + 1}-{end + 1})'
+                )
+
+                # Sección idéntica a un hijo ya procesado: reutilizar sin despachar tarea
+                if not force_reprocess and child_glosa.reuse_section_result():
+                    reused += 1
+                    ProcessingLog.objects.create(
+                        glosa=child_glosa,
+                        level='INFO',
+                        message='Sección sin cambios respecto a una glosa ya procesada: resultado reutilizado'
+                    )
+                    continue
+
+                process_single_glosa_document.delay(str(child_glosa.id))
+                dispatched += 1
+
+            except Exception as e:
+                logger.error(f"Error creando documento hijo {section_number}: {e}")
+                # El hijo ya creado (p.ej. falló el corte de la sección) queda con error, no pendiente
+                if child_glosa is not None:
+                    child_glosa.status = 'error'
+                    child_glosa.error_message = f"Error dividiendo la sección: {e}"
+                    child_glosa.save()
+                continue
+
+        # Fijar totales definitivos ahora que se conoce el número de secciones
+        children = master_document.child_documents.all()
+        total_sections = children.count()
+
+        if total_sections == 0:
+            raise Exception("No se pudo crear ningún documento hijo")
+
+        children.update(total_sections=total_sections)
+        master_document.is_master_document = True
+        master_document.total_sections = total_sections
+        master_document.save()
+
+        batch.total_documents = total_sections
+        batch.batch_status = 'processing'
+        batch.save(update_fields=['total_documents', 'batch_status'])
+
+        # Los hijos que ya terminaron pueden haber completado el batch
+        batch.update_progress()
+
+        ProcessingLog.objects.create(
+            glosa=master_document,
+            level='INFO',
+            message=f'✅ División completada: {total_sections} documentos, '
+                   f'{dispatched} tareas despachadas durante la lectura del PDF, '
+                   f'{reused} secciones reutilizadas'
+        )
+
+        logger.info(f"=== BATCH {batch_id} DIVIDIDO: {total_sections} SECCIONES ===")
+
+        return {
+            'batch_id': str(batch_id),
+            'status': batch.batch_status,
+            'total_tasks': total_sections,
+            'dispatched': dispatched,
+            'reused': reused
+        }
+
+    except ProcessingBatch.DoesNotExist:
+        logger.error(f"Batch {batch_id} no encontrado")
+        return {'error': 'Batch no encontrado'}
+
+    except Exception as e:
+        logger.error(f"Error dividiendo batch {batch_id}: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+
+        try:
+            batch = ProcessingBatch.objects.get(id=batch_id)
+            batch.batch_status = 'error'
+            batch.error_message = str(e)
+            batch.save()
+
+            master = batch.master_document
+            master.status = 'error'
+            master.error_message = str(e)
+            master.save()
+
+            ProcessingLog.objects.create(
+                glosa=master,
+                level='ERROR',
+                message=f'Error dividiendo PDF: {str(e)}'
+            )
+        except:
+            pass
+
+        return {'error': str(e)}
+
+
+def _process_as_single_document(batch, master_document):
+    """El PDF resultó de un solo paciente: se descarta el batch y se procesa el documento completo"""
+    batch_id = str(batch.id)
+    batch.delete()
+
+    master_document.is_master_document = False
+    master_document.save()
+
+    ProcessingLog.objects.create(
+        glosa=master_document,
+        level='INFO',
+        message='Documento de un solo paciente detectado al dividir - procesando asíncronamente'
+    )
+
+    task = process_single_glosa_document.delay(str(master_document.id))
+    logger.info(f"=== BATCH {batch_id} SIN DIVISIÓN: UN SOLO PACIENTE ===")
+
+    return {
+        'batch_id': batch_id,
+        'status': 'single_document',
+        'task_id': task.id
+    }
+
+
+def _save_section_file(splitter, child_glosa, pdf_path, start, end, section_number):
+    """Corta la sección a un archivo temporal y la guarda en el FileField del hijo"""
+    from django.core.files import File
+    from .document_pool import get_document_pool
+
+    doc = get_document_pool().get(pdf_path)
+    fd, temp_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+
+    try:
+        child_glosa.file_size = splitter._write_section(doc, start, end, temp_path)
+        with open(temp_path, 'rb') as section_file:
+            child_glosa.original_file.save(
+                f"section_{section_number}.pdf",
+                File(section_file),
+                save=True
+            )
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
 @shared_task(bind=True, max_retries=2, default_retry_delay=60)
 def process_single_glosa_document(self, glosa_id):
     """
@@ -164,7 +410,12 @@ def process_single_glosa_document(self, glosa_id):
             logger.info(f"Aplicando delay de {delay}s antes de llamar OpenAI")
             time.sleep(delay)
         
-        result = extractor.extract_from_pdf(glosa.original_file.path, strategy=strategy)
+        # Los hijos por rango leen directamente su ventana de páginas del PDF padre
+        result = extractor.extract_from_pdf(
+            glosa.original_file.path,
+            strategy=strategy,
+            page_range=glosa.page_range
+        )
         end_time = timezone.now()
         
         processing_time = (end_time - start_time).total_seconds()
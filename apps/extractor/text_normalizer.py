@@ -0,0 +1,172 @@
+# apps/extractor/text_normalizer.py
+"""
+Normalización de descripciones y observaciones de procedimientos
+Los mismos ítems CUPS se repiten en miles de documentos, así que el resultado
+se memoriza en una caché LRU acotada que comparten todos los extractores del
+proceso worker: para un ítem repetido la limpieza es una búsqueda en diccionario
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from .soat_patterns import (
+    WHITESPACE_PATTERN, DIGITS_ONLY_PATTERN, MONEY_AMOUNT_PATTERN,
+    OBSERVATION_CODE_PATTERN, OBSERVATION_LEADING_PATTERN,
+)
+
+logger = logging.getLogger(__name__)
+
+# Entradas por defecto de cada caché (descripciones y observaciones por separado)
+DEFAULT_NORMALIZER_CACHE_SIZE = 20000
+
+# Textos más largos no se memorizan (suelen ser únicos y ocupan memoria)
+MAX_CACHED_TEXT_LENGTH = 1000
+
+MAX_OBSERVATION_LENGTH = 500
+
+# Texto problemático que descarta la descripción si está al inicio
+DESCRIPTION_STOP_PREFIXES = ('LIQ-', 'Pagina', 'Liquidación', 'Fecha de', 'Víctima', 'Número de')
+
+
+def clean_description(description: str) -> str:
+    """Limpieza de descripción (sin caché)"""
+    if not description:
+        return ""
+
+    # No remover contenido antes de guiones si es parte de la descripción
+    # Solo remover si es claramente basura
+    description = DIGITS_ONLY_PATTERN.sub('', description)  # Solo números
+    description = MONEY_AMOUNT_PATTERN.sub('', description)  # Valores monetarios
+    description = OBSERVATION_CODE_PATTERN.sub('', description)  # Códigos de observación
+
+    # Remover observaciones que se colaron en la descripción
+    if '>>' in description:
+        description = description.split('>>')[0].strip()
+
+    if description.startswith(DESCRIPTION_STOP_PREFIXES):
+        return ""
+
+    # Normalizar espacios
+    description = WHITESPACE_PATTERN.sub(' ', description.strip())
+
+    # Si está todo en mayúsculas, convertir a título manteniendo siglas
+    if description.isupper():
+        description = ' '.join(
+            word if len(word) <= 3 else word.capitalize() for word in description.split()
+        )
+
+    return description
+
+
+def clean_observation(observation: str) -> str:
+    """Limpieza de observación (sin caché)"""
+    if not observation:
+        return ""
+
+    # Normalizar espacios
+    observation = WHITESPACE_PATTERN.sub(' ', observation.strip())
+
+    # Remover caracteres de inicio problemáticos
+    observation = OBSERVATION_LEADING_PATTERN.sub('', observation)
+
+    # Truncar si es muy largo
+    if len(observation) > MAX_OBSERVATION_LENGTH:
+        observation = observation[:MAX_OBSERVATION_LENGTH] + "..."
+
+    return observation
+
+
+class MemoizedCleaner:
+    """
+    Caché LRU acotada alrededor de una función de limpieza pura
+    Cuenta aciertos y fallos para medir la tasa de reutilización
+    """
+
+    def __init__(self, clean: Callable[[str], str], max_entries: int = DEFAULT_NORMALIZER_CACHE_SIZE):
+        self.clean = clean
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str) -> str:
+        if not text:
+            return ""
+        if self.max_entries <= 0 or len(text) > MAX_CACHED_TEXT_LENGTH:
+            return self.clean(text)
+
+        with self._lock:
+            result = self._results.get(text)
+            if result is not None:
+                self._results.move_to_end(text)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = self.clean(text)
+
+        with self._lock:
+            self._results[text] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._results),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class TextNormalizer:
+    """Cachés de descripciones y observaciones de un proceso worker"""
+
+    def __init__(self, max_entries: int = DEFAULT_NORMALIZER_CACHE_SIZE):
+        self.description = MemoizedCleaner(clean_description, max_entries)
+        self.observation = MemoizedCleaner(clean_observation, max_entries)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            'descripcion': self.description.stats(),
+            'observacion': self.observation.stats(),
+        }
+
+    def clear(self):
+        self.description.clear()
+        self.observation.clear()
+
+
+_text_normalizer = None
+_text_normalizer_lock = threading.Lock()
+
+
+def get_text_normalizer() -> TextNormalizer:
+    """Retorna el normalizador compartido del proceso actual"""
+    global _text_normalizer
+
+    if _text_normalizer is None:
+        with _text_normalizer_lock:
+            if _text_normalizer is None:
+                max_entries = DEFAULT_NORMALIZER_CACHE_SIZE
+                try:
+                    from django.conf import settings
+                    max_entries = getattr(settings, 'TEXT_NORMALIZER_CACHE_SIZE', DEFAULT_NORMALIZER_CACHE_SIZE)
+                except Exception:
+                    pass
+                _text_normalizer = TextNormalizer(max_entries)
+
+    return _text_normalizer
@@ -8,6 +8,11 @@ import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+from .money import parse_money
+from .soat_patterns import (
+    SPECIAL_CHARS_PATTERN, WHITESPACE_PATTERN, THOUSANDS_DOT_PATTERN, DATE_NORMALIZE_PATTERNS
+)
+
 logger = logging.getLogger(__name__)
 
 class ColombianMedicalPatterns:
@@ -87,13 +92,13 @@ class TextCleaner:
             return ""
         
         # Remover caracteres especiales problemáticos
-        text = re.sub(r'[^\w\s\.\,\:\;\-\$\(\)\/\%]', ' ', text)
+        text = SPECIAL_CHARS_PATTERN.sub(' ', text)
         
         # Normalizar espacios múltiples
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         
         # Normalizar separadores de miles y decimales
-        text = re.sub(r'(\d+)\.(\d{3})', r'\1\2', text)  # Remover puntos como separadores de miles
+        text = THOUSANDS_DOT_PATTERN.sub(r'\1\2', text)  # Remover puntos como separadores de miles
         
         # Convertir a mayúsculas para mejor matching
         text = text.upper().strip()
@@ -101,26 +106,9 @@ class TextCleaner:
         return text
     
     @staticmethod
-    def normalize_money_value(value_str: str) -> float:
-        """Normaliza valores monetarios colombianos"""
-        if not value_str:
-            return 0.0
-        
-        try:
-            # Remover símbolos de moneda y espacios
-            clean_value = re.sub(r'[\$\s]', '', str(value_str))
-            
-            # Manejar separadores de miles (puntos) y decimales (comas)
-            if ',' in clean_value:
-                # Si hay coma, asumir que es separador decimal
-                clean_value = clean_value.replace('.', '').replace(',', '.')
-            else:
-                # Si no hay coma, asumir que los puntos son separadores de miles
-                clean_value = clean_value.replace('.', '')
-            
-            return float(clean_value)
-        except (ValueError, TypeError):
-            return 0.0
+    def normalize_money_value(value_str: str) -> int:
+        """Normaliza valores monetarios colombianos a pesos enteros (ver money.parse_money)"""
+        return parse_money(value_str)
     
     @staticmethod
     def normalize_date(date_str: str) -> Optional[str]:
@@ -129,14 +117,8 @@ class TextCleaner:
             return None
         
         # Patrones de fecha comunes en Colombia
-        date_patterns = [
-            r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',  # DD/MM/YYYY o DD-MM-YYYY
-            r'(\d{4})[\/\-](\d{1,2})[\/\-](\d{1,2})',  # YYYY/MM/DD o YYYY-MM-DD
-            r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})',   # DD de MMMM de YYYY
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, date_str, re.IGNORECASE)
+        for pattern in DATE_NORMALIZE_PATTERNS:
+            match = pattern.search(date_str)
             if match:
                 groups = match.groups()
                 if len(groups) == 3:
@@ -2,6 +2,7 @@
 
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 
 # Establecer el módulo de configuración de Django para Celery
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zentravision.settings')
@@ -44,8 +45,8 @@ app.conf.update(
     task_default_exchange='celery',
     task_default_routing_key='celery',
     
-    # Rate limiting básico
-    task_default_rate_limit='10/m',
+    # Sin rate limit por tarea: las llamadas a OpenAI pasan por el limitador
+    # compartido en Redis (apps/extractor/rate_limiter.py)
     
     # Memory management
     worker_max_tasks_per_child=25,
@@ -68,6 +69,20 @@ def debug_task(self):
     print(f'Request: {self.request!r}')
     return f'Debug task executed successfully on worker: {self.request.hostname}'
 
+# Pool de procesos para PDFs grandes y OCR: solo en los workers, nunca en el servidor web
+@worker_init.connect
+@worker_process_init.connect
+def enable_pdf_scan_pool(sender=None, **kwargs):
+    from apps.extractor.parallel_scanner import enable_process_pool
+    # worker_init recibe el worker con su concurrencia; los hijos prefork la heredan
+    enable_process_pool(getattr(sender, 'concurrency', None))
+
+# Los hijos prefork salen sin pasar por atexit: cerrar el pool explícitamente
+@worker_process_shutdown.connect
+def shutdown_pdf_scan_pool(**kwargs):
+    from apps.extractor.parallel_scanner import shutdown_scanner
+    shutdown_scanner()
+
 # Configuración para desarrollo
 if os.environ.get('DJANGO_DEBUG', 'False').lower() == 'true':
     app.conf.update(
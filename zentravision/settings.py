@@ -103,6 +103,41 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
 
+# Caché persistente de texto por página (sidecars comprimidos junto a media)
+PAGE_TEXT_CACHE_DIR = config('PAGE_TEXT_CACHE_DIR', default=os.path.join(MEDIA_ROOT, 'page_text_cache'))
+PAGE_TEXT_CACHE_MAX_BYTES = int(config('PAGE_TEXT_CACHE_MAX_BYTES', default=str(512 * 1024 * 1024)))  # 512MB
+
+# División de PDFs múltiples:
+# - 'page_range': los hijos referencian el archivo del padre + rango de páginas (sin copiar PDFs)
+# - 'materialize': cada hijo guarda su propio PDF de sección
+GLOSA_SPLIT_MODE = config('GLOSA_SPLIT_MODE', default='page_range')
+
+# Dividir en background despachando cada paciente apenas se detecta su sección
+GLOSA_PIPELINED_SPLIT = config('GLOSA_PIPELINED_SPLIT', default=True, cast=bool)
+
+# Reducir las fuentes de las secciones materializadas a los glifos usados (requiere fontTools)
+PDF_SECTION_SUBSET_FONTS = config('PDF_SECTION_SUBSET_FONTS', default=True, cast=bool)
+
+# Documentos PyMuPDF abiertos simultáneamente por worker
+PDF_DOCUMENT_POOL_SIZE = int(config('PDF_DOCUMENT_POOL_SIZE', default='8'))
+
+# Extracción de texto y OCR en paralelo para PDFs grandes, solo en workers de Celery
+# Procesos por cada proceso del worker (0 = núcleos disponibles - 1 repartidos según la concurrencia)
+PDF_SCAN_WORKERS = int(config('PDF_SCAN_WORKERS', default='0'))
+PDF_SCAN_PARALLEL_MIN_PAGES = int(config('PDF_SCAN_PARALLEL_MIN_PAGES', default='200'))
+
+# OCR (Tesseract vía PyMuPDF) solo para páginas escaneadas sin capa de texto
+PDF_OCR_ENABLED = config('PDF_OCR_ENABLED', default=True, cast=bool)
+PDF_OCR_LANGUAGE = config('PDF_OCR_LANGUAGE', default='spa')
+PDF_OCR_DPI = int(config('PDF_OCR_DPI', default='300'))
+
+# Tiempo máximo de regex por documento en segundos (0 = sin límite); al agotarse se
+# conservan los procedimientos ya leídos y en modo hybrid OpenAI completa el resto
+EXTRACTION_REGEX_BUDGET_SECONDS = float(config('EXTRACTION_REGEX_BUDGET_SECONDS', default='5'))
+
+# Entradas de la caché por proceso de descripciones y observaciones normalizadas (0 = sin caché)
+TEXT_NORMALIZER_CACHE_SIZE = int(config('TEXT_NORMALIZER_CACHE_SIZE', default='20000'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -138,10 +173,33 @@ CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 # API Key (CRÍTICO - debe estar configurado)
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
-# Configuración de rate limiting
-OPENAI_MAX_REQUESTS_PER_MINUTE = int(config('OPENAI_MAX_REQUESTS_PER_MINUTE', default='10'))
+# Límite compartido por todos los workers (token buckets en Redis): requests y tokens por minuto de la cuenta
+OPENAI_RATE_LIMIT_ENABLED = config('OPENAI_RATE_LIMIT_ENABLED', default=True, cast=bool)
+OPENAI_RATE_LIMIT_REDIS_URL = config('OPENAI_RATE_LIMIT_REDIS_URL', default=CELERY_BROKER_URL)
+OPENAI_MAX_REQUESTS_PER_MINUTE = int(config('OPENAI_MAX_REQUESTS_PER_MINUTE', default='500'))
+OPENAI_MAX_TOKENS_PER_MINUTE = int(config('OPENAI_MAX_TOKENS_PER_MINUTE', default='200000'))
+OPENAI_RATE_LIMIT_MAX_WAIT = float(config('OPENAI_RATE_LIMIT_MAX_WAIT', default='300'))  # 5 minutos
+
+# Caché de respuestas de OpenAI por documento y por chunk (Redis, con TTL y máximo de entradas)
+LLM_CACHE_ENABLED = config('LLM_CACHE_ENABLED', default=True, cast=bool)
+LLM_CACHE_REDIS_URL = config('LLM_CACHE_REDIS_URL', default=CELERY_BROKER_URL)
+LLM_CACHE_TTL = int(config('LLM_CACHE_TTL', default=str(7 * 24 * 3600)))  # 7 días
+LLM_CACHE_MAX_ENTRIES = int(config('LLM_CACHE_MAX_ENTRIES', default='20000'))
+
+# Tokens máximos del texto del documento en el prompt de OpenAI (la tabla de procedimientos entra primero)
+OPENAI_PROMPT_MAX_INPUT_TOKENS = int(config('OPENAI_PROMPT_MAX_INPUT_TOKENS', default='6000'))
+
 OPENAI_REQUEST_TIMEOUT = int(config('OPENAI_REQUEST_TIMEOUT', default='120'))  # 2 minutos
 
+# Cliente compartido por proceso: timeout de conexión, pool keep-alive y reintentos del SDK
+OPENAI_CONNECT_TIMEOUT = float(config('OPENAI_CONNECT_TIMEOUT', default='10'))
+OPENAI_MAX_CONNECTIONS = int(config('OPENAI_MAX_CONNECTIONS', default='10'))
+OPENAI_KEEPALIVE_EXPIRY = float(config('OPENAI_KEEPALIVE_EXPIRY', default='60'))
+OPENAI_MAX_RETRIES = int(config('OPENAI_MAX_RETRIES', default='2'))
+
+# Chunks de la tabla enviados en paralelo por documento (1 = secuencial con pausa entre llamadas)
+OPENAI_CHUNK_CONCURRENCY = int(config('OPENAI_CHUNK_CONCURRENCY', default='4'))
+
 # Validación de API Key
 if not OPENAI_API_KEY:
     import sys
@@ -153,6 +211,13 @@ if not OPENAI_API_KEY:
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024   # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024    # 50MB
 
+# El hash de contenido se calcula mientras se recibe el archivo (deduplicación de uploads)
+FILE_UPLOAD_HANDLERS = [
+    'apps.core.upload_handlers.ContentHashUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # CORREGIDO: Directorio temporal que se crea en Ansible
 FILE_UPLOAD_TEMP_DIR = config('FILE_UPLOAD_TEMP_DIR', default=str(BASE_DIR / 'tmp'))
 
@@ -285,8 +350,6 @@ CELERY_TASK_TIME_LIMIT = int(config('CELERY_TASK_TIME_LIMIT', default='2400'))
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
 
-# Rate limiting para OpenAI API
-CELERY_TASK_DEFAULT_RATE_LIMIT = '8/m'  # 8 tareas por minuto
 
 # ============================================================================
 # CONFIGURACIÓN DE CACHE (OPCIONAL)
@@ -339,9 +402,6 @@ else:
     if config('CSRF_COOKIE_SECURE', default=False, cast=bool):
         CSRF_COOKIE_SECURE = True
     
-    # Rate limiting más estricto en producción
-    CELERY_TASK_DEFAULT_RATE_LIMIT = '6/m'  # Más conservador
-    
     # Configuración de Celery para producción
     CELERY_WORKER_HIJACK_ROOT_LOGGER = False
     CELERY_WORKER_LOG_COLOR = False